@@ -1,5 +1,4 @@
-from flask import Flask, render_template, request, redirect, url_for, flash, session, jsonify, send_from_directory
-import json
+from flask import Flask, render_template, request, redirect, url_for, flash, session, jsonify, send_from_directory, g, after_this_request
 import os
 from datetime import datetime, timedelta, date
 from werkzeug.security import generate_password_hash, check_password_hash
@@ -8,17 +7,31 @@ import time
 from sqlalchemy import func
 import random
 import string
-import math
-from db import SessionLocal
+from db import SessionLocal, engine, DATABASE_PATH
 from models import (
-    User, Team, Player, Lineup, PitchingOuting, ScoutedPlayer,
+    Base, User, Team, Player, Lineup, PitchingOuting, ScoutedPlayer,
     Rotation, Game, CollaborationNote, PracticePlan, PracticeTask,
-    PlayerDevelopmentFocus, Sign
+    PlayerDevelopmentFocus, Sign, parse_date, format_date, model_serializer
 )
-from sqlalchemy import create_engine
 from sqlalchemy.inspection import inspect as sqlalchemy_inspect
-from sqlalchemy.orm import joinedload
-from flask_socketio import SocketIO, emit
+from sqlalchemy.orm import joinedload, selectinload
+from flask_socketio import SocketIO, emit, join_room
+from snapshot_cache import TeamSnapshotCache
+from snapshot import build_team_snapshot, empty_pitch_count_summary, make_display_name_resolver
+import delta_sync
+import pitcher_workload
+import lineup_slots
+import rotation_assignments
+import rotation_generator
+import player_activity
+import team_search
+import player_order
+import migrations
+from notifications import TeamNotifier, team_room
+from db_executor import DatabaseExecutor
+from team_metadata import team_metadata_cache
+from query_budget import install_query_counter, enforce_query_budget, query_budget
+import json_provider
 import uuid
 from werkzeug.utils import secure_filename
 
@@ -43,7 +56,7 @@ def check_database_initialized():
     Checks if the database file exists and contains the necessary tables.
     If not, it prints a helpful error message and exits.
     """
-    db_path = 'app.db'
+    db_path = DATABASE_PATH
     if not os.path.exists(db_path):
         print("="*70)
         print("!!! DATABASE NOT FOUND !!!")
@@ -53,7 +66,6 @@ def check_database_initialized():
         print("="*70)
         exit()
 
-    engine = create_engine(f'sqlite:///{db_path}')
     inspector = sqlalchemy_inspect(engine)
     if not inspector.has_table("users"):
         print("="*70)
@@ -64,7 +76,120 @@ def check_database_initialized():
         print("="*70)
         exit()
 
-socketio = SocketIO(app)
+    # Bring databases created by older versions up to the current schema (a backup copy is made first).
+    migrations.upgrade(engine)
+
+    # Create any tables added since the database was first initialized (e.g. team_change_log).
+    Base.metadata.create_all(engine)
+    pitcher_workload.rebuild_if_empty(engine)
+
+# Responses, tojson and socket packets are encoded with orjson when it is installed (see json_provider.py)
+app.config['FAST_JSON'] = os.environ.get('FAST_JSON', '1') == '1' and json_provider.ENCODER == 'orjson'
+if app.config['FAST_JSON']:
+    app.json = json_provider.JSONProvider(app)
+socketio = SocketIO(app, json=json_provider.packet_json if app.config['FAST_JSON'] else None)
+
+# Views and other blocking database work run on a pool of native threads so one slow page
+# doesn't stall every socket and request served by the eventlet hub (see db_executor.py).
+app.config['DB_OFFLOAD'] = os.environ.get('DB_OFFLOAD', '1') == '1' and socketio.async_mode == 'eventlet'
+app.config['DB_THREADS'] = int(os.environ.get('DB_THREADS', 10))
+db_executor = DatabaseExecutor(app.config['DB_OFFLOAD'], num_threads=app.config['DB_THREADS'])
+
+# Statements run per view are counted; over-budget views fail in debug/testing (see query_budget.py)
+install_query_counter(engine)
+
+def get_db():
+    """The request's database session, opened on first use and closed when the request ends."""
+    if 'db' not in g:
+        g.db = SessionLocal()
+    return g.db
+
+@app.teardown_appcontext
+def close_db(exception):
+    db = g.pop('db', None)
+    if db is not None:
+        db_executor.run(db.close)
+
+# Record every team-scoped change so clients can sync deltas instead of full snapshots
+delta_sync.install_change_log(SessionLocal)
+# Keep the pitcher_workload ledger in step with pitching_outings
+pitcher_workload.install_workload_ledger(SessionLocal)
+# Link saved lineup slots to players added to or removed from the roster
+lineup_slots.install_slot_linking(SessionLocal)
+# Keep rotation_assignments in step with each rotation's innings
+rotation_assignments.install_assignment_ledger(SessionLocal)
+# Keep each player's development timeline in player_activity
+player_activity.install_activity_ledger(SessionLocal)
+
+# Team snapshots served by /get_app_data, keyed by team id and data version
+app.config['SNAPSHOT_CACHE_MAX_TEAMS'] = int(os.environ.get('SNAPSHOT_CACHE_MAX_TEAMS', 64))
+snapshot_cache = TeamSnapshotCache(max_entries=app.config['SNAPSHOT_CACHE_MAX_TEAMS'])
+
+# Team branding and author display names, read on nearly every request (see team_metadata.py)
+app.config['TEAM_METADATA_TTL'] = float(os.environ.get('TEAM_METADATA_TTL', 300))
+team_metadata_cache.ttl = app.config['TEAM_METADATA_TTL']
+
+@socketio.on('connect')
+def handle_socket_connect():
+    # Sockets share the Flask session cookie; each one only listens to its own team.
+    if not session.get('logged_in') or 'team_id' not in session:
+        return False
+    join_room(team_room(session['team_id']))
+    # Pages are rendered with their data embedded; tell the client the current version so it
+    # can catch up on edits made between the page render and this (re)connect.
+    def read_version():
+        db = SessionLocal()
+        try:
+            return delta_sync.current_version(db, session['team_id'])
+        finally:
+            db.close()
+    emit('data_version', {'version': db_executor.run(read_version)})
+
+# data_updated events are batched per team over this window (seconds); 0 sends immediately
+app.config['DATA_UPDATED_COALESCE_WINDOW'] = float(os.environ.get('DATA_UPDATED_COALESCE_WINDOW', 0.15))
+team_notifier = TeamNotifier(socketio, SessionLocal, window=app.config['DATA_UPDATED_COALESCE_WINDOW'], executor=db_executor)
+
+# Views that may rebuild the team snapshot: one statement per table plus a few lookups
+SNAPSHOT_QUERY_BUDGET = 25
+# Views that save a lineup: SQLite can't batch ORM inserts that return ids, so each spot is one
+# INSERT (a continuous batting order can list the whole roster)
+LINEUP_QUERY_BUDGET = 40
+
+def get_team_snapshot(db, team):
+    """
+    Returns the team's shared page data (see snapshot.build_team_snapshot) for its current
+    data version, building it at most once per edit across all coaches and pages.
+    """
+    version = delta_sync.current_version(db, team.id)
+    snapshot = snapshot_cache.get_or_build(team.id, version, lambda: build_team_snapshot(db, team))
+    return dict(snapshot, version=version)
+
+def client_session_info():
+    return {'username': session.get('username'), 'role': session.get('role'), 'full_name': session.get('full_name')}
+
+def build_client_state(snapshot, player_names):
+    """
+    The initial AppState for the main page: served by /get_app_data and embedded in index.html.
+    player_names is the user's order of the roster (player_order.query_player_order).
+    """
+    app_data = snapshot['full_data']
+    return {'full_data': app_data, 'player_order': player_names, 'session': client_session_info(), 'pitch_count_summary': snapshot['pitch_count_summary'], 'version': snapshot['version']}
+
+def notify_team_data_changed(team_id, message):
+    """
+    Pushes the team's latest changes to that team's clients only. The event is queued once
+    the view has returned, since views run on database worker threads where emitting isn't safe.
+    """
+    @after_this_request
+    def queue_notification(response):
+        team_notifier.notify(team_id, message)
+        return response
+
+@app.after_request
+def add_server_timing(response):
+    if 'db_queue_wait' in g:
+        response.headers['Server-Timing'] = f"db-queue;dur={g.db_queue_wait * 1000:.1f}"
+    return response
 
 def login_required(f):
     @wraps(f)
@@ -94,12 +219,7 @@ def inject_current_year():
 @app.context_processor
 def inject_team_info():
     if 'team_id' in session:
-        db = SessionLocal()
-        try:
-            team = db.query(Team).filter_by(id=session['team_id']).first()
-            return {'current_team': team}
-        finally:
-            db.close()
+        return {'current_team': team_metadata_cache.get(get_db(), session['team_id'])}
     return {}
 
 # --- Favicon Route ---
@@ -112,37 +232,33 @@ def favicon():
 @app.route('/login', methods=['GET', 'POST'])
 def login():
     if request.method == 'POST':
-        db = SessionLocal()
-        try:
-            username = request.form['username']
-            password = request.form['password']
-
-            user = db.query(User).filter(func.lower(User.username) == func.lower(username)).first()
-
-            if user and check_password_hash(user.password_hash, password):
-                if user.username.lower() == 'mike1825':
-                    user.role = 'Super Admin'
-                elif user.role == 'Admin':
-                    user.role = 'Head Coach'
-                elif user.role == 'Coach':
-                    user.role = 'Assistant Coach'
-
-                user.last_login = datetime.now().strftime("%Y-%m-%d %H:%M")
-                db.commit()
-
-                session['logged_in'] = True
-                session['username'] = user.username
-                session['full_name'] = user.full_name or ''
-                session['role'] = user.role
-                session['team_id'] = user.team_id
-                session['player_order'] = json.loads(user.player_order or "[]")
-                session.permanent = True
-                flash('You were successfully logged in.', 'success')
-                return redirect(url_for('home'))
-            else:
-                flash('Invalid username or password.', 'danger')
-        finally:
-            db.close()
+        db = get_db()
+        username = request.form['username']
+        password = request.form['password']
+
+        user = db.query(User).filter(func.lower(User.username) == func.lower(username)).first()
+
+        if user and check_password_hash(user.password_hash, password):
+            if user.username.lower() == 'mike1825':
+                user.role = 'Super Admin'
+            elif user.role == 'Admin':
+                user.role = 'Head Coach'
+            elif user.role == 'Coach':
+                user.role = 'Assistant Coach'
+
+            user.last_login = datetime.now()
+            db.commit()
+
+            session['logged_in'] = True
+            session['username'] = user.username
+            session['full_name'] = user.full_name or ''
+            session['role'] = user.role
+            session['team_id'] = user.team_id
+            session.permanent = True
+            flash('You were successfully logged in.', 'success')
+            return redirect(url_for('home'))
+        else:
+            flash('Invalid username or password.', 'danger')
     return render_template('login.html')
 
 @app.route('/logout')
@@ -156,7 +272,7 @@ def logout():
 def register():
     """Handles user registration. Users can only join an existing team."""
     if request.method == 'POST':
-        db = SessionLocal()
+        db = get_db()
         try:
             username = request.form.get('username')
             full_name = request.form.get('full_name')
@@ -190,18 +306,17 @@ def register():
                 password_hash=hashed_password,
                 role=user_role,
                 team_id=team.id,
-                tab_order=json.dumps(default_tab_keys),
-                player_order=json.dumps([])
+                tab_order=default_tab_keys
             )
             db.add(new_user)
             db.commit()
+            team_metadata_cache.invalidate(team.id)
 
             session['logged_in'] = True
             session['username'] = new_user.username
             session['full_name'] = new_user.full_name
             session['role'] = new_user.role
             session['team_id'] = new_user.team_id
-            session['player_order'] = []
             session.permanent = True
 
             flash(f'Registration successful! You have joined team "{team.team_name}". Welcome.', 'success')
@@ -211,8 +326,6 @@ def register():
             db.rollback()
             print(f"Registration Error: {e}")
             flash('An error occurred during registration. Please try again.', 'danger')
-        finally:
-            db.close()
 
     registration_code = request.args.get('code', '')
     return render_template('register.html', registration_code=registration_code)
@@ -221,273 +334,70 @@ def register():
 @app.route('/change_password', methods=['GET', 'POST'])
 @login_required
 def change_password():
-    db = SessionLocal()
-    try:
-        if request.method == 'POST':
-            current_password = request.form.get('current_password')
-            new_password = request.form.get('new_password')
-            confirm_new_password = request.form.get('confirm_new_password')
-
-            user = db.query(User).filter_by(username=session['username']).first()
-
-            if not user or not check_password_hash(user.password_hash, current_password):
-                flash('Your current password was incorrect.', 'danger')
-                return redirect(url_for('change_password'))
-            if new_password != confirm_new_password:
-                flash('New passwords do not match.', 'danger')
-                return redirect(url_for('change_password'))
-            if len(new_password) < 4:
-                flash('New password must be at least 4 characters long.', 'danger')
-                return redirect(url_for('change_password'))
-
-            user.password_hash = generate_password_hash(new_password)
-            db.commit()
+    db = get_db()
+    if request.method == 'POST':
+        current_password = request.form.get('current_password')
+        new_password = request.form.get('new_password')
+        confirm_new_password = request.form.get('confirm_new_password')
 
-            flash('Your password has been updated successfully!', 'success')
-            return redirect(url_for('home'))
-        return render_template('change_password.html')
-    finally:
-        db.close()
+        user = db.query(User).filter_by(username=session['username']).first()
+
+        if not user or not check_password_hash(user.password_hash, current_password):
+            flash('Your current password was incorrect.', 'danger')
+            return redirect(url_for('change_password'))
+        if new_password != confirm_new_password:
+            flash('New passwords do not match.', 'danger')
+            return redirect(url_for('change_password'))
+        if len(new_password) < 4:
+            flash('New password must be at least 4 characters long.', 'danger')
+            return redirect(url_for('change_password'))
+
+        user.password_hash = generate_password_hash(new_password)
+        db.commit()
+
+        flash('Your password has been updated successfully!', 'success')
+        return redirect(url_for('home'))
+    return render_template('change_password.html')
 
 @app.route('/rules')
 @login_required
 def pitching_rules():
     return render_template('rules.html')
 
-def get_required_rest_days(pitches):
-    if pitches >= 66: return 4
-    elif pitches >= 51: return 3
-    elif pitches >= 36: return 2
-    elif pitches >= 21: return 1
-    else: return 0
-
-def calculate_pitcher_availability(pitcher_name, all_outings):
-    today = date.today()
-    most_recent_outing = None
-    for outing in all_outings:
-        if outing.pitcher == pitcher_name:
-            try:
-                outing_date = datetime.strptime(outing.date, '%Y-%m-%d').date()
-                if most_recent_outing is None or outing_date > most_recent_outing['date']:
-                    most_recent_outing = {'date': outing_date, 'pitches': int(outing.pitches)}
-            except (ValueError, TypeError): continue
-    if not most_recent_outing:
-        return {'status': 'Available', 'next_available': 'Today'}
-    rest_days_needed = get_required_rest_days(most_recent_outing['pitches'])
-    next_available_date = most_recent_outing['date'] + timedelta(days=rest_days_needed + 1)
-    if today >= next_available_date:
-        return {'status': 'Available', 'next_available': 'Today'}
-    else:
-        return {'status': 'Resting', 'next_available': next_available_date.strftime('%Y-%m-%d')}
-
-def calculate_pitch_counts(pitcher_name, all_outings):
-    today = date.today()
-    current_year = today.year
-    start_of_week = today - timedelta(days=today.weekday())
-    counts = {'daily': 0, 'weekly': 0, 'cumulative_year': 0}
-    for outing in all_outings:
-        if outing.pitcher == pitcher_name:
-            try:
-                outing_date = datetime.strptime(outing.date, '%Y-%m-%d').date()
-                pitches = int(outing.pitches)
-                if outing_date.year == current_year:
-                    counts['cumulative_year'] += pitches
-                if outing_date >= start_of_week:
-                    counts['weekly'] += pitches
-                if outing_date == today:
-                    counts['daily'] += pitches
-            except (ValueError, TypeError): continue
-    return counts
-
-def calculate_cumulative_pitching_stats(pitcher_name, all_outings):
-    """
-    Calculates cumulative pitching statistics for a given pitcher.
-    Args:
-        pitcher_name (str): The name of the pitcher.
-        all_outings (list): A list of all PitchingOuting objects.
-    Returns:
-        dict: A dictionary containing total innings pitched, total pitches thrown, and appearances.
-    """
-    total_innings = 0.0
-    total_pitches = 0
-    appearances = 0
-
-    for outing in all_outings:
-        if outing.pitcher == pitcher_name:
-            try:
-                # Ensure innings are treated as float and pitches as int
-                innings = float(outing.innings) if outing.innings is not None else 0.0
-                pitches = int(outing.pitches) if outing.pitches is not None else 0
-
-                total_innings += innings
-                total_pitches += pitches
-                appearances += 1
-            except (ValueError, TypeError):
-                # Handle cases where data might be malformed, skip the outing
-                continue
-    return {
-        'total_innings_pitched': round(total_innings, 1), # Round to 1 decimal place for display
-        'total_pitches_thrown': total_pitches,
-        'appearances': appearances
-    }
-
-def calculate_cumulative_position_stats(roster_players, lineups):
-    """
-    Calculates cumulative games played at each position for all players.
-    Args:
-        roster_players (list): List of Player objects.
-        lineups (list): List of Lineup objects.
-    Returns:
-        dict: A dictionary where keys are player names and values are
-              dictionaries of positions and counts (games played at that position).
-    """
-    player_position_stats = {}
-    for player in roster_players:
-        player_position_stats[player.name] = {}
-
-    for lineup in lineups:
-        try:
-            lineup_positions = json.loads(lineup.lineup_positions or "[]")
-            for item in lineup_positions:
-                player_name = item.get('name')
-                position = item.get('position')
-                if player_name and position:
-                    if player_name in player_position_stats:
-                        player_position_stats[player_name][position] = player_position_stats[player_name].get(position, 0) + 1
-        except json.JSONDecodeError:
-            # Handle cases where lineup_positions might be malformed JSON
-            continue
-    return player_position_stats
-
-
 # --- MAIN AND ADMIN ROUTES ---
 @app.route('/')
 @login_required
+@query_budget(SNAPSHOT_QUERY_BUDGET)
 def home():
-    db = SessionLocal()
-    try:
-        user = db.query(User).filter_by(username=session['username'], team_id=session['team_id']).first()
-        if not user:
-            flash('User not found or not associated with a team.', 'danger')
-            return redirect(url_for('login'))
-
-        team_id = user.team_id
-
-        all_users = db.query(User).filter_by(team_id=team_id).all()
-        user_name_map = {u.username: (u.full_name or u.username) for u in all_users}
-        display_full_names = user.team.display_coach_names
-        def get_display_name(username):
-            if not username or username == 'N/A': return 'N/A'
-            return user_name_map.get(username, username) if display_full_names else username
-
-        roster_players = db.query(Player).filter_by(team_id=team_id).all()
-        lineups = db.query(Lineup).filter_by(team_id=team_id).all()
-        pitching_outings = db.query(PitchingOuting).filter_by(team_id=team_id).all()
-        scouted_committed = db.query(ScoutedPlayer).filter_by(team_id=team_id, list_type='committed').all()
-        scouted_targets = db.query(ScoutedPlayer).filter_by(team_id=team_id, list_type='targets').all()
-        scouted_not_interested = db.query(ScoutedPlayer).filter_by(team_id=team_id, list_type='not_interested').all()
-        rotations = db.query(Rotation).filter_by(team_id=team_id).all()
-        games = db.query(Game).filter_by(team_id=team_id).all()
-        collaboration_player_notes = db.query(CollaborationNote).filter_by(team_id=team_id, note_type='player_notes').all()
-        collaboration_team_notes = db.query(CollaborationNote).filter_by(team_id=team_id, note_type='team_notes').all()
-        practice_plans = db.query(PracticePlan).filter_by(team_id=team_id).order_by(PracticePlan.date.desc()).all()
-        signs = db.query(Sign).filter_by(team_id=team_id).all()
-
-        player_activity_log = {}
-        for player in roster_players:
-            log_entries = []
-            for focus in player.development_focuses:
-                log_entries.append({'type': 'Development', 'subtype': focus.skill_type, 'date': focus.created_date, 'timestamp': focus.created_date, 'text': f"New Focus: {focus.focus}", 'notes': focus.notes, 'author': get_display_name(focus.author), 'status': focus.status, 'id': focus.id})
-                if focus.status == 'completed' and focus.completed_date:
-                     log_entries.append({'type': 'Development', 'subtype': focus.skill_type, 'date': focus.completed_date, 'timestamp': focus.completed_date, 'text': f"Completed: {focus.focus}", 'notes': focus.notes, 'author': get_display_name(focus.last_edited_by or focus.author), 'status': focus.status, 'id': focus.id})
-            for note in collaboration_player_notes:
-                if note.player_name == player.name:
-                    ts_str = note.timestamp.split(' ')[0] if note.timestamp else 'N/A'
-                    log_entries.append({'type': 'Coach Note', 'subtype': 'Player Log', 'date': ts_str, 'timestamp': note.timestamp or '1970-01-01 00:00', 'text': note.text, 'notes': None, 'author': get_display_name(note.author), 'status': 'active', 'id': note.id})
-            if player.has_lessons == 'Yes' and player.lesson_focus:
-                 log_entries.append({'type': 'Lessons', 'subtype': 'Private Instruction', 'date': player.notes_timestamp.split(' ')[0] if player.notes_timestamp else 'N/A', 'timestamp': player.notes_timestamp or '1970-01-01 00:00', 'text': f"Lesson Focus: {player.lesson_focus}", 'notes': None, 'author': 'N/A', 'status': 'active', 'id': player.id})
-
-            player_activity_log[player.name] = sorted(log_entries, key=lambda x: x['timestamp'], reverse=True)
-
-        # Sanitize pitching data to prevent JSON errors with non-finite numbers
-        clean_pitching_outings = []
-        for po in pitching_outings:
-            innings = float(po.innings) if po.innings is not None else 0.0
-            if not math.isfinite(innings):
-                innings = 0.0
-            clean_pitching_outings.append({
-                "id": po.id, "date": po.date, "pitcher": po.pitcher,
-                "opponent": po.opponent, "pitches": po.pitches, "innings": innings,
-                "pitcher_type": po.pitcher_type, "outing_type": po.outing_type
-            })
-
-        app_data = {
-            "roster": [{"name": p.name, "number": p.number, "position1": p.position1, "position2": p.position2, "position3": p.position3, "throws": p.throws, "bats": p.bats, "notes": p.notes, "pitcher_role": p.pitcher_role, "has_lessons": p.has_lessons, "lesson_focus": p.lesson_focus, "notes_author": get_display_name(p.notes_author), "notes_timestamp": p.notes_timestamp, "id": p.id} for p in roster_players],
-            "lineups": [{"id": l.id, "title": l.title, "lineup_positions": json.loads(l.lineup_positions or "[]"), "associated_game_id": l.associated_game_id} for l in lineups],
-            "pitching": clean_pitching_outings,
-            "scouting_list": {
-                "committed": [{"id": sp.id, "name": sp.name, "position1": sp.position1, "position2": sp.position2, "throws": sp.throws, "bats": sp.bats} for sp in scouted_committed],
-                "targets": [{"id": sp.id, "name": sp.name, "position1": sp.position1, "position2": sp.position2, "throws": sp.throws, "bats": sp.bats} for sp in scouted_targets],
-                "not_interested": [{"id": sp.id, "name": sp.name, "position1": sp.position1, "position2": sp.position2, "throws": sp.throws, "bats": sp.bats} for sp in scouted_not_interested]
-            },
-            "rotations": [{"id": r.id, "title": r.title, "innings": json.loads(r.innings or "{}"), "associated_game_id": r.associated_game_id} for r in rotations],
-            "games": [{"id": g.id, "date": g.date, "opponent": g.opponent, "location": g.location, "game_notes": g.game_notes, "associated_lineup_title": g.associated_lineup_title, "associated_rotation_date": g.associated_rotation_date} for g in games],
-            "settings": {"registration_code": user.team.registration_code, "team_name": user.team.team_name},
-            "collaboration_notes": {
-                "player_notes": [{"id": cn.id, "text": cn.text, "author": get_display_name(cn.author), "timestamp": cn.timestamp, "player_name": cn.player_name} for cn in collaboration_player_notes],
-                "team_notes": [{"id": cn.id, "text": cn.text, "author": get_display_name(cn.author), "timestamp": cn.timestamp} for cn in collaboration_team_notes]
-            },
-            "practice_plans": [{"id": pp.id, "date": pp.date, "general_notes": pp.general_notes, "tasks": [{"id": pt.id, "text": pt.text, "status": pt.status, "author": get_display_name(pt.author), "timestamp": pt.timestamp } for pt in pp.tasks]} for pp in practice_plans],
-            "player_development": player_activity_log,
-            "signs": [{"id": s.id, "name": s.name, "indicator": s.indicator} for s in signs]
-        }
-
-        all_tabs = {'roster': 'Roster', 'player_development': 'Player Development', 'lineups': 'Lineups', 'pitching': 'Pitching Log', 'scouting_list': 'Scouting List', 'rotations': 'Rotations', 'games': 'Games', 'collaboration': 'Coaches Log', 'practice_plan': 'Practice Plan', 'signs': 'Signs'}
-        default_tab_keys = list(all_tabs.keys())
-        user_tab_order = json.loads(user.tab_order or "[]") if user.tab_order else default_tab_keys
-        for key in default_tab_keys:
-            if key not in user_tab_order and key in all_tabs: user_tab_order.append(key)
-        user_tab_order = [key for key in user_tab_order if key in all_tabs]
-
-        all_players_for_count = roster_players + scouted_committed + scouted_targets
-        position_counts = {}
-        for player in all_players_for_count:
-            pos = player.position1
-            if pos: position_counts[pos] = position_counts.get(pos, 0) + 1
-
-        pitcher_names = sorted(list(set(po['pitcher'] for po in clean_pitching_outings if po['pitcher'])))
-        pitch_count_summary = {}
-        for name in pitcher_names:
-            counts = calculate_pitch_counts(name, pitching_outings)
-            availability = calculate_pitcher_availability(name, pitching_outings)
-            cumulative_stats = calculate_cumulative_pitching_stats(name, pitching_outings)
-            pitch_count_summary[name] = {**counts, **availability, **cumulative_stats}
-            
-        current_team = db.query(Team).filter_by(id=session['team_id']).first()
-
-        # Calculate cumulative pitching stats for all pitchers (for stats.html)
-        pitcher_names_for_stats = sorted(list(set(po.pitcher for po in pitching_outings if po.pitcher)))
-        cumulative_pitching_data = {}
-        for name in pitcher_names_for_stats:
-            cumulative_pitching_data[name] = calculate_cumulative_pitching_stats(name, pitching_outings)
-
-        # Calculate cumulative position stats for all players (for stats.html)
-        cumulative_position_data = calculate_cumulative_position_stats(roster_players, lineups)
-
-        return render_template('index.html',
-                               data=app_data,
-                               session=session,
-                               tab_order=user_tab_order,
-                               all_tabs=all_tabs,
-                               position_counts=position_counts,
-                               pitch_count_summary=pitch_count_summary,
-                               current_team=current_team,
-                               # Pass the new stats data to index.html
-                               roster_players=roster_players,
-                               cumulative_pitching_data=cumulative_pitching_data,
-                               cumulative_position_data=cumulative_position_data)
-    finally:
-        db.close()
+    db = get_db()
+    user = db.query(User).filter_by(username=session['username'], team_id=session['team_id']).first()
+    if not user:
+        flash('User not found or not associated with a team.', 'danger')
+        return redirect(url_for('login'))
+
+    snapshot = get_team_snapshot(db, user.team)
+
+    all_tabs = {'roster': 'Roster', 'player_development': 'Player Development', 'lineups': 'Lineups', 'pitching': 'Pitching Log', 'scouting_list': 'Scouting List', 'rotations': 'Rotations', 'games': 'Games', 'collaboration': 'Coaches Log', 'practice_plan': 'Practice Plan', 'signs': 'Signs'}
+    default_tab_keys = list(all_tabs.keys())
+    user_tab_order = list(user.tab_order or default_tab_keys)
+    for key in default_tab_keys:
+        if key not in user_tab_order and key in all_tabs: user_tab_order.append(key)
+    user_tab_order = [key for key in user_tab_order if key in all_tabs]
+
+    return render_template('index.html',
+                           data=snapshot['full_data'],
+                           session=session,
+                           tab_order=user_tab_order,
+                           all_tabs=all_tabs,
+                           position_counts=snapshot['position_counts'],
+                           pitch_count_summary=snapshot['pitch_count_summary'],
+                           current_team=user.team,
+                           # Pass the new stats data to index.html
+                           roster_players=snapshot['full_data']['roster'],
+                           cumulative_pitching_data=snapshot['cumulative_pitching_data'],
+                           cumulative_position_data=snapshot['cumulative_position_data'],
+                           # Hydrates AppState directly, so the page doesn't have to call /get_app_data on load
+                           app_state=build_client_state(snapshot, player_order.query_player_order(db, user.id, user.team_id)))
 
 @app.route('/manifest.json')
 def serve_manifest():
@@ -499,210 +409,175 @@ def serve_sw():
 
 @app.route('/get_app_data')
 @login_required
+@query_budget(SNAPSHOT_QUERY_BUDGET)
 def get_app_data():
-    db = SessionLocal()
-    try:
-        user = db.query(User).filter_by(username=session['username'], team_id=session['team_id']).first()
-        if not user:
-            return jsonify({'status': 'error', 'message': 'User not found or not associated with a team.'}), 404
-        team_id = user.team_id
-        all_users = db.query(User).filter_by(team_id=team_id).all()
-        user_name_map = {u.username: (u.full_name or u.username) for u in all_users}
-        display_full_names = user.team.display_coach_names
-        def get_display_name(username):
-            if not username or username == 'N/A': return 'N/A'
-            return user_name_map.get(username, username) if display_full_names else username
-
-        roster_players = db.query(Player).filter_by(team_id=team_id).all()
-        lineups = db.query(Lineup).filter_by(team_id=team_id).all()
-        pitching_outings = db.query(PitchingOuting).filter_by(team_id=team_id).all()
-        scouted_committed = db.query(ScoutedPlayer).filter_by(team_id=team_id, list_type='committed').all()
-        scouted_targets = db.query(ScoutedPlayer).filter_by(team_id=team_id, list_type='targets').all()
-        scouted_not_interested = db.query(ScoutedPlayer).filter_by(team_id=team_id, list_type='not_interested').all()
-        rotations = db.query(Rotation).filter_by(team_id=team_id).all()
-        games = db.query(Game).filter_by(team_id=team_id).all()
-        collaboration_player_notes = db.query(CollaborationNote).filter_by(team_id=team_id, note_type='player_notes').all()
-        collaboration_team_notes = db.query(CollaborationNote).filter_by(team_id=team_id, note_type='team_notes').all()
-        practice_plans = db.query(PracticePlan).filter_by(team_id=team_id).order_by(PracticePlan.date.desc()).all()
-        signs = db.query(Sign).filter_by(team_id=team_id).all()
-
-        player_activity_log = {}
-        for player in roster_players:
-            log_entries = []
-            for focus in player.development_focuses:
-                log_entries.append({'type': 'Development', 'subtype': focus.skill_type, 'date': focus.created_date, 'timestamp': focus.created_date, 'text': f"New Focus: {focus.focus}", 'notes': focus.notes, 'author': get_display_name(focus.author), 'status': focus.status, 'id': focus.id})
-                if focus.status == 'completed' and focus.completed_date:
-                     log_entries.append({'type': 'Development', 'subtype': focus.skill_type, 'date': focus.completed_date, 'timestamp': focus.completed_date, 'text': f"Completed: {focus.focus}", 'notes': focus.notes, 'author': get_display_name(focus.last_edited_by or focus.author), 'status': focus.status, 'id': focus.id})
-            for note in collaboration_player_notes:
-                if note.player_name == player.name:
-                    ts_str = note.timestamp.split(' ')[0] if note.timestamp else 'N/A'
-                    log_entries.append({'type': 'Coach Note', 'subtype': 'Player Log', 'date': ts_str, 'timestamp': note.timestamp or '1970-01-01 00:00', 'text': note.text, 'notes': None, 'author': get_display_name(note.author), 'status': 'active', 'id': note.id})
-            if player.has_lessons == 'Yes' and player.lesson_focus:
-                 log_entries.append({'type': 'Lessons', 'subtype': 'Private Instruction', 'date': player.notes_timestamp.split(' ')[0] if player.notes_timestamp else 'N/A', 'timestamp': player.notes_timestamp or '1970-01-01 00:00', 'text': f"Lesson Focus: {player.lesson_focus}", 'notes': None, 'author': 'N/A', 'status': 'active', 'id': player.id})
-
-            player_activity_log[player.name] = sorted(log_entries, key=lambda x: x['timestamp'], reverse=True)
-
-        # Sanitize pitching data to prevent JSON errors with non-finite numbers
-        clean_pitching_outings = []
-        for po in pitching_outings:
-            innings = float(po.innings) if po.innings is not None else 0.0
-            if not math.isfinite(innings):
-                innings = 0.0
-            clean_pitching_outings.append({
-                "id": po.id, "date": po.date, "pitcher": po.pitcher,
-                "opponent": po.opponent, "pitches": po.pitches, "innings": innings,
-                "pitcher_type": po.pitcher_type, "outing_type": po.outing_type
-            })
-
-        app_data = {
-            'roster': [{"name": p.name, "number": p.number, "position1": p.position1, "position2": p.position2, "position3": p.position3, "throws": p.throws, "bats": p.bats, "notes": p.notes, "pitcher_role": p.pitcher_role, "has_lessons": p.has_lessons, "lesson_focus": p.lesson_focus, "notes_author": get_display_name(p.notes_author), "notes_timestamp": p.notes_timestamp, "id": p.id} for p in roster_players],
-            'lineups': [{"id": l.id, "title": l.title, "lineup_positions": json.loads(l.lineup_positions or "[]"), "associated_game_id": l.associated_game_id} for l in lineups],
-            'pitching': clean_pitching_outings,
-            'scouting_list': {
-                "committed": [{"id": sp.id, "name": sp.name, "position1": sp.position1, "position2": sp.position2, "throws": sp.throws, "bats": sp.bats} for sp in scouted_committed],
-                "targets": [{"id": sp.id, "name": sp.name, "position1": sp.position1, "position2": sp.position2, "throws": sp.throws, "bats": sp.bats} for sp in scouted_targets],
-                "not_interested": [{"id": sp.id, "name": sp.name, "position1": sp.position1, "position2": sp.position2, "throws": sp.throws, "bats": sp.bats} for sp in scouted_not_interested]
-            },
-            'rotations': [{"id": r.id, "title": r.title, "innings": json.loads(r.innings or "{}"), "associated_game_id": r.associated_game_id} for r in rotations],
-            'games': [{"id": g.id, "date": g.date, "opponent": g.opponent, "location": g.location, "game_notes": g.game_notes, "associated_lineup_title": g.associated_lineup_title, "associated_rotation_date": g.associated_rotation_date} for g in games],
-            'settings': {'registration_code': user.team.registration_code, 'team_name': user.team.team_name},
-            'collaboration_notes': {
-                'player_notes': [{"id": cn.id, "text": cn.text, "author": get_display_name(cn.author), "timestamp": cn.timestamp, "player_name": cn.player_name} for cn in collaboration_player_notes],
-                'team_notes': [{"id": cn.id, "text": cn.text, "author": get_display_name(cn.author), "timestamp": cn.timestamp} for cn in collaboration_team_notes]
-            },
-            'practice_plans': [{"id": pp.id, "date": pp.date, "general_notes": pp.general_notes, "tasks": [{"id": pt.id, "text": pt.text, "status": pt.status, "author": get_display_name(pt.author), "timestamp": pt.timestamp } for pt in pp.tasks]} for pp in practice_plans],
-            'player_development': player_activity_log,
-            'signs': [{"id": s.id, "name": s.name, "indicator": s.indicator} for s in signs]
-        }
-
-        player_order = session.get('player_order', [p['name'] for p in app_data.get('roster', [])])
-
-        pitcher_names = sorted(list(set(po['pitcher'] for po in clean_pitching_outings if po['pitcher'])))
-        pitch_count_summary = {}
-        for name in pitcher_names:
-            counts = calculate_pitch_counts(name, pitching_outings)
-            availability = calculate_pitcher_availability(name, pitching_outings)
-            cumulative_stats = calculate_cumulative_pitching_stats(name, pitching_outings)
-            pitch_count_summary[name] = {**counts, **availability, **cumulative_stats}
-
-        app_data_response = {'full_data': app_data, 'player_order': player_order, 'session': {'username': session.get('username'), 'role': session.get('role'), 'full_name': session.get('full_name')}, 'pitch_count_summary': pitch_count_summary}
-        return jsonify(app_data_response)
-    finally:
-        db.close()
+    db = get_db()
+    user = db.query(User).filter_by(username=session['username'], team_id=session['team_id']).first()
+    if not user:
+        return jsonify({'status': 'error', 'message': 'User not found or not associated with a team.'}), 404
+    # Clients that already hold a snapshot ask for ?since=<version> and only get what changed.
+    since = request.args.get('since', type=int)
+    if since is not None:
+        delta = delta_sync.build_delta(db, user.team, since)
+        if delta is not None:
+            delta['player_order'] = player_order.query_player_order(db, user.id, user.team_id)
+            delta['session'] = client_session_info()
+            return jsonify(delta)
+
+    snapshot = get_team_snapshot(db, user.team)
+    return jsonify(build_client_state(snapshot, player_order.query_player_order(db, user.id, user.team_id)))
 
 # NEW ROUTE: Cumulative Stats Page
 @app.route('/stats')
 @login_required
+@query_budget(SNAPSHOT_QUERY_BUDGET)
 def stats_page():
-    db = SessionLocal()
-    try:
-        team_id = session['team_id']
-        roster_players = db.query(Player).filter_by(team_id=team_id).all()
-        lineups = db.query(Lineup).filter_by(team_id=team_id).all()
-        pitching_outings = db.query(PitchingOuting).filter_by(team_id=team_id).all()
-
-        # Calculate cumulative pitching stats for all pitchers
-        pitcher_names = sorted(list(set(po.pitcher for po in pitching_outings if po.pitcher)))
-        cumulative_pitching_data = {}
-        for name in pitcher_names:
-            cumulative_pitching_data[name] = calculate_cumulative_pitching_stats(name, pitching_outings)
-
-        # Calculate cumulative position stats for all players
-        cumulative_position_data = calculate_cumulative_position_stats(roster_players, lineups)
-
-        return render_template('stats.html',
-                               roster_players=roster_players,
-                               cumulative_pitching_data=cumulative_pitching_data,
-                               cumulative_position_data=cumulative_position_data,
-                               session=session)
-    finally:
-        db.close()
+    db = get_db()
+    team = db.query(Team).filter_by(id=session['team_id']).first()
+    snapshot = get_team_snapshot(db, team)
+    return render_template('stats.html',
+                           roster_players=snapshot['full_data']['roster'],
+                           cumulative_pitching_data=snapshot['cumulative_pitching_data'],
+                           cumulative_position_data=snapshot['cumulative_position_data'],
+                           session=session)
+
+@app.route('/playing_time')
+@login_required
+def playing_time():
+    """
+    Innings on the field and on the bench and positions played per roster player, summed over
+    the rotation for ?game_id=, the rotations of games between ?start= and ?end= (YYYY-MM-DD),
+    or every saved rotation.
+    """
+    db = get_db()
+    game_id = request.args.get('game_id', type=int)
+    start, end = parse_date(request.args.get('start')), parse_date(request.args.get('end'))
+    if (request.args.get('start') and start is None) or (request.args.get('end') and end is None):
+        return jsonify({'status': 'error', 'message': 'Dates must be in YYYY-MM-DD format.'}), 400
+    roster_players = db.query(Player.id, Player.name).filter(Player.team_id == session['team_id']).order_by(Player.id).all()
+    rotation_ids = rotation_assignments.rotations_select(session['team_id'], game_id=game_id, start=start, end=end)
+    return jsonify(rotation_assignments.query_playing_time(db, roster_players, rotation_ids))
+
+@app.route('/player_activity/<int:player_id>')
+@login_required
+def player_timeline(player_id):
+    """
+    One page of a player's development timeline, newest first. ?limit= sets the page size;
+    pass the returned next_cursor as ?cursor= for the next page.
+    """
+    db = get_db()
+    player = db.query(Player).filter_by(id=player_id, team_id=session['team_id']).first()
+    if not player:
+        return jsonify({'status': 'error', 'message': 'Player not found.'}), 404
+    limit = request.args.get('limit', player_activity.TIMELINE_PAGE_SIZE, type=int)
+    cursor = player_activity.parse_cursor(request.args['cursor']) if 'cursor' in request.args else None
+    if not 1 <= limit <= player_activity.TIMELINE_MAX_PAGE_SIZE or ('cursor' in request.args and cursor is None):
+        return jsonify({'status': 'error', 'message': f'limit must be between 1 and {player_activity.TIMELINE_MAX_PAGE_SIZE} and cursor a next_cursor value.'}), 400
+    team = db.query(Team).filter_by(id=session['team_id']).first()
+    get_display_name = make_display_name_resolver(db, team)
+    return jsonify(player_activity.query_player_timeline(db, session['team_id'], player, get_display_name, limit=limit, cursor=cursor))
+
+@app.route('/search')
+@login_required
+def search():
+    """
+    Searches the team's notes, development focuses, practice tasks, game notes and player
+    notes for ?q=, best match first, ?per_page= hits per ?page=.
+    """
+    db = get_db()
+    page = request.args.get('page', 1, type=int)
+    per_page = request.args.get('per_page', team_search.SEARCH_PAGE_SIZE, type=int)
+    if page < 1 or not 1 <= per_page <= team_search.SEARCH_MAX_PAGE_SIZE:
+        return jsonify({'status': 'error', 'message': f'page must be at least 1 and per_page between 1 and {team_search.SEARCH_MAX_PAGE_SIZE}.'}), 400
+    return jsonify(team_search.search_team(db, session['team_id'], request.args.get('q', ''), page=page, per_page=per_page))
 
 @app.route('/save_tab_order', methods=['POST'])
 @login_required
 def save_tab_order():
-    db = SessionLocal()
-    try:
-        user = db.query(User).filter_by(username=session['username']).first()
-        if not user: return jsonify({'status': 'error', 'message': 'User not found'}), 404
-        new_order = request.json.get('order')
-        if not isinstance(new_order, list): return jsonify({'status': 'error', 'message': 'Invalid order format'}), 400
-        user.tab_order = json.dumps(new_order)
-        db.commit()
-        socketio.emit('data_updated', {'message': 'Tab order updated.'})
-        return jsonify({'status': 'success', 'message': 'Tab order saved.'})
-    finally:
-        db.close()
+    db = get_db()
+    user = db.query(User).filter_by(username=session['username']).first()
+    if not user: return jsonify({'status': 'error', 'message': 'User not found'}), 404
+    new_order = request.json.get('order')
+    if not isinstance(new_order, list): return jsonify({'status': 'error', 'message': 'Invalid order format'}), 400
+    user.tab_order = new_order
+    db.commit()
+    notify_team_data_changed(session['team_id'], 'Tab order updated.')
+    return jsonify({'status': 'success', 'message': 'Tab order saved.'})
+
+@app.route('/admin/metrics')
+@admin_required
+def admin_metrics():
+    return jsonify({
+        'snapshot_cache': snapshot_cache.stats(),
+        'data_updated_events': team_notifier.stats(),
+        'db_executor': db_executor.stats(),
+        'team_metadata': team_metadata_cache.stats(),
+        'json_encoder': 'orjson' if app.config['FAST_JSON'] else 'stdlib',
+    })
 
 @app.route('/admin/users')
 @admin_required
 def user_management():
-    db = SessionLocal()
-    try:
-        teams = []
-        if session.get('role') == 'Super Admin':
-            users = db.query(User).options(joinedload(User.team)).all()
-            teams = db.query(Team).options(joinedload(Team.users)).order_by(Team.team_name).all()
-        else:
-            users = db.query(User).filter_by(team_id=session['team_id']).options(joinedload(User.team)).all()
+    db = get_db()
+    teams = []
+    if session.get('role') == 'Super Admin':
+        users = db.query(User).options(joinedload(User.team)).all()
+        teams = db.query(Team).options(joinedload(Team.users)).order_by(Team.team_name).all()
+    else:
+        users = db.query(User).filter_by(team_id=session['team_id']).options(joinedload(User.team)).all()
 
-        return render_template('user_management.html', users=users, teams=teams, session=session)
-    finally:
-        db.close()
+    return render_template('user_management.html', users=users, teams=teams, session=session)
 
 @app.route('/admin/add_user', methods=['POST'])
 @admin_required
 def add_user():
-    db = SessionLocal()
-    try:
-        username = request.form.get('username')
-        password = request.form.get('password')
-        full_name = request.form.get('full_name')
-        role = request.form.get('role', 'Assistant Coach')
-
-        # Determine the correct team ID
-        team_id_for_new_user = None
-        if session.get('role') == 'Super Admin':
-            form_team_id = request.form.get('team_id')
-            if not form_team_id:
-                flash('Super Admins must select a team for the new user.', 'danger')
-                return redirect(url_for('user_management'))
-            team_id_for_new_user = int(form_team_id)
-        else:
-            team_id_for_new_user = session['team_id']
-
-        if not username or not password:
-            flash('Username and password are required.', 'danger')
-            return redirect(url_for('user_management'))
-        if db.query(User).filter(func.lower(User.username) == func.lower(username)).first():
-            flash('Username already exists.', 'danger')
-            return redirect(url_for('user_management'))
-
-        if role == 'Super Admin' and session.get('role') != 'Super Admin':
-            flash('Only a Super Admin can create another Super Admin.', 'danger')
+    db = get_db()
+    username = request.form.get('username')
+    password = request.form.get('password')
+    full_name = request.form.get('full_name')
+    role = request.form.get('role', 'Assistant Coach')
+
+    # Determine the correct team ID
+    team_id_for_new_user = None
+    if session.get('role') == 'Super Admin':
+        form_team_id = request.form.get('team_id')
+        if not form_team_id:
+            flash('Super Admins must select a team for the new user.', 'danger')
             return redirect(url_for('user_management'))
+        team_id_for_new_user = int(form_team_id)
+    else:
+        team_id_for_new_user = session['team_id']
 
-        hashed_password = generate_password_hash(password)
-        default_tab_keys = ['roster', 'lineups', 'pitching', 'scouting_list', 'rotations', 'games', 'collaboration', 'practice_plan']
-
-        new_user = User(
-            username=username,
-            full_name=full_name,
-            password_hash=hashed_password,
-            role=role,
-            tab_order=json.dumps(default_tab_keys),
-            last_login='Never',
-            team_id=team_id_for_new_user
-        )
-        db.add(new_user)
-        db.commit()
+    if not username or not password:
+        flash('Username and password are required.', 'danger')
+        return redirect(url_for('user_management'))
+    if db.query(User).filter(func.lower(User.username) == func.lower(username)).first():
+        flash('Username already exists.', 'danger')
+        return redirect(url_for('user_management'))
 
-        team_name = db.query(Team).filter_by(id=team_id_for_new_user).first().team_name
-        flash(f"User '{username}' created successfully for team '{team_name}'.", 'success')
-        socketio.emit('data_updated', {'message': 'A new user was added.'})
+    if role == 'Super Admin' and session.get('role') != 'Super Admin':
+        flash('Only a Super Admin can create another Super Admin.', 'danger')
         return redirect(url_for('user_management'))
-    finally:
-        db.close()
+
+    hashed_password = generate_password_hash(password)
+    default_tab_keys = ['roster', 'lineups', 'pitching', 'scouting_list', 'rotations', 'games', 'collaboration', 'practice_plan']
+
+    new_user = User(
+        username=username,
+        full_name=full_name,
+        password_hash=hashed_password,
+        role=role,
+        tab_order=default_tab_keys,
+        team_id=team_id_for_new_user
+    )
+    db.add(new_user)
+    db.commit()
+    team_metadata_cache.invalidate(team_id_for_new_user)
+
+    team_name = db.query(Team).filter_by(id=team_id_for_new_user).first().team_name
+    flash(f"User '{username}' created successfully for team '{team_name}'.", 'success')
+    notify_team_data_changed(team_id_for_new_user, 'A new user was added.')
+    return redirect(url_for('user_management'))
 
 @app.route('/admin/create_team', methods=['POST'])
 @login_required
@@ -711,7 +586,7 @@ def create_team():
         flash('You do not have permission to perform this action.', 'danger')
         return redirect(url_for('user_management'))
 
-    db = SessionLocal()
+    db = get_db()
     try:
         team_name = request.form.get('team_name')
         if not team_name:
@@ -734,8 +609,6 @@ def create_team():
         print(f"Team Creation Error: {e}")
         flash('An error occurred while creating the team.', 'danger')
         return redirect(url_for('user_management'))
-    finally:
-        db.close()
 
 @app.route('/admin/delete_team/<int:team_id>')
 @login_required
@@ -744,210 +617,194 @@ def delete_team(team_id):
         flash('You do not have permission to perform this action.', 'danger')
         return redirect(url_for('user_management'))
 
-    db = SessionLocal()
-    try:
-        team_to_delete = db.query(Team).filter_by(id=team_id).first()
-
-        if not team_to_delete:
-            flash('Team not found.', 'danger')
-            return redirect(url_for('user_management'))
+    db = get_db()
+    team_to_delete = db.query(Team).filter_by(id=team_id).first()
 
-        if team_to_delete.id == session.get('team_id'):
-            flash('You cannot delete your own active team.', 'danger')
-            return redirect(url_for('user_management'))
+    if not team_to_delete:
+        flash('Team not found.', 'danger')
+        return redirect(url_for('user_management'))
 
-        user_count = db.query(User).filter_by(team_id=team_id).count()
-        if user_count > 0:
-            flash(f'Cannot delete team "{team_to_delete.team_name}" because it still has {user_count} user(s) assigned to it.', 'danger')
-            return redirect(url_for('user_management'))
+    if team_to_delete.id == session.get('team_id'):
+        flash('You cannot delete your own active team.', 'danger')
+        return redirect(url_for('user_management'))
 
-        flash(f'Successfully deleted team "{team_to_delete.team_name}".', 'success')
-        db.delete(team_to_delete)
-        db.commit()
-        socketio.emit('data_updated', {'message': f'Team {team_to_delete.team_name} deleted.'})
+    user_count = db.query(User).filter_by(team_id=team_id).count()
+    if user_count > 0:
+        flash(f'Cannot delete team "{team_to_delete.team_name}" because it still has {user_count} user(s) assigned to it.', 'danger')
         return redirect(url_for('user_management'))
 
-    finally:
-        db.close()
+    flash(f'Successfully deleted team "{team_to_delete.team_name}".', 'success')
+    db.delete(team_to_delete)
+    db.commit()
+    # The team had no users left, so there is nobody in its room to notify.
+    snapshot_cache.invalidate(team_id)
+    team_metadata_cache.invalidate(team_id)
+    team_notifier.forget(team_id)
+    return redirect(url_for('user_management'))
+
 
 @app.route('/admin/settings', methods=['GET'])
 @admin_required
 def admin_settings():
-    db = SessionLocal()
-    try:
-        team_settings = db.query(Team).filter_by(id=session['team_id']).first()
-        return render_template('admin_settings.html', session=session, settings=team_settings)
-    finally:
-        db.close()
+    db = get_db()
+    team_settings = db.query(Team).filter_by(id=session['team_id']).first()
+    return render_template('admin_settings.html', session=session, settings=team_settings)
 
 @app.route('/admin/settings/update', methods=['POST'])
 @admin_required
 def update_admin_settings():
-    db = SessionLocal()
-    try:
-        team_settings = db.query(Team).filter_by(id=session['team_id']).first()
-        if not team_settings:
-            flash('Team settings not found.', 'danger')
-            return redirect(url_for('admin_settings'))
+    db = get_db()
+    team_settings = db.query(Team).filter_by(id=session['team_id']).first()
+    if not team_settings:
+        flash('Team settings not found.', 'danger')
+        return redirect(url_for('admin_settings'))
 
-        team_settings.team_name = request.form.get('team_name', team_settings.team_name)
-        team_settings.display_coach_names = 'display_coach_names' in request.form
-        db.commit()
+    team_settings.team_name = request.form.get('team_name', team_settings.team_name)
+    team_settings.display_coach_names = 'display_coach_names' in request.form
+    db.commit()
+    team_metadata_cache.invalidate(team_settings.id)
 
-        flash('General settings updated successfully!', 'success')
-        socketio.emit('data_updated', {'message': 'Team settings updated.'})
-        return redirect(url_for('admin_settings'))
-    finally:
-        db.close()
+    flash('General settings updated successfully!', 'success')
+    notify_team_data_changed(session['team_id'], 'Team settings updated.')
+    return redirect(url_for('admin_settings'))
 
 @app.route('/admin/upload_logo', methods=['POST'])
 @admin_required
 def upload_logo():
-    db = SessionLocal()
-    try:
-        team = db.query(Team).filter_by(id=session['team_id']).first()
-        if not team:
-            flash('Your team could not be found.', 'danger')
-            return redirect(url_for('admin_settings'))
-
-        if 'logo' not in request.files:
-            flash('No file part in the request.', 'danger')
-            return redirect(url_for('admin_settings'))
-
-        file = request.files['logo']
-        if file.filename == '':
-            flash('No selected file.', 'danger')
-            return redirect(url_for('admin_settings'))
-
-        if file and allowed_file(file.filename):
-            filename = secure_filename(file.filename)
-            unique_id = uuid.uuid4().hex
-            file_ext = filename.rsplit('.', 1)[1].lower()
-            new_filename = f"{team.id}_{unique_id}.{file_ext}"
-
-            if team.logo_path:
-                old_logo_path = os.path.join(app.config['UPLOAD_FOLDER'], team.logo_path)
-                if os.path.exists(old_logo_path):
-                    os.remove(old_logo_path)
-
-            os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
-
-            file_path = os.path.join(app.config['UPLOAD_FOLDER'], new_filename)
-            file.save(file_path)
-            team.logo_path = new_filename
-            db.commit()
+    db = get_db()
+    team = db.query(Team).filter_by(id=session['team_id']).first()
+    if not team:
+        flash('Your team could not be found.', 'danger')
+        return redirect(url_for('admin_settings'))
 
-            flash('Team logo uploaded successfully!', 'success')
-            socketio.emit('data_updated', {'message': 'Team logo updated.'})
-        else:
-            flash('Invalid file type. Allowed types are: png, jpg, jpeg, gif, svg.', 'danger')
+    if 'logo' not in request.files:
+        flash('No file part in the request.', 'danger')
+        return redirect(url_for('admin_settings'))
 
+    file = request.files['logo']
+    if file.filename == '':
+        flash('No selected file.', 'danger')
         return redirect(url_for('admin_settings'))
-    finally:
-        db.close()
+
+    if file and allowed_file(file.filename):
+        filename = secure_filename(file.filename)
+        unique_id = uuid.uuid4().hex
+        file_ext = filename.rsplit('.', 1)[1].lower()
+        new_filename = f"{team.id}_{unique_id}.{file_ext}"
+
+        if team.logo_path:
+            old_logo_path = os.path.join(app.config['UPLOAD_FOLDER'], team.logo_path)
+            if os.path.exists(old_logo_path):
+                os.remove(old_logo_path)
+
+        os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
+
+        file_path = os.path.join(app.config['UPLOAD_FOLDER'], new_filename)
+        file.save(file_path)
+        team.logo_path = new_filename
+        db.commit()
+        team_metadata_cache.invalidate(team.id)
+
+        flash('Team logo uploaded successfully!', 'success')
+        notify_team_data_changed(session['team_id'], 'Team logo updated.')
+    else:
+        flash('Invalid file type. Allowed types are: png, jpg, jpeg, gif, svg.', 'danger')
+
+    return redirect(url_for('admin_settings'))
 
 
 @app.route('/admin/update_user_details/<username>', methods=['POST'])
 @admin_required
 def update_user_details(username):
-    db = SessionLocal()
-    try:
-        user_to_update = db.query(User).filter(func.lower(User.username) == func.lower(username)).first()
-        if not user_to_update:
-            flash('User not found.', 'danger')
-            return redirect(url_for('user_management'))
-        if session.get('role') == 'Head Coach' and user_to_update.team_id != session.get('team_id'):
-            flash('You do not have permission to edit this user.', 'danger')
-            return redirect(url_for('user_management'))
-        user_to_update.full_name = request.form.get('full_name')
-        db.commit()
-        if session.get('username') == user_to_update.username:
-            session['full_name'] = user_to_update.full_name
-        flash(f"Successfully updated details for {user_to_update.username}.", 'success')
-        socketio.emit('data_updated', {'message': f"User {user_to_update.username}'s details updated."})
+    db = get_db()
+    user_to_update = db.query(User).filter(func.lower(User.username) == func.lower(username)).first()
+    if not user_to_update:
+        flash('User not found.', 'danger')
+        return redirect(url_for('user_management'))
+    if session.get('role') == 'Head Coach' and user_to_update.team_id != session.get('team_id'):
+        flash('You do not have permission to edit this user.', 'danger')
         return redirect(url_for('user_management'))
-    finally:
-        db.close()
+    user_to_update.full_name = request.form.get('full_name')
+    db.commit()
+    team_metadata_cache.invalidate(user_to_update.team_id)
+    if session.get('username') == user_to_update.username:
+        session['full_name'] = user_to_update.full_name
+    flash(f"Successfully updated details for {user_to_update.username}.", 'success')
+    notify_team_data_changed(user_to_update.team_id, f"User {user_to_update.username}'s details updated.")
+    return redirect(url_for('user_management'))
 
 @app.route('/admin/change_role/<username>', methods=['POST'])
 @admin_required
 def change_user_role(username):
-    db = SessionLocal()
-    try:
-        user_to_change = db.query(User).filter(func.lower(User.username) == func.lower(username)).first()
-        if not user_to_change:
-            flash('User not found.', 'danger')
-            return redirect(url_for('user_management'))
-        if session.get('role') == 'Head Coach' and user_to_change.team_id != session.get('team_id'):
-            flash('You do not have permission to edit this user.', 'danger')
-            return redirect(url_for('user_management'))
-        if user_to_change.username.lower() == 'mike1825':
-            flash('You cannot change the role of the Super Admin.', 'danger')
-            return redirect(url_for('user_management'))
-        new_role = request.form.get('role')
-        if new_role == 'Super Admin' and session.get('role') != 'Super Admin':
-            flash('Only a Super Admin can assign the Super Admin role.', 'danger')
-            return redirect(url_for('user_management'))
-        if user_to_change.username == session['username'] and new_role != 'Super Admin' and db.query(User).filter_by(role='Super Admin').count() == 1:
-            flash('You cannot demote yourself as the sole Super Admin. Assign another Super Admin first.', 'danger')
-            return redirect(url_for('user_management'))
-        if new_role in ['Head Coach', 'Assistant Coach', 'Game Changer', 'Super Admin']:
-            user_to_change.role = new_role
-            db.commit()
-            flash(f"Successfully changed {username}'s role to {new_role}.", 'success')
-            socketio.emit('data_updated', {'message': f"User {username}'s role changed."})
-        else:
-            flash('Invalid role selected.', 'danger')
+    db = get_db()
+    user_to_change = db.query(User).filter(func.lower(User.username) == func.lower(username)).first()
+    if not user_to_change:
+        flash('User not found.', 'danger')
+        return redirect(url_for('user_management'))
+    if session.get('role') == 'Head Coach' and user_to_change.team_id != session.get('team_id'):
+        flash('You do not have permission to edit this user.', 'danger')
+        return redirect(url_for('user_management'))
+    if user_to_change.username.lower() == 'mike1825':
+        flash('You cannot change the role of the Super Admin.', 'danger')
         return redirect(url_for('user_management'))
-    finally:
-        db.close()
+    new_role = request.form.get('role')
+    if new_role == 'Super Admin' and session.get('role') != 'Super Admin':
+        flash('Only a Super Admin can assign the Super Admin role.', 'danger')
+        return redirect(url_for('user_management'))
+    if user_to_change.username == session['username'] and new_role != 'Super Admin' and db.query(User).filter_by(role='Super Admin').count() == 1:
+        flash('You cannot demote yourself as the sole Super Admin. Assign another Super Admin first.', 'danger')
+        return redirect(url_for('user_management'))
+    if new_role in ['Head Coach', 'Assistant Coach', 'Game Changer', 'Super Admin']:
+        user_to_change.role = new_role
+        db.commit()
+        flash(f"Successfully changed {username}'s role to {new_role}.", 'success')
+        notify_team_data_changed(user_to_change.team_id, f"User {username}'s role changed.")
+    else:
+        flash('Invalid role selected.', 'danger')
+    return redirect(url_for('user_management'))
 
 @app.route('/admin/delete_user/<username>')
 @admin_required
 def delete_user(username):
-    db = SessionLocal()
-    try:
-        if username.lower() == 'mike1825':
-            flash("The Super Admin cannot be deleted.", "danger")
-            return redirect(url_for('user_management'))
-        user_to_delete = db.query(User).filter(func.lower(User.username) == func.lower(username)).first()
-        if user_to_delete:
-            if session.get('role') == 'Head Coach' and user_to_delete.team_id != session.get('team_id'):
-                flash('You do not have permission to delete this user.', 'danger')
-                return redirect(url_for('user_management'))
-            db.delete(user_to_delete)
-            db.commit()
-            flash(f"User '{username}' has been deleted.", "success")
-            socketio.emit('data_updated', {'message': f"User {username} deleted."})
-        else:
-            flash("User not found.", "danger")
+    db = get_db()
+    if username.lower() == 'mike1825':
+        flash("The Super Admin cannot be deleted.", "danger")
         return redirect(url_for('user_management'))
-    finally:
-        db.close()
+    user_to_delete = db.query(User).filter(func.lower(User.username) == func.lower(username)).first()
+    if user_to_delete:
+        if session.get('role') == 'Head Coach' and user_to_delete.team_id != session.get('team_id'):
+            flash('You do not have permission to delete this user.', 'danger')
+            return redirect(url_for('user_management'))
+        deleted_user_team_id = user_to_delete.team_id
+        db.delete(user_to_delete)
+        db.commit()
+        team_metadata_cache.invalidate(deleted_user_team_id)
+        flash(f"User '{username}' has been deleted.", "success")
+        notify_team_data_changed(deleted_user_team_id, f"User {username} deleted.")
+    else:
+        flash("User not found.", "danger")
+    return redirect(url_for('user_management'))
 
 @app.route('/admin/reset_password/<username>', methods=['POST'])
 @admin_required
 def reset_password(username):
-    db = SessionLocal()
-    try:
-        if username.lower() == 'mike1825':
-            flash("The Super Admin's password cannot be reset via this interface.", "danger")
-            return redirect(url_for('user_management'))
-        user_to_reset = db.query(User).filter(func.lower(User.username) == func.lower(username)).first()
-        if not user_to_reset:
-            flash('User not found.', 'danger')
-            return redirect(url_for('user_management'))
-        if session.get('role') == 'Head Coach' and user_to_reset.team_id != session.get('team_id'):
-            flash('You do not have permission to reset this password.', 'danger')
-            return redirect(url_for('user_management'))
-        temp_password = ''.join(random.choices(string.ascii_letters + string.digits, k=8))
-        user_to_reset.password_hash = generate_password_hash(temp_password)
-        db.commit()
-        flash(f"Password for {username} has been reset. The temporary password is: {temp_password}", 'success')
-        socketio.emit('data_updated', {'message': f"Password for {username} reset."})
+    db = get_db()
+    if username.lower() == 'mike1825':
+        flash("The Super Admin's password cannot be reset via this interface.", "danger")
+        return redirect(url_for('user_management'))
+    user_to_reset = db.query(User).filter(func.lower(User.username) == func.lower(username)).first()
+    if not user_to_reset:
+        flash('User not found.', 'danger')
         return redirect(url_for('user_management'))
-    finally:
-        db.close()
+    if session.get('role') == 'Head Coach' and user_to_reset.team_id != session.get('team_id'):
+        flash('You do not have permission to reset this password.', 'danger')
+        return redirect(url_for('user_management'))
+    temp_password = ''.join(random.choices(string.ascii_letters + string.digits, k=8))
+    user_to_reset.password_hash = generate_password_hash(temp_password)
+    db.commit()
+    flash(f"Password for {username} has been reset. The temporary password is: {temp_password}", 'success')
+    notify_team_data_changed(user_to_reset.team_id, f"Password for {username} reset.")
+    return redirect(url_for('user_management'))
 
 # --- Player Development Routes ---
 def find_focus_by_id(db_session, focus_id):
@@ -956,629 +813,572 @@ def find_focus_by_id(db_session, focus_id):
 @app.route('/save_player_order', methods=['POST'])
 @login_required
 def save_player_order():
-    db = SessionLocal()
-    try:
-        user = db.query(User).filter_by(username=session['username']).first()
-        if not user: return jsonify({'status': 'error', 'message': 'User not found'}), 404
-        new_order = request.json.get('player_order')
-        if not isinstance(new_order, list): return jsonify({'status': 'error', 'message': 'Invalid order format'}), 400
-        user.player_order = json.dumps(new_order)
-        session['player_order'] = new_order
-        session.modified = True
-        db.commit()
-        socketio.emit('data_updated', {'message': 'Player order saved.'})
-        return jsonify({'status': 'success', 'message': 'Player order saved.'})
-    finally:
-        db.close()
+    db = get_db()
+    user = db.query(User).filter_by(username=session['username']).first()
+    if not user: return jsonify({'status': 'error', 'message': 'User not found'}), 404
+    new_order = request.json.get('player_order')
+    if not isinstance(new_order, list): return jsonify({'status': 'error', 'message': 'Invalid order format'}), 400
+    player_order.save_player_order(db, user.id, user.team_id, new_order)
+    db.commit()
+    notify_team_data_changed(session['team_id'], 'Player order saved.')
+    return jsonify({'status': 'success', 'message': 'Player order saved.'})
 
 
 @app.route('/add_focus/<player_name>', methods=['POST'])
 @login_required
 def add_focus(player_name):
-    db = SessionLocal()
-    try:
-        player = db.query(Player).filter_by(name=player_name, team_id=session['team_id']).first()
-        skill = request.form.get('skill')
-        focus_text = request.form.get('focus_text')
-
-        if not all([player, skill, focus_text]):
-            flash('Skill, focus text, and valid player are required.', 'danger')
-            return redirect(url_for('home', _anchor='player_development'))
-
-        new_focus = PlayerDevelopmentFocus(
-            player_id=player.id, skill_type=skill, focus=focus_text, status="active",
-            notes=request.form.get('notes', ''), author=session['username'],
-            created_date=date.today().strftime('%Y-%m-%d'), team_id=session['team_id']
-        )
-        db.add(new_focus)
-        db.commit()
-        flash(f'New {skill} focus added for {player_name}.', 'success')
-        socketio.emit('data_updated', {'message': f'New focus added for {player_name}.'})
+    db = get_db()
+    player = db.query(Player).filter_by(name=player_name, team_id=session['team_id']).first()
+    skill = request.form.get('skill')
+    focus_text = request.form.get('focus_text')
+
+    if not all([player, skill, focus_text]):
+        flash('Skill, focus text, and valid player are required.', 'danger')
         return redirect(url_for('home', _anchor='player_development'))
-    finally:
-        db.close()
+
+    new_focus = PlayerDevelopmentFocus(
+        player_id=player.id, skill_type=skill, focus=focus_text, status="active",
+        notes=request.form.get('notes', ''), author=session['username'],
+        created_date=date.today(), team_id=session['team_id']
+    )
+    db.add(new_focus)
+    db.commit()
+    flash(f'New {skill} focus added for {player_name}.', 'success')
+    notify_team_data_changed(session['team_id'], f'New focus added for {player_name}.')
+    return redirect(url_for('home', _anchor='player_development'))
 
 
 @app.route('/update_focus/<int:focus_id>', methods=['POST'])
 @login_required
 def update_focus(focus_id):
-    db = SessionLocal()
-    try:
-        focus_item = find_focus_by_id(db, focus_id)
-        if not focus_item or focus_item.team_id != session['team_id']:
-            flash('Focus item not found or you do not have permission to edit.', 'danger')
-            return redirect(url_for('home', _anchor='player_development'))
-
-        focus_item.focus = request.form.get('focus_text', focus_item.focus)
-        focus_item.notes = request.form.get('notes', focus_item.notes)
-        focus_item.last_edited_by = session['username']
-        focus_item.last_edited_date = datetime.now().strftime('%Y-%m-%d %H:%M')
-        db.commit()
-        flash('Focus item updated successfully.', 'success')
-        socketio.emit('data_updated', {'message': 'Focus item updated.'})
+    db = get_db()
+    focus_item = find_focus_by_id(db, focus_id)
+    if not focus_item or focus_item.team_id != session['team_id']:
+        flash('Focus item not found or you do not have permission to edit.', 'danger')
         return redirect(url_for('home', _anchor='player_development'))
-    finally:
-        db.close()
+
+    focus_item.focus = request.form.get('focus_text', focus_item.focus)
+    focus_item.notes = request.form.get('notes', focus_item.notes)
+    focus_item.last_edited_by = session['username']
+    focus_item.last_edited_date = datetime.now()
+    db.commit()
+    flash('Focus item updated successfully.', 'success')
+    notify_team_data_changed(session['team_id'], 'Focus item updated.')
+    return redirect(url_for('home', _anchor='player_development'))
 
 @app.route('/complete_focus/<int:focus_id>')
 @login_required
 def complete_focus(focus_id):
-    db = SessionLocal()
-    try:
-        focus_item = find_focus_by_id(db, focus_id)
-        if not focus_item or focus_item.team_id != session['team_id']:
-            flash('Focus item not found or you do not have permission.', 'danger')
-            return redirect(url_for('home', _anchor='player_development'))
-
-        focus_item.status = 'completed'
-        focus_item.completed_date = date.today().strftime('%Y-%m-%d')
-        db.commit()
-        flash('Focus marked as complete!', 'success')
-        socketio.emit('data_updated', {'message': 'Focus marked complete.'})
+    db = get_db()
+    focus_item = find_focus_by_id(db, focus_id)
+    if not focus_item or focus_item.team_id != session['team_id']:
+        flash('Focus item not found or you do not have permission.', 'danger')
         return redirect(url_for('home', _anchor='player_development'))
-    finally:
-        db.close()
+
+    focus_item.status = 'completed'
+    focus_item.completed_date = date.today()
+    db.commit()
+    flash('Focus marked as complete!', 'success')
+    notify_team_data_changed(session['team_id'], 'Focus marked complete.')
+    return redirect(url_for('home', _anchor='player_development'))
 
 @app.route('/delete_focus/<int:focus_id>')
 @login_required
 def delete_focus(focus_id):
-    db = SessionLocal()
-    try:
-        focus_item = find_focus_by_id(db, focus_id)
-        if focus_item and focus_item.team_id == session['team_id']:
-            db.delete(focus_item)
-            db.commit()
-            flash('Focus deleted successfully.', 'success')
-            socketio.emit('data_updated', {'message': 'Focus deleted.'})
-        else:
-            flash('Could not find the focus item to delete or you do not have permission.', 'danger')
-        return redirect(url_for('home', _anchor='player_development'))
-    finally:
-        db.close()
+    db = get_db()
+    focus_item = find_focus_by_id(db, focus_id)
+    if focus_item and focus_item.team_id == session['team_id']:
+        db.delete(focus_item)
+        db.commit()
+        flash('Focus deleted successfully.', 'success')
+        notify_team_data_changed(session['team_id'], 'Focus deleted.')
+    else:
+        flash('Could not find the focus item to delete or you do not have permission.', 'danger')
+    return redirect(url_for('home', _anchor='player_development'))
 
 @app.route('/update_lesson_info/<int:player_id>', methods=['POST'])
 @login_required
 def update_lesson_info(player_id):
-    db = SessionLocal()
-    try:
-        player = db.query(Player).filter_by(id=player_id, team_id=session['team_id']).first()
-        if not player:
-            flash('Player not found.', 'danger')
-            return redirect(url_for('home', _anchor='player_development'))
-        player.has_lessons = request.form.get('has_lessons')
-        player.lesson_focus = request.form.get('lesson_focus')
-        player.notes_timestamp=datetime.now().strftime("%Y-%m-%d %H:%M")
-        db.commit()
-        flash(f'Lesson info for {player.name} updated.', 'success')
-        socketio.emit('data_updated', {'message': f'Lesson info for {player.name} updated.'})
+    db = get_db()
+    player = db.query(Player).filter_by(id=player_id, team_id=session['team_id']).first()
+    if not player:
+        flash('Player not found.', 'danger')
         return redirect(url_for('home', _anchor='player_development'))
-    finally:
-        db.close()
+    player.has_lessons = request.form.get('has_lessons')
+    player.lesson_focus = request.form.get('lesson_focus')
+    player.notes_timestamp=datetime.now()
+    db.commit()
+    flash(f'Lesson info for {player.name} updated.', 'success')
+    notify_team_data_changed(session['team_id'], f'Lesson info for {player.name} updated.')
+    return redirect(url_for('home', _anchor='player_development'))
 
 @app.route('/delete_lesson_info/<int:player_id>')
 @login_required
 def delete_lesson_info(player_id):
-    db = SessionLocal()
-    try:
-        player = db.query(Player).filter_by(id=player_id, team_id=session['team_id']).first()
-        if not player:
-            flash('Player not found.', 'danger')
-            return redirect(url_for('home', _anchor='player_development'))
-        player.has_lessons = 'No'
-        player.lesson_focus = ''
-        db.commit()
-        flash(f'Lesson info for {player.name} has been deleted.', 'success')
-        socketio.emit('data_updated', {'message': f'Lesson info for {player.name} deleted.'})
+    db = get_db()
+    player = db.query(Player).filter_by(id=player_id, team_id=session['team_id']).first()
+    if not player:
+        flash('Player not found.', 'danger')
         return redirect(url_for('home', _anchor='player_development'))
-    finally:
-        db.close()
+    player.has_lessons = 'No'
+    player.lesson_focus = ''
+    db.commit()
+    flash(f'Lesson info for {player.name} has been deleted.', 'success')
+    notify_team_data_changed(session['team_id'], f'Lesson info for {player.name} deleted.')
+    return redirect(url_for('home', _anchor='player_development'))
 
 # --- Roster and Player Routes ---
 @app.route('/add_player', methods=['POST'])
 @login_required
 def add_player():
-    db = SessionLocal()
-    try:
-        name = request.form.get('name')
-        if not name:
-            flash('Player name is required.', 'danger')
-            return redirect(url_for('home', _anchor='roster'))
-
-        existing_player = db.query(Player).filter_by(name=name, team_id=session['team_id']).first()
-        if existing_player:
-            flash(f'A player with the name "{name}" already exists on this roster.', 'danger')
-            return redirect(url_for('home', _anchor='roster'))
-
-        new_player = Player(
-            name=name,
-            number=request.form.get('number'),
-            position1=request.form.get('position1'),
-            position2=request.form.get('position2'),
-            position3=request.form.get('position3'),
-            throws=request.form.get('throws'),
-            bats=request.form.get('bats'),
-            notes=request.form.get('notes'),
-            pitcher_role=request.form.get('pitcher_role'),
-            has_lessons="No",
-            notes_author=session['username'],
-            notes_timestamp=datetime.now().strftime("%Y-%m-%d %H:%M"),
-            team_id=session['team_id']
-        )
-        db.add(new_player)
-
-        # Add the new player to the end of the ordering for all users on the team
-        for user_obj in db.query(User).filter_by(team_id=session['team_id']).all():
-            current_order = json.loads(user_obj.player_order or "[]")
-            if new_player.name not in current_order:
-                current_order.append(new_player.name)
-                user_obj.player_order = json.dumps(current_order)
-
-        db.commit()
-        flash(f'Player "{name}" added successfully!', 'success')
-        socketio.emit('data_updated', {'message': f'Player {name} added.'})
-        # Use jsonify for AJAX form, or redirect for standard form
-        if 'X-Requested-With' in request.headers and request.headers['X-Requested-With'] == 'XMLHttpRequest':
-             return jsonify({'status': 'success'})
+    db = get_db()
+    name = request.form.get('name')
+    if not name:
+        flash('Player name is required.', 'danger')
+        return redirect(url_for('home', _anchor='roster'))
 
+    existing_player = db.query(Player).filter_by(name=name, team_id=session['team_id']).first()
+    if existing_player:
+        flash(f'A player with the name "{name}" already exists on this roster.', 'danger')
         return redirect(url_for('home', _anchor='roster'))
-    finally:
-        db.close()
+
+    new_player = Player(
+        name=name,
+        number=request.form.get('number'),
+        position1=request.form.get('position1'),
+        position2=request.form.get('position2'),
+        position3=request.form.get('position3'),
+        throws=request.form.get('throws'),
+        bats=request.form.get('bats'),
+        notes=request.form.get('notes'),
+        pitcher_role=request.form.get('pitcher_role'),
+        has_lessons="No",
+        notes_author=session['username'],
+        notes_timestamp=datetime.now(),
+        team_id=session['team_id']
+    )
+    # Players nobody has placed yet come last in everyone's order (see player_order.py).
+    db.add(new_player)
+    db.commit()
+    flash(f'Player "{name}" added successfully!', 'success')
+    notify_team_data_changed(session['team_id'], f'Player {name} added.')
+    # Use jsonify for AJAX form, or redirect for standard form
+    if 'X-Requested-With' in request.headers and request.headers['X-Requested-With'] == 'XMLHttpRequest':
+         return jsonify({'status': 'success'})
+
+    return redirect(url_for('home', _anchor='roster'))
 
 @app.route('/update_player_inline/<int:player_id>', methods=['POST'])
 @login_required
 def update_player_inline(player_id):
-    db = SessionLocal()
-    try:
-        player_to_edit = db.query(Player).filter_by(id=player_id, team_id=session['team_id']).first()
-        if not player_to_edit:
-            return jsonify({'status': 'error', 'message': 'Player not found.'}), 404
-        original_name = player_to_edit.name
-        new_name = request.form.get('name', original_name)
-        if new_name != original_name and db.query(Player).filter_by(name=new_name, team_id=session['team_id']).first():
-            return jsonify({'status': 'error', 'message': f'Player name "{new_name}" already exists.'}), 400
-
-        player_to_edit.name = new_name
-        player_to_edit.number = request.form.get('number', player_to_edit.number)
-        player_to_edit.position1 = request.form.get('position1', player_to_edit.position1)
-        player_to_edit.position2 = request.form.get('position2', player_to_edit.position2)
-        player_to_edit.position3 = request.form.get('position3', player_to_edit.position3)
-        player_to_edit.throws = request.form.get('throws', player_to_edit.throws)
-        player_to_edit.bats = request.form.get('bats', player_to_edit.bats)
-        player_to_edit.notes = request.form.get('notes', player_to_edit.notes)
-        player_to_edit.pitcher_role = request.form.get('pitcher_role', player_to_edit.pitcher_role)
-        player_to_edit.notes_author = session['username']
-        player_to_edit.notes_timestamp = datetime.now().strftime("%Y-%m-%d %H:%M")
-        if original_name != new_name:
-            for user_obj in db.query(User).filter_by(team_id=session['team_id']).all():
-                current_order = json.loads(user_obj.player_order or "[]")
-                updated_order = [new_name if name == original_name else name for name in current_order]
-                user_obj.player_order = json.dumps(updated_order)
-            session['player_order'] = [new_name if name == original_name else name for name in session.get('player_order', [])]
-            session.modified = True
-        db.commit()
-        socketio.emit('data_updated', {'message': f'Player {new_name} updated.'})
-        return jsonify({'status': 'success', 'message': f'Player "{new_name}" updated successfully!'})
-    finally:
-        db.close()
+    db = get_db()
+    player_to_edit = db.query(Player).filter_by(id=player_id, team_id=session['team_id']).first()
+    if not player_to_edit:
+        return jsonify({'status': 'error', 'message': 'Player not found.'}), 404
+    original_name = player_to_edit.name
+    new_name = request.form.get('name', original_name)
+    if new_name != original_name and db.query(Player).filter_by(name=new_name, team_id=session['team_id']).first():
+        return jsonify({'status': 'error', 'message': f'Player name "{new_name}" already exists.'}), 400
+
+    player_to_edit.name = new_name
+    player_to_edit.number = request.form.get('number', player_to_edit.number)
+    player_to_edit.position1 = request.form.get('position1', player_to_edit.position1)
+    player_to_edit.position2 = request.form.get('position2', player_to_edit.position2)
+    player_to_edit.position3 = request.form.get('position3', player_to_edit.position3)
+    player_to_edit.throws = request.form.get('throws', player_to_edit.throws)
+    player_to_edit.bats = request.form.get('bats', player_to_edit.bats)
+    player_to_edit.notes = request.form.get('notes', player_to_edit.notes)
+    player_to_edit.pitcher_role = request.form.get('pitcher_role', player_to_edit.pitcher_role)
+    player_to_edit.notes_author = session['username']
+    player_to_edit.notes_timestamp = datetime.now()
+    db.commit()
+    notify_team_data_changed(session['team_id'], f'Player {new_name} updated.')
+    return jsonify({'status': 'success', 'message': f'Player "{new_name}" updated successfully!'})
 
 @app.route('/delete_player/<int:player_id>')
 @login_required
 def delete_player(player_id):
-    db = SessionLocal()
-    try:
-        player_to_delete = db.query(Player).filter_by(id=player_id, team_id=session['team_id']).first()
-        if player_to_delete:
-            player_name = player_to_delete.name
-            db.delete(player_to_delete)
-            for user_obj in db.query(User).filter_by(team_id=session['team_id']).all():
-                current_order = json.loads(user_obj.player_order or "[]")
-                updated_order = [name for name in current_order if name != player_name]
-                user_obj.player_order = json.dumps(updated_order)
-            if 'player_order' in session:
-                session['player_order'] = [name for name in session['player_order'] if name != player_name]
-                session.modified = True
-            db.commit()
-            flash(f'Player "{player_name}" removed successfully!', 'success')
-            socketio.emit('data_updated', {'message': f'Player {player_name} deleted.'})
-        else:
-            flash('Player not found.', 'danger')
-        return redirect(url_for('home', _anchor=request.args.get('active_tab', 'roster').lstrip('#')))
-    finally:
-        db.close()
+    db = get_db()
+    player_to_delete = db.query(Player).filter_by(id=player_id, team_id=session['team_id']).first()
+    if player_to_delete:
+        player_name = player_to_delete.name
+        db.delete(player_to_delete)
+        db.commit()
+        flash(f'Player "{player_name}" removed successfully!', 'success')
+        notify_team_data_changed(session['team_id'], f'Player {player_name} deleted.')
+    else:
+        flash('Player not found.', 'danger')
+    return redirect(url_for('home', _anchor=request.args.get('active_tab', 'roster').lstrip('#')))
 
 # --- Pitching Routes ---
 @app.route('/add_pitching', methods=['POST'])
 @login_required
 def add_pitching():
-    db = SessionLocal()
+    db = get_db()
     try:
-        try:
-            pitch_count = int(request.form['pitches'])
-            innings_pitched = float(request.form['innings'])
-        except ValueError:
-            flash('Pitch count and innings must be valid numbers.', 'danger')
-            return redirect(url_for('home', _anchor='pitching'))
-
-        new_outing = PitchingOuting(
-            date=request.form['pitch_date'], pitcher=request.form['pitcher'], opponent=request.form['opponent'],
-            pitches=pitch_count, innings=innings_pitched, pitcher_type=request.form.get('pitcher_type', 'Starter'),
-            outing_type=request.form.get('outing_type', 'Game'), team_id=session['team_id']
-        )
-        db.add(new_outing)
-        db.commit()
-        flash(f'Pitching outing for "{new_outing.pitcher}" added successfully!', 'success')
-        socketio.emit('data_updated', {'message': 'New pitching outing added.'})
-        game_id = request.form.get('game_id')
-        if game_id:
-            return redirect(url_for('game_management', game_id=game_id, _anchor='pitching'))
+        pitch_count = int(request.form['pitches'])
+        innings_pitched = float(request.form['innings'])
+    except ValueError:
+        flash('Pitch count and innings must be valid numbers.', 'danger')
+        return redirect(url_for('home', _anchor='pitching'))
+    outing_date = parse_date(request.form.get('pitch_date'))
+    if not outing_date:
+        flash('Please enter a valid pitching date.', 'danger')
         return redirect(url_for('home', _anchor='pitching'))
-    finally:
-        db.close()
+
+    new_outing = PitchingOuting(
+        date=outing_date, pitcher=request.form['pitcher'], opponent=request.form['opponent'],
+        pitches=pitch_count, innings=innings_pitched, pitcher_type=request.form.get('pitcher_type', 'Starter'),
+        outing_type=request.form.get('outing_type', 'Game'), team_id=session['team_id']
+    )
+    db.add(new_outing)
+    db.commit()
+    flash(f'Pitching outing for "{new_outing.pitcher}" added successfully!', 'success')
+    notify_team_data_changed(session['team_id'], 'New pitching outing added.')
+    game_id = request.form.get('game_id')
+    if game_id:
+        return redirect(url_for('game_management', game_id=game_id, _anchor='pitching'))
+    return redirect(url_for('home', _anchor='pitching'))
 
 @app.route('/delete_pitching/<int:outing_id>')
 @login_required
 def delete_pitching(outing_id):
-    db = SessionLocal()
-    try:
-        outing_to_delete = db.query(PitchingOuting).filter_by(id=outing_id, team_id=session['team_id']).first()
-        if outing_to_delete:
-            db.delete(outing_to_delete)
-            db.commit()
-            flash(f'Pitching outing for "{outing_to_delete.pitcher}" removed successfully!', 'success')
-            socketio.emit('data_updated', {'message': 'Pitching outing deleted.'})
-        else:
-            flash('Pitching outing not found.', 'danger')
-        redirect_url = request.referrer or url_for('home', _anchor='pitching')
-        return redirect(redirect_url)
-    finally:
-        db.close()
+    db = get_db()
+    outing_to_delete = db.query(PitchingOuting).filter_by(id=outing_id, team_id=session['team_id']).first()
+    if outing_to_delete:
+        db.delete(outing_to_delete)
+        db.commit()
+        flash(f'Pitching outing for "{outing_to_delete.pitcher}" removed successfully!', 'success')
+        notify_team_data_changed(session['team_id'], 'Pitching outing deleted.')
+    else:
+        flash('Pitching outing not found.', 'danger')
+    redirect_url = request.referrer or url_for('home', _anchor='pitching')
+    return redirect(redirect_url)
 
 # --- Signs Routes ---
 @app.route('/add_sign', methods=['POST'])
 @login_required
 def add_sign():
-    db = SessionLocal()
-    try:
-        sign_name = request.form.get('sign_name')
-        sign_indicator = request.form.get('sign_indicator')
-        if sign_name and sign_indicator:
-            new_sign = Sign(name=sign_name, indicator=sign_indicator, team_id=session['team_id'])
-            db.add(new_sign)
-            db.commit()
-            flash('Sign added successfully!', 'success')
-            socketio.emit('data_updated', {'message': 'New sign added.'})
-        else:
-            flash('Sign Name and Indicator are required.', 'danger')
-        return redirect(url_for('home', _anchor='signs'))
-    finally:
-        db.close()
+    db = get_db()
+    sign_name = request.form.get('sign_name')
+    sign_indicator = request.form.get('sign_indicator')
+    if sign_name and sign_indicator:
+        new_sign = Sign(name=sign_name, indicator=sign_indicator, team_id=session['team_id'])
+        db.add(new_sign)
+        db.commit()
+        flash('Sign added successfully!', 'success')
+        notify_team_data_changed(session['team_id'], 'New sign added.')
+    else:
+        flash('Sign Name and Indicator are required.', 'danger')
+    return redirect(url_for('home', _anchor='signs'))
 
 @app.route('/update_sign/<int:sign_id>', methods=['POST'])
 @login_required
 def update_sign(sign_id):
-    db = SessionLocal()
-    try:
-        sign_to_update = db.query(Sign).filter_by(id=sign_id, team_id=session['team_id']).first()
-        if not sign_to_update:
-            flash('Sign not found.', 'danger')
-            return redirect(url_for('home', _anchor='signs'))
-        sign_name = request.form.get('sign_name')
-        sign_indicator = request.form.get('sign_indicator')
-        if sign_name and sign_indicator:
-            sign_to_update.name = sign_name
-            sign_to_update.indicator = sign_indicator
-            db.commit()
-            flash('Sign updated successfully!', 'success')
-            socketio.emit('data_updated', {'message': 'Sign updated.'})
-        else:
-            flash('Sign Name and Indicator are required.', 'danger')
+    db = get_db()
+    sign_to_update = db.query(Sign).filter_by(id=sign_id, team_id=session['team_id']).first()
+    if not sign_to_update:
+        flash('Sign not found.', 'danger')
         return redirect(url_for('home', _anchor='signs'))
-    finally:
-        db.close()
+    sign_name = request.form.get('sign_name')
+    sign_indicator = request.form.get('sign_indicator')
+    if sign_name and sign_indicator:
+        sign_to_update.name = sign_name
+        sign_to_update.indicator = sign_indicator
+        db.commit()
+        flash('Sign updated successfully!', 'success')
+        notify_team_data_changed(session['team_id'], 'Sign updated.')
+    else:
+        flash('Sign Name and Indicator are required.', 'danger')
+    return redirect(url_for('home', _anchor='signs'))
 
 
 @app.route('/delete_sign/<int:sign_id>')
 @login_required
 def delete_sign(sign_id):
-    db = SessionLocal()
-    try:
-        sign_to_delete = db.query(Sign).filter_by(id=sign_id, team_id=session['team_id']).first()
-        if sign_to_delete:
-            db.delete(sign_to_delete)
-            db.commit()
-            flash('Sign deleted successfully!', 'success')
-            socketio.emit('data_updated', {'message': 'Sign deleted.'})
-        else:
-            flash('Sign not found.', 'danger')
-        return redirect(url_for('home', _anchor='signs'))
-    finally:
-        db.close()
+    db = get_db()
+    sign_to_delete = db.query(Sign).filter_by(id=sign_id, team_id=session['team_id']).first()
+    if sign_to_delete:
+        db.delete(sign_to_delete)
+        db.commit()
+        flash('Sign deleted successfully!', 'success')
+        notify_team_data_changed(session['team_id'], 'Sign deleted.')
+    else:
+        flash('Sign not found.', 'danger')
+    return redirect(url_for('home', _anchor='signs'))
 
 # --- Rotation Routes ---
 @app.route('/save_rotation', methods=['POST'])
 @login_required
 def save_rotation():
-    db = SessionLocal()
-    try:
-        rotation_data = request.get_json()
-        rotation_id = rotation_data.get('id')
-        title = rotation_data.get('title')
-        innings_data = rotation_data.get('innings')
-        associated_game_id = rotation_data.get('associated_game_id')
-        if not title or not isinstance(innings_data, dict):
-            return jsonify({'status': 'error', 'message': 'Invalid data provided. A title and inning data are required.'}), 400
-        if rotation_id:
-            rotation_to_update = db.query(Rotation).filter_by(id=rotation_id, team_id=session['team_id']).first()
-            if rotation_to_update:
-                rotation_to_update.title = title
-                rotation_to_update.innings = json.dumps(innings_data)
-                rotation_to_update.associated_game_id = associated_game_id
-                message = 'Rotation updated successfully!'
-                new_rotation_id = rotation_id
-            else: rotation_id = None
-        if not rotation_id:
-            new_rotation = Rotation(title=title, innings=json.dumps(innings_data), associated_game_id=associated_game_id, team_id=session['team_id'])
-            db.add(new_rotation)
-            db.commit()
-            new_rotation_id = new_rotation.id
-            message = 'Rotation saved successfully!'
+    db = get_db()
+    rotation_data = request.get_json()
+    rotation_id = rotation_data.get('id')
+    title = rotation_data.get('title')
+    innings_data = rotation_data.get('innings')
+    associated_game_id = rotation_data.get('associated_game_id')
+    if not title or not isinstance(innings_data, dict):
+        return jsonify({'status': 'error', 'message': 'Invalid data provided. A title and inning data are required.'}), 400
+    if rotation_id:
+        rotation_to_update = db.query(Rotation).filter_by(id=rotation_id, team_id=session['team_id']).first()
+        if rotation_to_update:
+            rotation_to_update.title = title
+            rotation_to_update.innings = innings_data
+            rotation_to_update.associated_game_id = associated_game_id
+            message = 'Rotation updated successfully!'
+            new_rotation_id = rotation_id
+        else: rotation_id = None
+    if not rotation_id:
+        new_rotation = Rotation(title=title, innings=innings_data, associated_game_id=associated_game_id, team_id=session['team_id'])
+        db.add(new_rotation)
         db.commit()
-        socketio.emit('data_updated', {'message': 'Rotation saved/updated.'})
-        return jsonify({'status': 'success', 'message': message, 'new_id': new_rotation_id})
-    finally:
-        db.close()
+        new_rotation_id = new_rotation.id
+        message = 'Rotation saved successfully!'
+    db.commit()
+    notify_team_data_changed(session['team_id'], 'Rotation saved/updated.')
+    return jsonify({'status': 'success', 'message': message, 'new_id': new_rotation_id})
+
+@app.route('/generate_rotation', methods=['POST'])
+@login_required
+def generate_rotation():
+    """
+    Fills a rotation for the roster (or the given player names) without saving it. With a
+    game_id, inning 1 starts from that game's lineup.
+    """
+    db = get_db()
+    payload = request.get_json(silent=True) or {}
+    try:
+        innings = int(payload.get('innings', 6))
+        max_consecutive_bench = int(payload.get('max_consecutive_bench', 1))
+        min_infield_innings = int(payload.get('min_infield_innings', 1))
+    except (TypeError, ValueError):
+        return jsonify({'status': 'error', 'message': 'Innings and constraints must be whole numbers.'}), 400
+    if not 1 <= innings <= 15 or max_consecutive_bench < 1 or min_infield_innings < 0:
+        return jsonify({'status': 'error', 'message': 'Innings must be between 1 and 15 and constraints cannot be negative.'}), 400
+
+    query = db.query(Player.name, Player.position1, Player.position2, Player.position3).filter(Player.team_id == session['team_id'])
+    if isinstance(payload.get('players'), list):
+        query = query.filter(Player.name.in_([name for name in payload['players'] if isinstance(name, str)]))
+    players = query.order_by(Player.id).all()
+    if not players:
+        return jsonify({'status': 'error', 'message': 'There are no players to place.'}), 400
+
+    first_inning = None
+    if payload.get('game_id'):
+        lineup = (db.query(Lineup).options(selectinload(Lineup.slots))
+                  .filter_by(associated_game_id=payload['game_id'], team_id=session['team_id']).first())
+        if lineup:
+            first_inning = rotation_generator.inning_from_lineup(lineup.lineup_positions)
+    rotation = rotation_generator.generate_rotation(
+        players, innings, max_consecutive_bench=max_consecutive_bench,
+        min_infield_innings=min_infield_innings, first_inning=first_inning
+    )
+    return jsonify({'status': 'success', **rotation})
 
 @app.route('/delete_rotation/<int:rotation_id>')
 @login_required
 def delete_rotation(rotation_id):
-    db = SessionLocal()
-    try:
-        rotation_to_delete = db.query(Rotation).filter_by(id=rotation_id, team_id=session['team_id']).first()
-        if rotation_to_delete:
-            db.delete(rotation_to_delete)
-            db.commit()
-            flash('Rotation deleted successfully!', 'success')
-            socketio.emit('data_updated', {'message': 'Rotation deleted.'})
-        else:
-            flash('Rotation not found.', 'danger')
-        redirect_url = request.referrer or url_for('home', _anchor='rotations')
-        return redirect(redirect_url)
-    finally:
-        db.close()
+    db = get_db()
+    rotation_to_delete = db.query(Rotation).filter_by(id=rotation_id, team_id=session['team_id']).first()
+    if rotation_to_delete:
+        db.delete(rotation_to_delete)
+        db.commit()
+        flash('Rotation deleted successfully!', 'success')
+        notify_team_data_changed(session['team_id'], 'Rotation deleted.')
+    else:
+        flash('Rotation not found.', 'danger')
+    redirect_url = request.referrer or url_for('home', _anchor='rotations')
+    return redirect(redirect_url)
 
 # --- Collaboration Notes Routes ---
 @app.route('/add_note/<note_type>', methods=['POST'])
 @login_required
 def add_note(note_type):
-    db = SessionLocal()
-    try:
-        if note_type not in ['player_notes', 'team_notes']:
-            flash('Invalid note type.', 'danger')
-            return redirect(url_for('home', _anchor='collaboration'))
-        note_text = request.form.get('note_text')
-        if not note_text:
-            flash('Note cannot be empty.', 'warning')
-            return redirect(url_for('home', _anchor='collaboration'))
-        new_note = CollaborationNote(note_type=note_type, text=note_text, author=session['username'], timestamp=datetime.now().strftime("%Y-%m-%d %H:%M"), team_id=session['team_id'])
-        if note_type == 'player_notes':
-            player_name = request.form.get('player_name')
-            if not player_name:
-                flash('You must select a player.', 'warning')
-                return redirect(url_for('home', _anchor='collaboration'))
-            new_note.player_name = player_name
-        db.add(new_note)
-        db.commit()
-        flash('Note added successfully!', 'success')
-        socketio.emit('data_updated', {'message': 'New note added.'})
+    db = get_db()
+    if note_type not in ['player_notes', 'team_notes']:
+        flash('Invalid note type.', 'danger')
+        return redirect(url_for('home', _anchor='collaboration'))
+    note_text = request.form.get('note_text')
+    if not note_text:
+        flash('Note cannot be empty.', 'warning')
         return redirect(url_for('home', _anchor='collaboration'))
-    finally:
-        db.close()
+    new_note = CollaborationNote(note_type=note_type, text=note_text, author=session['username'], timestamp=datetime.now(), team_id=session['team_id'])
+    if note_type == 'player_notes':
+        player_name = request.form.get('player_name')
+        if not player_name:
+            flash('You must select a player.', 'warning')
+            return redirect(url_for('home', _anchor='collaboration'))
+        new_note.player_name = player_name
+    db.add(new_note)
+    db.commit()
+    flash('Note added successfully!', 'success')
+    notify_team_data_changed(session['team_id'], 'New note added.')
+    return redirect(url_for('home', _anchor='collaboration'))
 
 @app.route('/edit_note', methods=['POST'])
 @login_required
 def edit_note():
-    db = SessionLocal()
+    db = get_db()
     try:
-        try:
-            note_id = int(request.form.get('note_id'))
-        except (ValueError, TypeError):
-            flash('Invalid note ID.', 'danger')
-            return redirect(url_for('home', _anchor='collaboration'))
-        note_type = request.form.get('note_type')
-        new_text = request.form.get('note_text')
-        if not all([note_type, new_text]):
-            flash('Invalid request data.', 'danger')
-            return redirect(url_for('home', _anchor='collaboration'))
-        note_to_edit = db.query(CollaborationNote).filter_by(id=note_id, team_id=session['team_id']).first()
-        if not note_to_edit or note_to_edit.note_type != note_type:
-            flash('Note not found or invalid note type.', 'danger')
-            return redirect(url_for('home', _anchor='collaboration'))
-        if session['username'] == note_to_edit.author or session.get('role') in ['Head Coach', 'Super Admin']:
-            note_to_edit.text = new_text
-            db.commit()
-            flash('Note updated successfully.', 'success')
-            socketio.emit('data_updated', {'message': 'Note updated.'})
-        else:
-            flash('You do not have permission to edit this note.', 'danger')
+        note_id = int(request.form.get('note_id'))
+    except (ValueError, TypeError):
+        flash('Invalid note ID.', 'danger')
         return redirect(url_for('home', _anchor='collaboration'))
-    finally:
-        db.close()
+    note_type = request.form.get('note_type')
+    new_text = request.form.get('note_text')
+    if not all([note_type, new_text]):
+        flash('Invalid request data.', 'danger')
+        return redirect(url_for('home', _anchor='collaboration'))
+    note_to_edit = db.query(CollaborationNote).filter_by(id=note_id, team_id=session['team_id']).first()
+    if not note_to_edit or note_to_edit.note_type != note_type:
+        flash('Note not found or invalid note type.', 'danger')
+        return redirect(url_for('home', _anchor='collaboration'))
+    if session['username'] == note_to_edit.author or session.get('role') in ['Head Coach', 'Super Admin']:
+        note_to_edit.text = new_text
+        db.commit()
+        flash('Note updated successfully.', 'success')
+        notify_team_data_changed(session['team_id'], 'Note updated.')
+    else:
+        flash('You do not have permission to edit this note.', 'danger')
+    return redirect(url_for('home', _anchor='collaboration'))
 
 @app.route('/delete_note/<note_type>/<int:note_id>')
 @login_required
 def delete_note(note_type, note_id):
-    db = SessionLocal()
-    try:
-        note_to_delete = db.query(CollaborationNote).filter_by(id=note_id, team_id=session['team_id']).first()
-        if note_to_delete and note_to_delete.note_type == note_type:
-            if session['username'] == note_to_delete.author or session.get('role') in ['Head Coach', 'Super Admin']:
-                db.delete(note_to_delete)
-                db.commit()
-                flash('Note deleted successfully.', 'success')
-                socketio.emit('data_updated', {'message': 'Note deleted.'})
-            else:
-                flash('You do not have permission to delete this note.', 'danger')
+    db = get_db()
+    note_to_delete = db.query(CollaborationNote).filter_by(id=note_id, team_id=session['team_id']).first()
+    if note_to_delete and note_to_delete.note_type == note_type:
+        if session['username'] == note_to_delete.author or session.get('role') in ['Head Coach', 'Super Admin']:
+            db.delete(note_to_delete)
+            db.commit()
+            flash('Note deleted successfully.', 'success')
+            notify_team_data_changed(session['team_id'], 'Note deleted.')
         else:
-            flash('Note not found or invalid note type.', 'danger')
-        return redirect(url_for('home', _anchor='collaboration'))
-    finally:
-        db.close()
+            flash('You do not have permission to delete this note.', 'danger')
+    else:
+        flash('Note not found or invalid note type.', 'danger')
+    return redirect(url_for('home', _anchor='collaboration'))
 
 # --- Practice Plan Routes ---
 @app.route('/add_practice_plan', methods=['POST'])
 @login_required
 def add_practice_plan():
-    db = SessionLocal()
-    try:
-        plan_date = request.form.get('plan_date')
-        if not plan_date:
-            flash('Practice date is required.', 'danger')
-            return redirect(url_for('home', _anchor='practice_plan'))
-        new_plan = PracticePlan(date=plan_date, general_notes=request.form.get('general_notes', ''), team_id=session['team_id'])
-        db.add(new_plan)
-        db.commit()
-        flash('New practice plan created!', 'success')
-        socketio.emit('data_updated', {'message': 'New practice plan created.'})
+    db = get_db()
+    plan_date = parse_date(request.form.get('plan_date'))
+    if not plan_date:
+        flash('Practice date is required.', 'danger')
         return redirect(url_for('home', _anchor='practice_plan'))
-    finally:
-        db.close()
+    new_plan = PracticePlan(date=plan_date, general_notes=request.form.get('general_notes', ''), team_id=session['team_id'])
+    db.add(new_plan)
+    db.commit()
+    flash('New practice plan created!', 'success')
+    notify_team_data_changed(session['team_id'], 'New practice plan created.')
+    return redirect(url_for('home', _anchor='practice_plan'))
 
 @app.route('/add_task_to_plan/<int:plan_id>', methods=['POST'])
 @login_required
 def add_task_to_plan(plan_id):
-    db = SessionLocal()
-    try:
+    db = get_db()
+    if request.is_json:
+        data = request.get_json()
+        task_text = data.get('task_text')
+    else:
+        task_text = request.form.get('task_text')
+    if not task_text:
         if request.is_json:
-            data = request.get_json()
-            task_text = data.get('task_text')
+            return jsonify({'status': 'error', 'message': 'Task cannot be empty.'}), 400
         else:
-            task_text = request.form.get('task_text')
-        if not task_text:
-            if request.is_json:
-                return jsonify({'status': 'error', 'message': 'Task cannot be empty.'}), 400
-            else:
-                flash('Task cannot be empty.', 'warning')
-                return redirect(url_for('home', _anchor='practice_plan'))
-        plan = db.query(PracticePlan).filter_by(id=plan_id, team_id=session['team_id']).first()
-        if not plan:
-            if request.is_json:
-                return jsonify({'status': 'error', 'message': 'Plan not found.'}), 404
-            else:
-                flash('Practice plan not found.', 'danger')
-                return redirect(url_for('home', _anchor='practice_plan'))
-        new_task = PracticeTask(text=task_text, status="pending", author=session['username'], timestamp=datetime.now().strftime("%Y-%m-%d %H:%M"), practice_plan_id=plan.id)
-        db.add(new_task)
-        db.commit()
-        socketio.emit('data_updated', {'message': 'Task added to plan.'})
+            flash('Task cannot be empty.', 'warning')
+            return redirect(url_for('home', _anchor='practice_plan'))
+    plan = db.query(PracticePlan).filter_by(id=plan_id, team_id=session['team_id']).first()
+    if not plan:
         if request.is_json:
-            return jsonify({'status': 'success', 'message': 'Task added.'})
-        flash('Task added to plan.', 'success')
-        return redirect(url_for('home', _anchor='practice_plan'))
-    finally:
-        db.close()
+            return jsonify({'status': 'error', 'message': 'Plan not found.'}), 404
+        else:
+            flash('Practice plan not found.', 'danger')
+            return redirect(url_for('home', _anchor='practice_plan'))
+    new_task = PracticeTask(text=task_text, status="pending", author=session['username'], timestamp=datetime.now(), practice_plan_id=plan.id)
+    db.add(new_task)
+    db.commit()
+    notify_team_data_changed(session['team_id'], 'Task added to plan.')
+    if request.is_json:
+        return jsonify({'status': 'success', 'message': 'Task added.'})
+    flash('Task added to plan.', 'success')
+    return redirect(url_for('home', _anchor='practice_plan'))
 
 @app.route('/delete_task/<int:plan_id>/<int:task_id>')
 @login_required
 def delete_task(plan_id, task_id):
-    db = SessionLocal()
-    try:
-        plan = db.query(PracticePlan).filter_by(id=plan_id, team_id=session['team_id']).first()
-        if not plan:
-            flash('Practice plan not found.', 'danger')
-            return redirect(url_for('home', _anchor='practice_plan'))
-        task_to_delete = db.query(PracticeTask).filter_by(id=task_id, practice_plan_id=plan.id).first()
-        if task_to_delete:
-            db.delete(task_to_delete)
-            db.commit()
-            flash('Task deleted.', 'success')
-            socketio.emit('data_updated', {'message': 'Task deleted from plan.'})
-        else: flash('Task not found.', 'danger')
+    db = get_db()
+    plan = db.query(PracticePlan).filter_by(id=plan_id, team_id=session['team_id']).first()
+    if not plan:
+        flash('Practice plan not found.', 'danger')
         return redirect(url_for('home', _anchor='practice_plan'))
-    finally:
-        db.close()
+    task_to_delete = db.query(PracticeTask).filter_by(id=task_id, practice_plan_id=plan.id).first()
+    if task_to_delete:
+        db.delete(task_to_delete)
+        db.commit()
+        flash('Task deleted.', 'success')
+        notify_team_data_changed(session['team_id'], 'Task deleted from plan.')
+    else: flash('Task not found.', 'danger')
+    return redirect(url_for('home', _anchor='practice_plan'))
 
 @app.route('/update_task_status/<int:plan_id>/<int:task_id>', methods=['POST'])
 @login_required
 def update_task_status(plan_id, task_id):
-    db = SessionLocal()
-    try:
-        plan = db.query(PracticePlan).filter_by(id=plan_id, team_id=session['team_id']).first()
-        if not plan:
-            return jsonify({'status': 'error', 'message': 'Plan not found'}), 404
-        task = db.query(PracticeTask).filter_by(id=task_id, practice_plan_id=plan.id).first()
-        if not task:
-            return jsonify({'status': 'error', 'message': 'Task not found'}), 404
-        request_data = request.get_json()
-        new_status = request_data.get('status')
-        if new_status not in ['pending', 'complete']:
-            return jsonify({'status': 'error', 'message': 'Invalid status'}), 400
-        task.status = new_status
-        db.commit()
-        socketio.emit('data_updated', {'message': 'Task status updated.'})
-        return jsonify({'status': 'success', 'message': 'Task status updated.'})
-    finally:
-        db.close()
+    db = get_db()
+    plan = db.query(PracticePlan).filter_by(id=plan_id, team_id=session['team_id']).first()
+    if not plan:
+        return jsonify({'status': 'error', 'message': 'Plan not found'}), 404
+    task = db.query(PracticeTask).filter_by(id=task_id, practice_plan_id=plan.id).first()
+    if not task:
+        return jsonify({'status': 'error', 'message': 'Task not found'}), 404
+    request_data = request.get_json()
+    new_status = request_data.get('status')
+    if new_status not in ['pending', 'complete']:
+        return jsonify({'status': 'error', 'message': 'Invalid status'}), 400
+    task.status = new_status
+    db.commit()
+    notify_team_data_changed(session['team_id'], 'Task status updated.')
+    return jsonify({'status': 'success', 'message': 'Task status updated.'})
 
 @app.route('/move_note_to_practice_plan/<note_type>/<int:note_id>', methods=['GET', 'POST'])
 @login_required
 def move_note_to_practice_plan(note_type, note_id):
-    db = SessionLocal()
-    try:
-        note_to_move = db.query(CollaborationNote).filter_by(id=note_id, team_id=session['team_id']).first()
-        if not (note_to_move and note_to_move.note_type == note_type):
-            flash('Note not found or invalid type.', 'danger')
+    db = get_db()
+    note_to_move = db.query(CollaborationNote).filter_by(id=note_id, team_id=session['team_id']).first()
+    if not (note_to_move and note_to_move.note_type == note_type):
+        flash('Note not found or invalid type.', 'danger')
+        return redirect(url_for('home', _anchor='collaboration'))
+    if request.method == 'POST':
+        plan_id_str = request.form.get('plan_id')
+        if not plan_id_str:
+            flash('You must select a practice plan.', 'warning')
+            return redirect(url_for('move_note_to_practice_plan', note_type=note_type, note_id=note_id))
+        plan_id = int(plan_id_str)
+        plan = db.query(PracticePlan).filter_by(id=plan_id, team_id=session['team_id']).first()
+        if not plan:
+            flash('Practice plan not found.', 'danger')
             return redirect(url_for('home', _anchor='collaboration'))
-        if request.method == 'POST':
-            plan_id_str = request.form.get('plan_id')
-            if not plan_id_str:
-                flash('You must select a practice plan.', 'warning')
-                return redirect(url_for('move_note_to_practice_plan', note_type=note_type, note_id=note_id))
-            plan_id = int(plan_id_str)
-            plan = db.query(PracticePlan).filter_by(id=plan_id, team_id=session['team_id']).first()
-            if not plan:
-                flash('Practice plan not found.', 'danger')
-                return redirect(url_for('home', _anchor='collaboration'))
-            new_task = PracticeTask(
-                text=note_to_move.text, status="pending", author=note_to_move.author,
-                timestamp=datetime.now().strftime("%Y-%m-%d %H:%M"), practice_plan_id=plan.id
-            )
-            db.add(new_task)
-            db.delete(note_to_move)
-            db.commit()
-            flash('Note successfully moved to practice plan and original deleted.', 'success')
-            socketio.emit('data_updated', {'message': 'Note moved to practice plan.'})
-            return redirect(url_for('home', _anchor='practice_plan'))
-        practice_plans = db.query(PracticePlan).filter_by(team_id=session['team_id']).all()
-        return render_template('move_note_to_plan.html', note=note_to_move, practice_plans=practice_plans, note_type=note_type, note_id=note_id)
-    finally:
-        db.close()
+        new_task = PracticeTask(
+            text=note_to_move.text, status="pending", author=note_to_move.author,
+            timestamp=datetime.now(), practice_plan_id=plan.id
+        )
+        db.add(new_task)
+        db.delete(note_to_move)
+        db.commit()
+        flash('Note successfully moved to practice plan and original deleted.', 'success')
+        notify_team_data_changed(session['team_id'], 'Note moved to practice plan.')
+        return redirect(url_for('home', _anchor='practice_plan'))
+    practice_plans = db.query(PracticePlan).filter_by(team_id=session['team_id']).all()
+    return render_template('move_note_to_plan.html', note=note_to_move, practice_plans=practice_plans, note_type=note_type, note_id=note_id)
 
 
 # --- Scouting and Recruiting Routes ---
 @app.route('/add_scouted_player', methods=['POST'])
 @login_required
 def add_scouted_player():
-    db = SessionLocal()
+    db = get_db()
     try:
         data = request.get_json()
         player_name = data.get('scouted_player_name')
@@ -1594,303 +1394,261 @@ def add_scouted_player():
         )
         db.add(new_player)
         db.commit()
-        socketio.emit('data_updated', {'message': 'New scouted player added.'})
+        notify_team_data_changed(session['team_id'], 'New scouted player added.')
         return jsonify({'status': 'success', 'message': f'Player "{new_player.name}" added to {scouted_player_type.replace("_", " ").title()} list.'})
     except Exception as e:
         app.logger.error(f"Error adding scouted player: {e}")
         return jsonify({'status': 'error', 'message': 'An internal server error occurred.'}), 500
-    finally:
-        db.close()
 
 @app.route('/delete_scouted_player/<list_type>/<int:player_id>')
 @login_required
 def delete_scouted_player(list_type, player_id):
-    db = SessionLocal()
-    try:
-        if list_type not in ['committed', 'targets', 'not_interested']:
-            flash(f'Could not find the list type "{list_type}".', 'danger')
-            return redirect(url_for('home', _anchor='scouting_list'))
-        player_to_delete = db.query(ScoutedPlayer).filter_by(id=player_id, list_type=list_type, team_id=session['team_id']).first()
-        if player_to_delete:
-            player_name = player_to_delete.name
-            db.delete(player_to_delete)
-            db.commit()
-            flash(f'Removed {player_name} from the scouting list.', 'success')
-            socketio.emit('data_updated', {'message': f'Scouted player {player_name} removed.'})
-        else:
-            flash(f'Could not find the player to remove.', 'warning')
+    db = get_db()
+    if list_type not in ['committed', 'targets', 'not_interested']:
+        flash(f'Could not find the list type "{list_type}".', 'danger')
         return redirect(url_for('home', _anchor='scouting_list'))
-    finally:
-        db.close()
+    player_to_delete = db.query(ScoutedPlayer).filter_by(id=player_id, list_type=list_type, team_id=session['team_id']).first()
+    if player_to_delete:
+        player_name = player_to_delete.name
+        db.delete(player_to_delete)
+        db.commit()
+        flash(f'Removed {player_name} from the scouting list.', 'success')
+        notify_team_data_changed(session['team_id'], f'Scouted player {player_name} removed.')
+    else:
+        flash(f'Could not find the player to remove.', 'warning')
+    return redirect(url_for('home', _anchor='scouting_list'))
 
 @app.route('/move_scouted_player/<from_type>/<to_type>/<int:player_id>', methods=['POST'])
 @login_required
 def move_scouted_player(from_type, to_type, player_id):
-    db = SessionLocal()
-    try:
-        if from_type not in ['committed', 'targets', 'not_interested'] or to_type not in ['committed', 'targets', 'not_interested']:
-            flash('Invalid list type.', 'danger')
-            return redirect(url_for('home', _anchor='scouting_list'))
-        player_to_move = db.query(ScoutedPlayer).filter_by(id=player_id, list_type=from_type, team_id=session['team_id']).first()
-        if player_to_move:
-            player_to_move.list_type = to_type
-            db.commit()
-            flash(f'Player "{player_to_move.name}" moved to {to_type.replace("_", " ").title()} list.', 'success')
-            socketio.emit('data_updated', {'message': f'Scouted player {player_to_move.name} moved.'})
-        else:
-            flash('Could not move player.', 'danger')
+    db = get_db()
+    if from_type not in ['committed', 'targets', 'not_interested'] or to_type not in ['committed', 'targets', 'not_interested']:
+        flash('Invalid list type.', 'danger')
         return redirect(url_for('home', _anchor='scouting_list'))
-    finally:
-        db.close()
+    player_to_move = db.query(ScoutedPlayer).filter_by(id=player_id, list_type=from_type, team_id=session['team_id']).first()
+    if player_to_move:
+        player_to_move.list_type = to_type
+        db.commit()
+        flash(f'Player "{player_to_move.name}" moved to {to_type.replace("_", " ").title()} list.', 'success')
+        notify_team_data_changed(session['team_id'], f'Scouted player {player_to_move.name} moved.')
+    else:
+        flash('Could not move player.', 'danger')
+    return redirect(url_for('home', _anchor='scouting_list'))
 
 @app.route('/move_scouted_player_to_roster/<int:player_id>', methods=['POST'])
 @login_required
 def move_scouted_player_to_roster(player_id):
-    db = SessionLocal()
-    try:
-        scouted_player = db.query(ScoutedPlayer).filter_by(id=player_id, list_type='committed', team_id=session['team_id']).first()
-        if not scouted_player:
-            flash('Committed player not found.', 'danger')
-            return redirect(url_for('home', _anchor='scouting_list'))
-        if db.query(Player).filter_by(name=scouted_player.name, team_id=session['team_id']).first():
-            flash(f'Cannot move "{scouted_player.name}" to roster because a player with that name already exists.', 'danger')
-            return redirect(url_for('home', _anchor='scouting_list'))
-        new_roster_player = Player(
-            name=scouted_player.name, number="", position1=scouted_player.position1, position2=scouted_player.position2,
-            throws=scouted_player.throws, bats=scouted_player.bats, notes="", pitcher_role="Not a Pitcher", has_lessons="No",
-            lesson_focus="", notes_author=session['username'], notes_timestamp=datetime.now().strftime("%Y-%m-%d %H:%M"), team_id=session['team_id']
-        )
-        db.add(new_roster_player)
-        db.delete(scouted_player)
-        for user_obj in db.query(User).filter_by(team_id=session['team_id']).all():
-            current_order = json.loads(user_obj.player_order or "[]")
-            if new_roster_player.name not in current_order:
-                current_order.append(new_roster_player.name)
-                user_obj.player_order = json.dumps(current_order)
-        if 'player_order' in session and new_roster_player.name not in session['player_order']:
-            session['player_order'].append(new_roster_player.name)
-            session.modified = True
-        db.commit()
-        flash(f'Player "{new_roster_player.name}" moved to Roster. Please assign a number.', 'success')
-        socketio.emit('data_updated', {'message': f'Scouted player {new_roster_player.name} moved to roster.'})
+    db = get_db()
+    scouted_player = db.query(ScoutedPlayer).filter_by(id=player_id, list_type='committed', team_id=session['team_id']).first()
+    if not scouted_player:
+        flash('Committed player not found.', 'danger')
+        return redirect(url_for('home', _anchor='scouting_list'))
+    if db.query(Player).filter_by(name=scouted_player.name, team_id=session['team_id']).first():
+        flash(f'Cannot move "{scouted_player.name}" to roster because a player with that name already exists.', 'danger')
         return redirect(url_for('home', _anchor='scouting_list'))
-    finally:
-        db.close()
+    new_roster_player = Player(
+        name=scouted_player.name, number="", position1=scouted_player.position1, position2=scouted_player.position2,
+        throws=scouted_player.throws, bats=scouted_player.bats, notes="", pitcher_role="Not a Pitcher", has_lessons="No",
+        lesson_focus="", notes_author=session['username'], notes_timestamp=datetime.now(), team_id=session['team_id']
+    )
+    db.add(new_roster_player)
+    db.delete(scouted_player)
+    db.commit()
+    flash(f'Player "{new_roster_player.name}" moved to Roster. Please assign a number.', 'success')
+    notify_team_data_changed(session['team_id'], f'Scouted player {new_roster_player.name} moved to roster.')
+    return redirect(url_for('home', _anchor='scouting_list'))
 
 # --- Game and Lineup Routes ---
 @app.route('/add_game', methods=['POST'])
 @login_required
 def add_game():
-    db = SessionLocal()
-    try:
-        new_game = Game(
-            date=request.form['game_date'], opponent=request.form['game_opponent'], location=request.form.get('game_location', ''),
-            game_notes=request.form.get('game_notes', ''), associated_lineup_title=request.form.get('associated_lineup_title', ''),
-            associated_rotation_date=request.form.get('associated_rotation_date', ''), team_id=session['team_id']
-        )
-        db.add(new_game)
-        db.commit()
-        flash(f'Game vs "{new_game.opponent}" on {new_game.date} added successfully!', 'success')
-        socketio.emit('data_updated', {'message': 'New game added.'})
-        return redirect(url_for('game_management', game_id=new_game.id))
-    finally:
-        db.close()
+    db = get_db()
+    game_date = parse_date(request.form.get('game_date'))
+    if not game_date:
+        flash('Please enter a valid game date.', 'danger')
+        return redirect(url_for('home', _anchor='games'))
+    new_game = Game(
+        date=game_date, opponent=request.form['game_opponent'], location=request.form.get('game_location', ''),
+        game_notes=request.form.get('game_notes', ''), associated_lineup_title=request.form.get('associated_lineup_title', ''),
+        associated_rotation_date=request.form.get('associated_rotation_date', ''), team_id=session['team_id']
+    )
+    db.add(new_game)
+    db.commit()
+    flash(f'Game vs "{new_game.opponent}" on {new_game.date} added successfully!', 'success')
+    notify_team_data_changed(session['team_id'], 'New game added.')
+    return redirect(url_for('game_management', game_id=new_game.id))
 
 
 @app.route('/delete_game/<int:game_id>')
 @login_required
 def delete_game(game_id):
-    db = SessionLocal()
-    try:
-        game_to_delete = db.query(Game).filter_by(id=game_id, team_id=session['team_id']).first()
-        if game_to_delete:
-            db.delete(game_to_delete)
-            db.commit()
-            flash(f'Game vs "{game_to_delete.opponent}" on {game_to_delete.date} removed successfully!', 'success')
-            socketio.emit('data_updated', {'message': 'Game deleted.'})
-        else:
-            flash('Game not found.', 'danger')
-        return redirect(url_for('home', _anchor='games'))
-    finally:
-        db.close()
+    db = get_db()
+    game_to_delete = db.query(Game).filter_by(id=game_id, team_id=session['team_id']).first()
+    if game_to_delete:
+        db.delete(game_to_delete)
+        db.commit()
+        flash(f'Game vs "{game_to_delete.opponent}" on {game_to_delete.date} removed successfully!', 'success')
+        notify_team_data_changed(session['team_id'], 'Game deleted.')
+    else:
+        flash('Game not found.', 'danger')
+    return redirect(url_for('home', _anchor='games'))
 
 
 def _sync_lineup_to_rotation(db, lineup):
     if not lineup.associated_game_id: return
     game = db.query(Game).filter_by(id=lineup.associated_game_id, team_id=lineup.team_id).first()
     if not game: return
-    lineup_positions = json.loads(lineup.lineup_positions or "[]")
-    inning_1_data = {item['position']: item['name'] for item in lineup_positions if item.get('position') and item.get('name')}
+    inning_1_data = rotation_generator.inning_from_lineup(lineup.lineup_positions)
     if not inning_1_data: return
     rotation_for_game = db.query(Rotation).filter_by(associated_game_id=game.id, team_id=lineup.team_id).first()
     if rotation_for_game:
-        current_innings = json.loads(rotation_for_game.innings or "{}")
-        current_innings['1'] = inning_1_data
-        rotation_for_game.innings = json.dumps(current_innings)
+        rotation_for_game.innings['1'] = inning_1_data
     else:
-        new_rotation = Rotation(title=f"vs {game.opponent} ({game.date})", associated_game_id=game.id, innings=json.dumps({'1': inning_1_data}), team_id=lineup.team_id)
+        new_rotation = Rotation(title=f"vs {game.opponent} ({format_date(game.date)})", associated_game_id=game.id, innings={'1': inning_1_data}, team_id=lineup.team_id)
         db.add(new_rotation)
 
 @app.route('/add_lineup', methods=['POST'])
 @login_required
+@query_budget(LINEUP_QUERY_BUDGET)
 def add_lineup():
-    db = SessionLocal()
-    try:
-        payload = request.get_json()
-        if not payload or 'title' not in payload or 'lineup_data' not in payload:
-            return jsonify({'status': 'error', 'message': 'Invalid lineup data.'}), 400
-        new_lineup = Lineup(
-            title=payload['title'], lineup_positions=json.dumps(payload['lineup_data']),
-            associated_game_id=int(payload['associated_game_id']) if payload.get('associated_game_id') else None, team_id=session['team_id']
-        )
-        db.add(new_lineup)
-        _sync_lineup_to_rotation(db, new_lineup)
-        db.commit()
-        socketio.emit('data_updated', {'message': 'New lineup added.'})
-        return jsonify({'status': 'success', 'message': f'Lineup "{new_lineup.title}" created successfully!'})
-    finally:
-        db.close()
+    db = get_db()
+    payload = request.get_json()
+    if not payload or 'title' not in payload or not lineup_slots.is_lineup_data(payload.get('lineup_data')):
+        return jsonify({'status': 'error', 'message': 'Invalid lineup data.'}), 400
+    new_lineup = Lineup(
+        title=payload['title'], slots=lineup_slots.build_slots(db, session['team_id'], payload['lineup_data']),
+        associated_game_id=int(payload['associated_game_id']) if payload.get('associated_game_id') else None, team_id=session['team_id']
+    )
+    db.add(new_lineup)
+    _sync_lineup_to_rotation(db, new_lineup)
+    db.commit()
+    notify_team_data_changed(session['team_id'], 'New lineup added.')
+    return jsonify({'status': 'success', 'message': f'Lineup "{new_lineup.title}" created successfully!'})
 
 @app.route('/edit_lineup/<int:lineup_id>', methods=['POST'])
 @login_required
+@query_budget(LINEUP_QUERY_BUDGET)
 def edit_lineup(lineup_id):
-    db = SessionLocal()
-    try:
-        lineup_to_edit = db.query(Lineup).filter_by(id=lineup_id, team_id=session['team_id']).first()
-        if not lineup_to_edit:
-            return jsonify({'status': 'error', 'message': 'Lineup not found.'}), 404
-        payload = request.get_json()
-        if not payload or 'title' not in payload or 'lineup_data' not in payload:
-            return jsonify({'status': 'error', 'message': 'Invalid lineup data.'}), 400
-        lineup_to_edit.title = payload['title']
-        lineup_to_edit.lineup_positions = json.dumps(payload['lineup_data'])
-        lineup_to_edit.associated_game_id = int(payload.get('associated_game_id')) if payload.get('associated_game_id') else None
-        _sync_lineup_to_rotation(db, lineup_to_edit)
-        db.commit()
-        socketio.emit('data_updated', {'message': 'Lineup updated.'})
-        return jsonify({'status': 'success', 'message': f'Lineup "{lineup_to_edit.title}" updated successfully!'})
-    finally:
-        db.close()
+    db = get_db()
+    lineup_to_edit = db.query(Lineup).filter_by(id=lineup_id, team_id=session['team_id']).first()
+    if not lineup_to_edit:
+        return jsonify({'status': 'error', 'message': 'Lineup not found.'}), 404
+    payload = request.get_json()
+    if not payload or 'title' not in payload or not lineup_slots.is_lineup_data(payload.get('lineup_data')):
+        return jsonify({'status': 'error', 'message': 'Invalid lineup data.'}), 400
+    lineup_to_edit.title = payload['title']
+    lineup_to_edit.slots = lineup_slots.build_slots(db, session['team_id'], payload['lineup_data'])
+    lineup_to_edit.associated_game_id = int(payload.get('associated_game_id')) if payload.get('associated_game_id') else None
+    _sync_lineup_to_rotation(db, lineup_to_edit)
+    db.commit()
+    notify_team_data_changed(session['team_id'], 'Lineup updated.')
+    return jsonify({'status': 'success', 'message': f'Lineup "{lineup_to_edit.title}" updated successfully!'})
 
 
 @app.route('/delete_lineup/<int:lineup_id>')
 @login_required
 def delete_lineup(lineup_id):
-    db = SessionLocal()
-    try:
-        lineup_to_delete = db.query(Lineup).filter_by(id=lineup_id, team_id=session['team_id']).first()
-        if lineup_to_delete:
-            db.delete(lineup_to_delete)
-            db.commit()
-            flash(f'Lineup "{lineup_to_delete.title}" deleted successfully!', 'success')
-            socketio.emit('data_updated', {'message': 'Lineup deleted.'})
-        else:
-            flash('Lineup not found.', 'danger')
-        redirect_url = request.referrer or url_for('home', _anchor='lineups')
-        return redirect(redirect_url)
-    finally:
-        db.close()
+    db = get_db()
+    lineup_to_delete = db.query(Lineup).filter_by(id=lineup_id, team_id=session['team_id']).first()
+    if lineup_to_delete:
+        db.delete(lineup_to_delete)
+        db.commit()
+        flash(f'Lineup "{lineup_to_delete.title}" deleted successfully!', 'success')
+        notify_team_data_changed(session['team_id'], 'Lineup deleted.')
+    else:
+        flash('Lineup not found.', 'danger')
+    redirect_url = request.referrer or url_for('home', _anchor='lineups')
+    return redirect(redirect_url)
+
 
+serialize_game_details = model_serializer(Game, ("id", "date", "opponent", "location", "game_notes"))
 
 @app.route('/game/<int:game_id>')
 @login_required
+@query_budget(SNAPSHOT_QUERY_BUDGET)
 def game_management(game_id):
-    db = SessionLocal()
-    try:
-        team_id = session['team_id']
-        game = db.query(Game).filter_by(id=game_id, team_id=team_id).first()
-        if not game:
-            flash('Game not found.', 'danger')
-            return redirect(url_for('home', _anchor='games'))
-        game_dict = {"id": game.id, "date": game.date, "opponent": game.opponent, "location": game.location, "game_notes": game.game_notes}
-        roster_objects = db.query(Player).filter_by(team_id=team_id).all()
-        roster_list = [{"id": p.id, "name": p.name, "number": p.number, "position1": p.position1, "position2": p.position2, "position3": p.position3, "throws": p.throws, "bats": p.bats} for p in roster_objects]
-        lineup_obj = db.query(Lineup).filter_by(associated_game_id=game.id, team_id=team_id).first()
-        if lineup_obj:
-            lineup_dict = {"id": lineup_obj.id, "title": lineup_obj.title, "lineup_positions": json.loads(lineup_obj.lineup_positions or "[]"), "associated_game_id": lineup_obj.associated_game_id}
-        else:
-            lineup_dict = {"id": None, "title": f"Lineup for vs {game.opponent}", "lineup_positions": [], "associated_game_id": game.id}
-        rotation_obj = db.query(Rotation).filter_by(associated_game_id=game.id, team_id=team_id).first()
-        if rotation_obj:
-            rotation_dict = {"id": rotation_obj.id, "title": rotation_obj.title, "innings": json.loads(rotation_obj.innings or "{}"), "associated_game_id": rotation_obj.associated_game_id}
-        else:
-            rotation_dict = {"id": None, "title": f"Rotation for vs {game.opponent}", "innings": {}, "associated_game_id": game.id}
-        pitching_outings = db.query(PitchingOuting).filter_by(team_id=team_id).all()
-        pitcher_names = sorted(list(set(p["name"] for p in roster_list)))
-        pitch_count_summary = {}
-        for name in pitcher_names:
-            counts = calculate_pitch_counts(name, pitching_outings)
-            availability = calculate_pitcher_availability(name, pitching_outings)
-            cumulative_stats = calculate_cumulative_pitching_stats(name, pitching_outings)
-            pitch_count_summary[name] = {**counts, **availability, **cumulative_stats}
-        game_pitching_log = [p for p in pitching_outings if p.opponent == game.opponent and p.date == game.date]
-        return render_template('game_management.html', game=game_dict, roster=roster_list, lineup=lineup_dict, rotation=rotation_dict, pitch_count_summary=pitch_count_summary, game_pitching_log=game_pitching_log, session=session)
-    finally:
-        db.close()
+    db = get_db()
+    team_id = session['team_id']
+    game = db.query(Game).filter_by(id=game_id, team_id=team_id).first()
+    if not game:
+        flash('Game not found.', 'danger')
+        return redirect(url_for('home', _anchor='games'))
+    game_dict = serialize_game_details(game)
+    snapshot = get_team_snapshot(db, game.team)
+    app_data = snapshot['full_data']
+    roster_list = [{key: p[key] for key in ("id", "name", "number", "position1", "position2", "position3", "throws", "bats")} for p in app_data['roster']]
+    lineup_dict = next((l for l in app_data['lineups'] if l['associated_game_id'] == game.id), None)
+    if lineup_dict is None:
+        lineup_dict = {"id": None, "title": f"Lineup for vs {game.opponent}", "lineup_positions": [], "associated_game_id": game.id}
+    rotation_dict = next((r for r in app_data['rotations'] if r['associated_game_id'] == game.id), None)
+    if rotation_dict is None:
+        rotation_dict = {"id": None, "title": f"Rotation for vs {game.opponent}", "innings": {}, "associated_game_id": game.id}
+    # Every roster player gets a row, including those who have not pitched yet.
+    pitch_count_summary = {name: snapshot['pitch_count_summary'].get(name) or empty_pitch_count_summary() for name in sorted(set(p["name"] for p in roster_list))}
+    game_pitching_log = [p for p in app_data['pitching'] if p['opponent'] == game.opponent and p['date'] == game_dict['date']]
+    return render_template('game_management.html', game=game_dict, roster=roster_list, lineup=lineup_dict, rotation=rotation_dict, pitch_count_summary=pitch_count_summary, game_pitching_log=game_pitching_log, session=session)
 
 
 @app.route('/edit_game/<int:game_id>', methods=['POST'])
 @login_required
 def edit_game(game_id):
-    db = SessionLocal()
-    try:
-        game_to_edit = db.query(Game).filter_by(id=game_id, team_id=session['team_id']).first()
-        if not game_to_edit:
-            flash('Game not found.', 'danger')
-            return redirect(url_for('home', _anchor='games'))
-        game_to_edit.date = request.form.get('game_date', game_to_edit.date)
-        game_to_edit.opponent = request.form.get('game_opponent', game_to_edit.opponent)
-        game_to_edit.location = request.form.get('game_location', game_to_edit.location)
-        game_to_edit.game_notes = request.form.get('game_notes', game_to_edit.game_notes)
-        db.commit()
-        flash('Game details updated successfully!', 'success')
-        socketio.emit('data_updated', {'message': 'Game details updated.'})
-        return redirect(url_for('game_management', game_id=game_id))
-    finally:
-        db.close()
+    db = get_db()
+    game_to_edit = db.query(Game).filter_by(id=game_id, team_id=session['team_id']).first()
+    if not game_to_edit:
+        flash('Game not found.', 'danger')
+        return redirect(url_for('home', _anchor='games'))
+    game_to_edit.date = parse_date(request.form.get('game_date')) or game_to_edit.date
+    game_to_edit.opponent = request.form.get('game_opponent', game_to_edit.opponent)
+    game_to_edit.location = request.form.get('game_location', game_to_edit.location)
+    game_to_edit.game_notes = request.form.get('game_notes', game_to_edit.game_notes)
+    db.commit()
+    flash('Game details updated successfully!', 'success')
+    notify_team_data_changed(session['team_id'], 'Game details updated.')
+    return redirect(url_for('game_management', game_id=game_id))
 
 
 @app.route('/delete_practice_plan/<int:plan_id>')
 @login_required
 def delete_practice_plan(plan_id):
-    db = SessionLocal()
-    try:
-        plan_to_delete = db.query(PracticePlan).filter_by(id=plan_id, team_id=session['team_id']).first()
-        if plan_to_delete:
-            db.query(PracticeTask).filter_by(practice_plan_id=plan_to_delete.id).delete()
-            db.delete(plan_to_delete)
-            db.commit()
-            flash('Practice plan deleted successfully!', 'success')
-            socketio.emit('data_updated', {'message': 'Practice plan deleted.'})
-        else:
-            flash('Practice plan not found.', 'danger')
-        return redirect(url_for('home', _anchor='practice_plan'))
-    finally:
-        db.close()
+    db = get_db()
+    plan_to_delete = db.query(PracticePlan).filter_by(id=plan_id, team_id=session['team_id']).first()
+    if plan_to_delete:
+        db.query(PracticeTask).filter_by(practice_plan_id=plan_to_delete.id).delete()
+        db.delete(plan_to_delete)
+        db.commit()
+        flash('Practice plan deleted successfully!', 'success')
+        notify_team_data_changed(session['team_id'], 'Practice plan deleted.')
+    else:
+        flash('Practice plan not found.', 'danger')
+    return redirect(url_for('home', _anchor='practice_plan'))
 
 
 @app.route('/edit_practice_plan/<int:plan_id>', methods=['POST'])
 @login_required
 def edit_practice_plan(plan_id):
-    db = SessionLocal()
-    try:
-        plan_to_edit = db.query(PracticePlan).filter_by(id=plan_id, team_id=session['team_id']).first()
-        if plan_to_edit:
-            new_date = request.form.get('plan_date')
-            new_notes = request.form.get('general_notes')
-            if not new_date:
-                flash('Plan date cannot be empty.', 'danger')
-            else:
-                plan_to_edit.date = new_date
-                plan_to_edit.general_notes = new_notes
-                db.commit()
-                flash('Practice plan updated successfully!', 'success')
-                socketio.emit('data_updated', {'message': 'Practice plan updated.'})
+    db = get_db()
+    plan_to_edit = db.query(PracticePlan).filter_by(id=plan_id, team_id=session['team_id']).first()
+    if plan_to_edit:
+        new_date = parse_date(request.form.get('plan_date'))
+        new_notes = request.form.get('general_notes')
+        if not new_date:
+            flash('Plan date cannot be empty.', 'danger')
         else:
-            flash('Practice plan not found.', 'danger')
-        return redirect(url_for('home', _anchor='practice_plan'))
-    finally:
-        db.close()
+            plan_to_edit.date = new_date
+            plan_to_edit.general_notes = new_notes
+            db.commit()
+            flash('Practice plan updated successfully!', 'success')
+            notify_team_data_changed(session['team_id'], 'Practice plan updated.')
+    else:
+        flash('Practice plan not found.', 'danger')
+    return redirect(url_for('home', _anchor='practice_plan'))
+
+
+# Run every view through the query budget check and the database thread pool; responses are
+# still written by the hub.
+for endpoint, view in list(app.view_functions.items()):
+    if endpoint != 'static':
+        app.view_functions[endpoint] = db_executor.wrap(enforce_query_budget(view))
 
 
 if __name__ == '__main__':
@@ -0,0 +1,164 @@
+# benchmarks/json_encoding.py
+"""
+Encode time, output size and peak allocations of the JSON providers (json_provider.py) on the
+/get_app_data payload of a synthetic full team, built by snapshot.py from a temporary database.
+
+    python benchmarks/json_encoding.py [--seasons N] [--repeat N]
+
+The orjson rows are only shown when orjson is installed (pip install -r requirements-optional.txt).
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date, datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy.orm import sessionmaker
+from db import make_engine
+from models import (
+    Base, Team, User, Player, Lineup, LineupSlot, PitchingOuting, ScoutedPlayer, Rotation, Game,
+    CollaborationNote, PracticePlan, PracticeTask, PlayerDevelopmentFocus, Sign
+)
+from pitcher_workload import rebuild_workloads
+from player_activity import rebuild_player_activity
+from rotation_assignments import rebuild_assignments
+import json_provider
+import snapshot
+
+POSITIONS = ['P', 'C', '1B', '2B', '3B', 'SS', 'LF', 'CF', 'RF']
+WORDS = ('footwork glove work throwing accuracy bunting base running hitting approach two strike '
+         'swing path pitch selection catcher framing cutoff relays — señor café ☆').split()
+
+
+def _text(rng, words=12):
+    return ' '.join(rng.choice(WORDS) for _ in range(words))
+
+
+def seed_team(db, seasons, rng):
+    """A team with a full roster and `seasons` seasons of games, outings, notes and plans."""
+    team = Team(team_name='Benchmark Team', registration_code='BENCH')
+    db.add(team)
+    db.flush()
+    db.add(User(username='coach', full_name='Coach Benchmark', password_hash='x', team_id=team.id, tab_order=[]))
+    players = [Player(name=f'Player {i}', number=str(i), position1=POSITIONS[i % 9], position2=POSITIONS[(i + 3) % 9],
+                      throws='R', bats='L', notes=_text(rng, 30), pitcher_role='Starter' if i < 8 else 'Not a Pitcher',
+                      has_lessons='Yes', lesson_focus=_text(rng), notes_author='coach', notes_timestamp=datetime.now(),
+                      team_id=team.id) for i in range(18)]
+    db.add_all(players)
+    db.flush()
+    start = date.today() - timedelta(days=365 * seasons)
+    for player in players:
+        for i in range(4 * seasons):
+            db.add(PlayerDevelopmentFocus(focus=_text(rng, 6), status=rng.choice(['active', 'completed']), notes=_text(rng),
+                                          created_date=start + timedelta(days=rng.randrange(365 * seasons)), completed_date=date.today(),
+                                          author='coach', player_id=player.id, team_id=team.id, skill_type=rng.choice(['hitting', 'fielding'])))
+        for i in range(10 * seasons):
+            db.add(CollaborationNote(note_type='player_notes', text=_text(rng, 25), author='coach', player_name=player.name,
+                                     timestamp=datetime.now() - timedelta(hours=rng.randrange(8760 * seasons)), team_id=team.id))
+    for i in range(40 * seasons):
+        game_day = start + timedelta(days=i * 9 // seasons)
+        game = Game(date=game_day, opponent=f'Opponent {i % 25}', location='Park', game_notes=_text(rng, 20), team_id=team.id)
+        db.add(game)
+        db.flush()
+        order = rng.sample(players, 12)
+        db.add(Lineup(title=f'Lineup {i}', associated_game_id=game.id, team_id=team.id, slots=[
+            LineupSlot(batting_order=n, player_id=p.id, player_name=p.name, position=POSITIONS[n % 9] if n <= 9 else 'EH', team_id=team.id)
+            for n, p in enumerate(order, 1)]))
+        db.add(Rotation(title=f'vs Opponent {i % 25}', associated_game_id=game.id, team_id=team.id, innings={
+            str(inning): {pos: p.name for pos, p in zip(POSITIONS, rng.sample(players, 9))} for inning in range(1, 8)}))
+        for pitcher in rng.sample(players[:8], 3):
+            db.add(PitchingOuting(date=game_day, pitcher=pitcher.name, opponent=game.opponent, pitches=rng.randrange(10, 85),
+                                  innings=rng.choice([0.1, 1.0, 1.2, 2.0, 3.1, float('inf')]), pitcher_type='Starter',
+                                  outing_type='Game', team_id=team.id))
+    for i in range(60 * seasons):
+        db.add(CollaborationNote(note_type='team_notes', text=_text(rng, 40), author='coach',
+                                 timestamp=datetime.now() - timedelta(hours=i), team_id=team.id))
+    for i in range(25 * seasons):
+        plan = PracticePlan(date=start + timedelta(days=i * 14 // seasons), general_notes=_text(rng, 20), team_id=team.id)
+        plan.tasks = [PracticeTask(text=_text(rng, 8), status=rng.choice(['pending', 'complete']), author='coach',
+                                   timestamp=datetime.now()) for _ in range(6)]
+        db.add(plan)
+    for i in range(30):
+        db.add(ScoutedPlayer(name=f'Scout {i}', position1=rng.choice(POSITIONS), list_type=rng.choice(['committed', 'targets', 'not_interested']), team_id=team.id))
+    for i in range(15):
+        db.add(Sign(name=f'Sign {i}', indicator=_text(rng, 3), team_id=team.id))
+    db.flush()
+    connection = db.connection()
+    rebuild_workloads(connection)
+    rebuild_player_activity(connection)
+    rebuild_assignments(connection)
+    db.commit()
+    return team
+
+
+def build_payload(db, team):
+    """The /get_app_data body for the team (build_client_state without the request's session info)."""
+    team_snapshot = snapshot.build_team_snapshot(db, team)
+    return {'full_data': team_snapshot['full_data'], 'player_order': [p['name'] for p in team_snapshot['full_data']['roster']],
+            'session': {'username': 'coach', 'full_name': 'Coach Benchmark', 'role': 'Head Coach'},
+            'pitch_count_summary': team_snapshot['pitch_count_summary'], 'version': 1}
+
+
+def measure(encode, repeat):
+    """(median seconds, output bytes, peak traced allocation bytes) of encode()."""
+    encode()
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        encode()
+        timings.append(time.perf_counter() - started)
+    tracemalloc.start()
+    output = encode()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return statistics.median(timings), len(output if isinstance(output, bytes) else output.encode()), peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--seasons', type=int, default=3, help='seasons of history in the synthetic team')
+    parser.add_argument('--repeat', type=int, default=30, help='timed encodes per case')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        engine = make_engine(f"sqlite:///{os.path.join(directory, 'bench.db')}")
+        Base.metadata.create_all(engine)
+        db = sessionmaker(bind=engine)()
+        team = seed_team(db, args.seasons, random.Random(0))
+        app = Flask(__name__)
+        with app.app_context():
+            payload = build_payload(db, team)
+        db.close()
+        engine.dispose()
+
+    providers = [('stdlib', DefaultJSONProvider(app))]
+    if json_provider.orjson is not None:
+        providers.append(('orjson', json_provider.OrjsonProvider(app)))
+        # Same data, except non-finite floats, which orjson writes as null (see json_provider.py).
+        stdlib_decoded = json.loads(providers[0][1].dumps(payload), parse_constant=lambda constant: None)
+        assert json.loads(providers[1][1].dumps(payload)) == stdlib_decoded
+
+    print(f"Payload: {len(payload['full_data']['pitching'])} outings, {len(payload['full_data']['games'])} games, "
+          f"{sum(len(notes) for notes in payload['full_data']['collaboration_notes'].values())} notes")
+    print(f"{'encoder':8} {'call':10} {'median ms':>10} {'size KiB':>9} {'peak KiB':>9}")
+    with app.test_request_context('/'):
+        for name, provider in providers:
+            cases = [('dumps', lambda: provider.dumps(payload)), ('response', lambda: provider.response(payload).get_data())]
+            for call, encode in cases:
+                seconds, size, peak = measure(encode, args.repeat)
+                print(f"{name:8} {call:10} {seconds * 1000:10.2f} {size / 1024:9.1f} {peak / 1024:9.1f}")
+    if json_provider.orjson is None:
+        print("orjson is not installed; only the stdlib provider was measured.")
+
+
+if __name__ == '__main__':
+    main()
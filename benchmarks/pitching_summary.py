@@ -0,0 +1,110 @@
+# benchmarks/pitching_summary.py
+"""
+Time of the team's pitch count summary over a 5,000-outing season: the reference rules in
+stats.py (every pitcher's three calculate_* scans over the loaded outings) against
+pitching_queries.query_pitch_count_summary, which reads the pitcher_workload ledger and this
+week's outings. Also times adding one outing, which is where the ledger's upkeep is paid.
+
+    python benchmarks/pitching_summary.py [--outings N] [--pitchers N] [--repeat N]
+
+Both summaries are checked to match before timing.
+"""
+import argparse
+import math
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy.orm import sessionmaker
+from db import make_engine
+from models import Base, Team, PitchingOuting
+from pitcher_workload import install_workload_ledger
+from pitching_queries import query_pitch_count_summary
+from stats import calculate_pitch_counts, calculate_pitcher_availability, calculate_cumulative_pitching_stats
+
+INNINGS = [0.1, 0.2, 1.0, 1.1, 2.0, 2.2, 3.0, 4.1, 5.0, 6.2, 7.0]
+
+
+def reference_summary(db, team_id):
+    """The summary as game_management() computed it before the ledger: three scans per pitcher."""
+    outings = db.query(PitchingOuting).filter(PitchingOuting.team_id == team_id).all()
+    return {name: {**calculate_pitch_counts(name, outings), **calculate_pitcher_availability(name, outings),
+                   **calculate_cumulative_pitching_stats(name, outings)}
+            for name in {outing.pitcher for outing in outings}}
+
+
+def same_summary(actual, expected):
+    return actual.keys() == expected.keys() and all(
+        actual[name].keys() == expected[name].keys() and all(
+            math.isclose(value, expected[name][key]) if isinstance(value, float) else value == expected[name][key]
+            for key, value in actual[name].items())
+        for name in expected)
+
+
+def seed(session_factory, outings, pitchers, rng):
+    """One team's season of outings, spread over the year up to today, through the ledger hooks."""
+    today = date.today()
+    with session_factory() as db:
+        team = Team(team_name='Benchmark Team', registration_code='BENCH')
+        db.add(team)
+        db.flush()
+        db.add_all(PitchingOuting(date=today - timedelta(days=rng.randrange(today.timetuple().tm_yday)),
+                                  pitcher=f'Pitcher {rng.randrange(pitchers)}', opponent='Opponent',
+                                  pitches=rng.randrange(10, 95), innings=rng.choice(INNINGS), pitcher_type='Starter',
+                                  outing_type='Game', team_id=team.id) for _ in range(outings))
+        db.commit()
+        return team.id
+
+
+def measure(run, repeat):
+    run()
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        run()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--outings', type=int, default=5000, help='outings in the season')
+    parser.add_argument('--pitchers', type=int, default=20, help='pitchers sharing them')
+    parser.add_argument('--repeat', type=int, default=10, help='timed runs per case')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        engine = make_engine(f"sqlite:///{os.path.join(directory, 'bench.db')}")
+        Base.metadata.create_all(engine)
+        session_factory = sessionmaker(bind=engine)
+        install_workload_ledger(session_factory)
+        rng = random.Random(0)
+        team_id = seed(session_factory, args.outings, args.pitchers, rng)
+
+        with session_factory() as db:
+            assert same_summary(query_pitch_count_summary(db, team_id), reference_summary(db, team_id))
+
+            def add_outing():
+                db.add(PitchingOuting(date=date.today(), pitcher=f'Pitcher {rng.randrange(args.pitchers)}', opponent='Opponent',
+                                      pitches=rng.randrange(10, 95), innings=1.0, team_id=team_id))
+                db.commit()
+
+            cases = [
+                ('stats.py reference', lambda: reference_summary(db, team_id)),
+                ('query_pitch_count_summary', lambda: query_pitch_count_summary(db, team_id)),
+                ('add one outing (ledger)', add_outing),
+            ]
+            print(f"{args.outings} outings, {args.pitchers} pitchers, median of {args.repeat} runs")
+            for name, run in cases:
+                print(f"{name:28} {measure(run, args.repeat) * 1000:9.2f} ms")
+        engine.dispose()
+
+
+if __name__ == '__main__':
+    main()
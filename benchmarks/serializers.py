@@ -0,0 +1,132 @@
+# benchmarks/serializers.py
+"""
+Time of the generated per-model serializers (models.model_serializer) against the generic
+code they replaced, over 10k rows per model loaded from a temporary database:
+
+    - instances: the old to_dict, which inspected every instance, read each column attribute
+      and tried json.loads on any string starting with '[' or '{'
+    - rows (the snapshot's db.query(*Model.__table__.columns)): the old hand-written dict of
+      row attributes
+
+    python benchmarks/serializers.py [--rows N] [--repeat N]
+
+Both sides give the same dicts; the script checks that before timing.
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy.inspection import inspect as sqlalchemy_inspect
+from sqlalchemy.orm import sessionmaker
+from db import make_engine
+from models import Base, Team, Player, PitchingOuting, Rotation, Game, to_dict, format_date, format_timestamp
+import snapshot
+
+POSITIONS = ['P', 'C', '1B', '2B', '3B', 'SS', 'LF', 'CF', 'RF']
+
+
+def generic_to_dict(instance):
+    """models.to_dict before the generated serializers, with today's date formatting."""
+    d = {}
+    for column in sqlalchemy_inspect(instance).mapper.column_attrs:
+        val = getattr(instance, column.key)
+        if isinstance(val, datetime):
+            val = format_timestamp(val)
+        elif isinstance(val, date):
+            val = format_date(val)
+        if isinstance(val, str) and val.startswith(('[', '{')):
+            try:
+                val = json.loads(val)
+            except json.JSONDecodeError:
+                pass
+        d[column.key] = val
+    return d
+
+
+def row_dict(fields, formatters):
+    """The hand-written per-row dict the snapshot built before the generated serializers."""
+    def serialize(row):
+        return {field: formatters[field](getattr(row, field)) if field in formatters else getattr(row, field)
+                for field in fields}
+    return serialize
+
+
+def seed(db, rows, rng):
+    team = Team(team_name='Benchmark Team', registration_code='BENCH')
+    db.add(team)
+    db.flush()
+    today = date.today()
+    db.add_all(Player(name=f'Player {i}', number=str(i % 99), position1=rng.choice(POSITIONS), position2=rng.choice(POSITIONS),
+                      throws='R', bats='L', notes='Works on footwork and glove work', pitcher_role='Starter',
+                      has_lessons='Yes', lesson_focus='Hitting approach', notes_author='coach',
+                      notes_timestamp=datetime.now() - timedelta(hours=i), team_id=team.id) for i in range(rows))
+    db.add_all(PitchingOuting(date=today - timedelta(days=i % 365), pitcher=f'Player {i % 15}', opponent='Opponent',
+                              pitches=rng.randrange(10, 85), innings=2.0, pitcher_type='Starter', outing_type='Game',
+                              team_id=team.id) for i in range(rows))
+    db.add_all(Rotation(title=f'Rotation {i}', team_id=team.id, innings={
+        str(inning): dict(zip(POSITIONS, rng.sample([f'Player {n}' for n in range(15)], 9))) for inning in range(1, 8)})
+        for i in range(rows))
+    db.add_all(Game(date=today + timedelta(days=i % 365), opponent=f'Opponent {i % 25}', location='Park',
+                    game_notes='Bring both uniforms', team_id=team.id) for i in range(rows))
+    db.commit()
+
+
+def measure(serialize, items, repeat):
+    """(median seconds, results) of serializing every item."""
+    results = [serialize(item) for item in items]
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for item in items:
+            serialize(item)
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings), results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=10000, help='rows per model')
+    parser.add_argument('--repeat', type=int, default=5, help='timed passes per case')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        engine = make_engine(f"sqlite:///{os.path.join(directory, 'bench.db')}")
+        Base.metadata.create_all(engine)
+        db = sessionmaker(bind=engine)()
+        seed(db, args.rows, random.Random(0))
+
+        outing_fields = ("id", "date", "pitcher", "opponent", "pitches", "innings", "pitcher_type", "outing_type")
+        game_fields = ("id", "date", "opponent", "location", "game_notes", "associated_lineup_title", "associated_rotation_date")
+        cases = [
+            ('to_dict(Player)', 'instances', db.query(Player).all(), generic_to_dict, to_dict),
+            ('to_dict(PitchingOuting)', 'instances', db.query(PitchingOuting).all(), generic_to_dict, to_dict),
+            ('serialize_pitching_outing', 'rows', db.query(*PitchingOuting.__table__.columns).all(),
+             row_dict(outing_fields, {'date': format_date}), snapshot._serialize_pitching_fields),
+            ('serialize_rotation', 'rows', db.query(*Rotation.__table__.columns).all(),
+             row_dict(("id", "title", "innings", "associated_game_id"), {}), snapshot.serialize_rotation),
+            ('serialize_game', 'rows', db.query(*Game.__table__.columns).all(),
+             row_dict(game_fields, {'date': format_date}), snapshot.serialize_game),
+        ]
+
+        print(f"{args.rows} rows per case, median of {args.repeat} passes")
+        print(f"{'case':28} {'input':10} {'generic ms':>11} {'generated ms':>13} {'speedup':>8}")
+        for name, kind, items, generic, generated in cases:
+            generic_seconds, expected = measure(generic, items, args.repeat)
+            generated_seconds, results = measure(generated, items, args.repeat)
+            assert results == expected, name
+            print(f"{name:28} {kind:10} {generic_seconds * 1000:11.1f} {generated_seconds * 1000:13.1f} "
+                  f"{generic_seconds / generated_seconds:7.1f}x")
+        db.close()
+        engine.dispose()
+
+
+if __name__ == '__main__':
+    main()
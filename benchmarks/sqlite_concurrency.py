@@ -0,0 +1,108 @@
+# benchmarks/sqlite_concurrency.py
+"""
+Read throughput while a writer is active, with the engine from db.py (WAL, SQLITE_PRAGMAS,
+QueuePool) against a plain create_engine on a rollback-journal database. Reader threads run
+a team's pitching query through the engine, and a separate writer process updates a tenth
+of the table and commits, in a loop.
+
+    python benchmarks/sqlite_concurrency.py [--seconds N] [--readers N] [--rows N]
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, select
+from db import SQLITE_PRAGMAS, make_engine
+from models import Base, Team, PitchingOuting
+
+
+def seed(engine, rows):
+    Base.metadata.create_all(engine)
+    rng = random.Random(0)
+    with engine.begin() as connection:
+        connection.execute(Team.__table__.insert(), [{'id': team_id, 'team_name': f'Team {team_id}',
+                                                      'registration_code': f'CODE-{team_id}'} for team_id in range(1, 11)])
+        connection.execute(PitchingOuting.__table__.insert(), [
+            {'date': date.today() - timedelta(days=rng.randrange(365)), 'pitcher': f'Pitcher {rng.randrange(15)}',
+             'opponent': 'Opponent', 'pitches': rng.randrange(10, 85), 'innings': 2.0, 'pitcher_type': 'Starter',
+             'outing_type': 'Game', 'team_id': rng.randrange(1, 11)} for _ in range(rows)])
+
+
+def write_loop(path, pragmas, started, stop, commits):
+    """Writer process: updates a tenth of pitching_outings per transaction until stopped."""
+    connection = sqlite3.connect(path, timeout=30)
+    for name, value in pragmas.items():
+        connection.execute(f'PRAGMA {name}={value}')
+    started.set()
+    count = 0
+    while not stop.is_set():
+        connection.execute('UPDATE pitching_outings SET pitches = pitches + 1 WHERE id % 10 = ?', (count % 10,))
+        connection.commit()
+        count += 1
+    commits.value = count
+    connection.close()
+
+
+def run(engine, path, pragmas, seconds, readers):
+    """(reads per second, writer commits) with `readers` threads reading through `engine`."""
+    started, stop = multiprocessing.Event(), multiprocessing.Event()
+    commits = multiprocessing.Value('i', 0)
+    writer = multiprocessing.Process(target=write_loop, args=(path, pragmas, started, stop, commits))
+    writer.start()
+    started.wait()
+
+    reads = [0] * readers
+    deadline = time.perf_counter() + seconds
+
+    def read_loop(reader):
+        while time.perf_counter() < deadline:
+            with engine.connect() as connection:
+                connection.execute(select(PitchingOuting.__table__).where(
+                    PitchingOuting.team_id == reader % 10 + 1).order_by(PitchingOuting.date.desc())).all()
+            reads[reader] += 1
+
+    threads = [threading.Thread(target=read_loop, args=(reader,)) for reader in range(readers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    stop.set()
+    writer.join()
+    return sum(reads) / seconds, commits.value
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--seconds', type=float, default=3.0, help='duration of each run')
+    parser.add_argument('--readers', type=int, default=4, help='reader threads')
+    parser.add_argument('--rows', type=int, default=2000, help='pitching outings in the table')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        configurations = [
+            ('rollback journal', lambda url: create_engine(url, connect_args={'check_same_thread': False}),
+             {'journal_mode': 'DELETE', 'busy_timeout': SQLITE_PRAGMAS['busy_timeout']}),
+            ('db.py engine', make_engine, SQLITE_PRAGMAS),
+        ]
+        print(f"{args.readers} readers, 1 writer, {args.rows} rows, {args.seconds:g} s per run")
+        print(f"{'engine':18} {'reads/s':>9} {'writer commits':>15}")
+        for name, build_engine, writer_pragmas in configurations:
+            path = os.path.join(directory, f"{name.replace(' ', '_')}.db")
+            engine = build_engine(f'sqlite:///{path}')
+            seed(engine, args.rows)
+            reads_per_second, commits = run(engine, path, writer_pragmas, args.seconds, args.readers)
+            engine.dispose()
+            print(f"{name:18} {reads_per_second:9.0f} {commits:15d}")
+
+
+if __name__ == '__main__':
+    main()
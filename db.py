@@ -1,6 +1,47 @@
 # db.py
-from sqlalchemy import create_engine
+import os
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool
 
-engine = create_engine('sqlite:///app.db', echo=False) # Changed to app.db
+DATABASE_PATH = os.environ.get('DATABASE_PATH', 'app.db')
+DATABASE_URL = f'sqlite:///{DATABASE_PATH}'
+
+# Applied to every new connection. WAL lets pages keep reading while an edit commits,
+# and NORMAL sync is still crash-safe in WAL mode (only the last commits can be lost on
+# power failure). cache_size is in KiB when negative.
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 5000)),
+    'cache_size': -16000,
+    'mmap_size': 256 * 1024 * 1024,
+    'temp_store': 'MEMORY',
+}
+
+
+def configure_sqlite_connection(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    for name, value in SQLITE_PRAGMAS.items():
+        cursor.execute(f'PRAGMA {name}={value}')
+    cursor.close()
+
+
+def make_engine(url=DATABASE_URL):
+    """
+    Engine for the app database. Connections are pooled and may be used from any thread
+    (check_same_thread=False), since a session is only ever used by one request or task at a
+    time. The pool never makes a caller wait for a connection (max_overflow=-1): under
+    eventlet without monkey patching a green thread blocking on the pool's lock would stall
+    every other one, while extra SQLite connections are cheap.
+    """
+    engine = create_engine(
+        url, echo=False, poolclass=QueuePool, pool_size=int(os.environ.get('DB_POOL_SIZE', 10)), max_overflow=-1,
+        connect_args={'check_same_thread': False}
+    )
+    event.listen(engine, 'connect', configure_sqlite_connection)
+    return engine
+
+
+engine = make_engine()
 SessionLocal = sessionmaker(bind=engine)
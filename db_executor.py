@@ -0,0 +1,80 @@
+# db_executor.py
+import contextvars
+import threading
+import time
+from collections import deque
+from functools import wraps
+from flask import g, has_request_context
+
+
+class DatabaseExecutor:
+    """
+    Runs blocking database work on a bounded pool of native threads.
+
+    sqlite3 and SQLAlchemy calls block the OS thread they run in. Under the eventlet server
+    that thread also serves every socket and request, so one slow snapshot build would stall
+    them all. When enabled, run() hands the call to eventlet's tpool and the calling green
+    thread yields until it finishes. Flask's request and app contexts travel with the call.
+
+    The time each call waits for a free worker is recorded per request (g.db_queue_wait)
+    and in aggregate (stats()). When disabled (no eventlet), calls run inline.
+    """
+
+    def __init__(self, enabled, num_threads=10, history=1000):
+        self.enabled = enabled
+        self.num_threads = num_threads
+        self._recent_waits = deque(maxlen=history)
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        if enabled:
+            from eventlet import tpool
+            tpool.set_num_threads(num_threads)
+            self._tpool = tpool
+
+    def run(self, fn, *args, **kwargs):
+        if not self.enabled:
+            return fn(*args, **kwargs)
+        context = contextvars.copy_context()
+        submitted = time.perf_counter()
+        waited = []
+        def call():
+            waited.append(time.perf_counter() - submitted)
+            return context.run(fn, *args, **kwargs)
+        try:
+            return self._tpool.execute(call)
+        finally:
+            if waited:
+                self._record_wait(waited[0])
+
+    def wrap(self, view):
+        """Decorates a view so its body runs through run()."""
+        @wraps(view)
+        def offloaded(*args, **kwargs):
+            return self.run(view, *args, **kwargs)
+        return offloaded
+
+    def _record_wait(self, wait):
+        with self._lock:
+            self.calls += 1
+            self.total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+            self._recent_waits.append(wait)
+        if has_request_context():
+            g.db_queue_wait = g.get('db_queue_wait', 0.0) + wait
+
+    def stats(self):
+        with self._lock:
+            recent = sorted(self._recent_waits)
+            def percentile(p):
+                return round(recent[min(len(recent) - 1, int(len(recent) * p))] * 1000, 2) if recent else 0.0
+            return {
+                'enabled': self.enabled,
+                'threads': self.num_threads,
+                'calls': self.calls,
+                'avg_queue_wait_ms': round(self.total_wait / self.calls * 1000, 2) if self.calls else 0.0,
+                'max_queue_wait_ms': round(self.max_wait * 1000, 2),
+                'recent_p50_queue_wait_ms': percentile(0.5),
+                'recent_p95_queue_wait_ms': percentile(0.95),
+            }
@@ -0,0 +1,242 @@
+# delta_sync.py
+from sqlalchemy import event, func, select, delete, inspect as sqlalchemy_inspect
+from sqlalchemy.orm import selectinload
+from models import (
+    User, Team, Player, Lineup, LineupSlot, PitchingOuting, ScoutedPlayer,
+    Rotation, Game, CollaborationNote, PracticePlan, PracticeTask,
+    PlayerDevelopmentFocus, Sign, TeamChangeLog
+)
+import snapshot
+from player_activity import build_player_activity_log
+
+# How many change log rows are kept per team, and how many more a team may collect before
+# its log is trimmed back to that.
+CHANGE_LOG_KEEP_PER_TEAM = 500
+CHANGE_LOG_COMPACT_EVERY = 100
+# Past this many changed entities a full snapshot is cheaper than a delta.
+DELTA_MAX_ENTITIES = 200
+
+# Changes to these affect data shown all over the app (e.g. author display names),
+# so clients resync from a full snapshot instead of applying a delta.
+FULL_RESYNC_ENTITY_TYPES = {'settings', 'users'}
+
+# Sections of the app data that map one-to-one onto a model's rows.
+SECTION_MODELS = {
+    'roster': Player,
+    'lineups': Lineup,
+    'pitching': PitchingOuting,
+    'scouting_list': ScoutedPlayer,
+    'rotations': Rotation,
+    'games': Game,
+    'collaboration_notes': CollaborationNote,
+    'practice_plans': PracticePlan,
+    'signs': Sign,
+}
+# Related rows a section's serializer reads, loaded up front.
+SECTION_LOADER_OPTIONS = {
+    'lineups': (selectinload(Lineup.slots),),
+}
+SIMPLE_MODEL_SECTIONS = {
+    Lineup: 'lineups',
+    PitchingOuting: 'pitching',
+    ScoutedPlayer: 'scouting_list',
+    Rotation: 'rotations',
+    Game: 'games',
+    PracticePlan: 'practice_plans',
+    Sign: 'signs',
+}
+
+# Later operations win, except that a row which was inserted stays an insert.
+_OPERATION_RANK = {'update': 0, 'insert': 1, 'delete': 2}
+
+
+def _entity_changes(connection, obj, operation):
+    """Maps a changed ORM object to (team_id, entity_type, entity_id, operation) tuples."""
+    section = SIMPLE_MODEL_SECTIONS.get(type(obj))
+    if section:
+        return [(obj.team_id, section, obj.id, operation)]
+    if isinstance(obj, Player):
+        return [(obj.team_id, 'roster', obj.id, operation),
+                (obj.team_id, 'player_development', obj.id, operation)]
+    if isinstance(obj, CollaborationNote):
+        changes = [(obj.team_id, 'collaboration_notes', obj.id, operation)]
+        if obj.note_type == 'player_notes' and obj.player_name:
+            player_id = connection.execute(
+                select(Player.id).where(Player.team_id == obj.team_id, Player.name == obj.player_name)
+            ).scalar()
+            if player_id:
+                changes.append((obj.team_id, 'player_development', player_id, 'update'))
+        return changes
+    if isinstance(obj, PlayerDevelopmentFocus):
+        return [(obj.team_id, 'player_development', obj.player_id, 'update')]
+    if isinstance(obj, LineupSlot):
+        # Slots are shipped inside their lineup as lineup_positions.
+        return [(obj.team_id, 'lineups', obj.lineup_id, 'update')]
+    if isinstance(obj, PracticeTask):
+        # Tasks are shipped nested inside their plan, so a task change is a plan update.
+        team_id = connection.execute(
+            select(PracticePlan.team_id).where(PracticePlan.id == obj.practice_plan_id)
+        ).scalar()
+        return [(team_id, 'practice_plans', obj.practice_plan_id, 'update')] if team_id else []
+    if isinstance(obj, Team):
+        return [(obj.id, 'settings', obj.id, 'update')] if operation == 'update' else []
+    if isinstance(obj, User):
+        # Only the display name matters to other clients; logins and preference saves don't.
+        if operation == 'update' and not _attribute_changed(obj, 'full_name'):
+            return []
+        return [(obj.team_id, 'users', obj.id, operation)]
+    return []
+
+
+def _attribute_changed(obj, key):
+    return sqlalchemy_inspect(obj).attrs[key].history.has_changes()
+
+
+def record_changes(session, flush_context):
+    """after_flush hook: writes a change log row for every team-scoped entity in the flush."""
+    connection = session.connection()
+    changes = []
+    for obj in session.new:
+        changes.extend(_entity_changes(connection, obj, 'insert'))
+    for obj in session.dirty:
+        if session.is_modified(obj, include_collections=False):
+            changes.extend(_entity_changes(connection, obj, 'update'))
+    for obj in session.deleted:
+        if isinstance(obj, Team):
+            connection.execute(delete(TeamChangeLog).where(TeamChangeLog.team_id == obj.id))
+            continue
+        changes.extend(_entity_changes(connection, obj, 'delete'))
+
+    latest = {}
+    for team_id, entity_type, entity_id, operation in changes:
+        if team_id is None or entity_id is None:
+            continue
+        key = (team_id, entity_type, entity_id)
+        if key not in latest or _OPERATION_RANK[operation] >= _OPERATION_RANK[latest[key]]:
+            latest[key] = operation
+
+    for (team_id, entity_type, entity_id), operation in latest.items():
+        connection.execute(TeamChangeLog.__table__.insert().values(
+            team_id=team_id, entity_type=entity_type, entity_id=entity_id, operation=operation
+        ))
+    # Decided per team from its own row count, so a quiet team's log is trimmed as reliably as a busy one's.
+    for team_id in sorted({team_id for team_id, _, _ in latest}):
+        if _change_log_row(connection, team_id, CHANGE_LOG_KEEP_PER_TEAM + CHANGE_LOG_COMPACT_EVERY) is not None:
+            compact_change_log(connection, team_id)
+
+
+def _change_log_row(connection, team_id, position):
+    """Id of the team's `position`-th newest change log row, or None if it has fewer rows."""
+    return connection.execute(
+        select(TeamChangeLog.id).where(TeamChangeLog.team_id == team_id)
+        .order_by(TeamChangeLog.id.desc()).offset(position - 1).limit(1)
+    ).scalar()
+
+
+def compact_change_log(connection, team_id, keep=CHANGE_LOG_KEEP_PER_TEAM):
+    """Deletes all but the newest `keep` change log rows for a team."""
+    cutoff = _change_log_row(connection, team_id, keep)
+    if cutoff is not None:
+        connection.execute(delete(TeamChangeLog).where(TeamChangeLog.team_id == team_id, TeamChangeLog.id < cutoff))
+
+
+def install_change_log(session_factory):
+    event.listen(session_factory, 'after_flush', record_changes)
+
+
+def current_version(db, team_id):
+    """The team's data version: the id of its newest change log row (0 if none)."""
+    return db.query(func.max(TeamChangeLog.id)).filter(TeamChangeLog.team_id == team_id).scalar() or 0
+
+
+def build_delta(db, team, since):
+    """
+    Returns the entities created, updated or deleted since version `since`, serialized the
+    same way as the full snapshot, or None when the client must reload a full snapshot
+    (too far behind, log compacted, or a change that affects everything).
+    """
+    team_id = team.id
+    version = current_version(db, team_id)
+    if since > version:
+        return None
+    if since == version:
+        return {'version': version, 'since': since, 'changes': {}}
+    oldest = db.query(func.min(TeamChangeLog.id)).filter(TeamChangeLog.team_id == team_id).scalar()
+    if oldest is None or since < oldest:
+        return None
+
+    rows = (db.query(TeamChangeLog.entity_type, TeamChangeLog.entity_id, TeamChangeLog.operation)
+            .filter(TeamChangeLog.team_id == team_id, TeamChangeLog.id > since, TeamChangeLog.id <= version)
+            .order_by(TeamChangeLog.id).all())
+    latest = {}
+    for entity_type, entity_id, operation in rows:
+        key = (entity_type, entity_id)
+        if key not in latest or _OPERATION_RANK[operation] >= _OPERATION_RANK[latest[key]]:
+            latest[key] = operation
+    if len(latest) > DELTA_MAX_ENTITIES or any(t in FULL_RESYNC_ENTITY_TYPES for t, _ in latest):
+        return None
+
+    changed = {}
+    for (entity_type, entity_id), operation in latest.items():
+        upserted_ids, deleted_ids = changed.setdefault(entity_type, (set(), set()))
+        (deleted_ids if operation == 'delete' else upserted_ids).add(entity_id)
+
+    display_names = []
+    def get_display_name(username):
+        if not display_names:
+            display_names.append(snapshot.make_display_name_resolver(db, team))
+        return display_names[0](username)
+
+    changes = {}
+    for section, model in SECTION_MODELS.items():
+        if section not in changed:
+            continue
+        upserted_ids, deleted_ids = changed[section]
+        query = db.query(model).options(*SECTION_LOADER_OPTIONS.get(section, ()))
+        objects = query.filter(model.team_id == team_id, model.id.in_(upserted_ids)).order_by(model.id).all() if upserted_ids else []
+        # Anything we could not load was deleted after its log row was read.
+        deleted_ids = sorted(deleted_ids | (upserted_ids - {obj.id for obj in objects}))
+        changes[section] = {'upserted': _serialize_section(section, objects, get_display_name), 'deleted': deleted_ids}
+
+    if 'player_development' in changed:
+        upserted_ids, _ = changed['player_development']
+        players = db.query(Player).options(selectinload(Player.development_focuses)).filter(Player.team_id == team_id, Player.id.in_(upserted_ids)).order_by(Player.id).all() if upserted_ids else []
+        player_notes = db.query(CollaborationNote).filter(
+            CollaborationNote.team_id == team_id, CollaborationNote.note_type == 'player_notes',
+            CollaborationNote.player_name.in_([p.name for p in players])
+        ).order_by(CollaborationNote.id).all() if players else []
+        # Timelines are keyed by player name; clients drop entries for players no longer on the roster.
+        changes['player_development'] = {'upserted': build_player_activity_log(db, team_id, players, player_notes, get_display_name)}
+
+    delta = {'version': version, 'since': since, 'changes': changes}
+    if 'pitching' in changed:
+        delta['pitch_count_summary'] = snapshot.build_team_pitch_count_summary(db, team_id)
+    return delta
+
+
+def _serialize_section(section, objects, get_display_name):
+    if section == 'roster':
+        return [snapshot.serialize_player(p, get_display_name) for p in objects]
+    if section == 'lineups':
+        return [snapshot.serialize_lineup(l, l.lineup_positions) for l in objects]
+    if section == 'pitching':
+        return [snapshot.serialize_pitching_outing(po) for po in objects]
+    if section == 'scouting_list':
+        grouped = {}
+        for sp in objects:
+            grouped.setdefault(sp.list_type, []).append(snapshot.serialize_scouted_player(sp))
+        return grouped
+    if section == 'rotations':
+        return [snapshot.serialize_rotation(r) for r in objects]
+    if section == 'games':
+        return [snapshot.serialize_game(g) for g in objects]
+    if section == 'collaboration_notes':
+        grouped = {}
+        for cn in objects:
+            grouped.setdefault(cn.note_type, []).append(snapshot.serialize_collaboration_note(cn, get_display_name))
+        return grouped
+    if section == 'practice_plans':
+        return [snapshot.serialize_practice_plan(pp, get_display_name) for pp in objects]
+    if section == 'signs':
+        return [snapshot.serialize_sign(s) for s in objects]
+    return []
@@ -1,13 +1,13 @@
-import json
-from sqlalchemy import create_engine
+from sqlalchemy.inspection import inspect as sqlalchemy_inspect
 from sqlalchemy.orm import sessionmaker
 from werkzeug.security import generate_password_hash
+from db import engine
 
 # Import your models
 from models import Base, Team, User
+from migrations import stamp_latest
 
 # --- Configuration ---
-DATABASE_URL = 'sqlite:///app.db'
 DEFAULT_TEAM_NAME = "Marucci Prospects Midwest 11u"
 DEFAULT_REG_CODE = "Westfield"
 SUPER_ADMIN_USERNAME = "Mike1825"
@@ -18,13 +18,16 @@ def initialize_database():
     """
     Creates the database tables and populates it with essential initial data.
     """
-    engine = create_engine(DATABASE_URL)
     Session = sessionmaker(bind=engine)
     session = Session()
 
     print("Creating database tables...")
+    is_new_database = not sqlalchemy_inspect(engine).has_table('users')
     # This creates all the tables defined in your models.py file
     Base.metadata.create_all(engine)
+    if is_new_database:
+        # Created from the current models, so there is nothing to migrate.
+        stamp_latest(engine)
     print("Tables created.")
 
     try:
@@ -52,8 +55,7 @@ def initialize_database():
                 password_hash=hashed_password,
                 role='Super Admin',
                 team_id=team.id,
-                tab_order=json.dumps(default_tab_keys),
-                player_order=json.dumps([])
+                tab_order=default_tab_keys
             )
             session.add(new_user)
 
@@ -0,0 +1,70 @@
+# json_provider.py
+"""
+JSON encoding for responses (jsonify), the tojson template filter and Socket.IO packets.
+
+When orjson is installed, encoding goes through it: several times faster than the stdlib
+encoder on a full team snapshot, and it writes bytes directly instead of building the string
+piece by piece. Without orjson everything falls back to Flask's stdlib provider unchanged.
+
+Output stays equivalent to the stdlib's: keys are sorted, and types orjson would format its
+own way (dates, dataclasses) go through Flask's default hook. The differences are whitespace
+and non-ASCII text, which is written as UTF-8 instead of \\u escapes. Non-finite floats have no
+JSON form; the snapshot serializers already replace them (innings) before encoding, and orjson
+writes any others as null instead of the invalid NaN/Infinity the stdlib emits.
+"""
+import json
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # optional speedup, see requirements-optional.txt
+    orjson = None
+
+
+def _orjson_option(indent=None, sort_keys=False):
+    option = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS
+    if indent:
+        option |= orjson.OPT_INDENT_2
+    if sort_keys:
+        option |= orjson.OPT_SORT_KEYS
+    return option
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """Flask's default provider with encoding done by orjson. Decoding stays on the stdlib."""
+
+    def _encode(self, obj, indent=None, separators=None, **kwargs):
+        # Whitespace (indent/separators) is the only formatting orjson can't match exactly;
+        # anything else it doesn't support, e.g. cls=, is handed to the stdlib encoder.
+        default = kwargs.pop('default', self.default)
+        sort_keys = kwargs.pop('sort_keys', self.sort_keys)
+        kwargs.pop('ensure_ascii', None)
+        if kwargs:
+            return None
+        return orjson.dumps(obj, default=default, option=_orjson_option(indent, sort_keys))
+
+    def dumps(self, obj, **kwargs):
+        encoded = self._encode(obj, **kwargs)
+        return encoded.decode() if encoded is not None else super().dumps(obj, **kwargs)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        option = _orjson_option(indent, self.sort_keys) | orjson.OPT_APPEND_NEWLINE
+        return self._app.response_class(orjson.dumps(obj, default=self.default, option=option), mimetype=self.mimetype)
+
+
+class OrjsonPacketJSON:
+    """json-module stand-in for python-socketio packets (SocketIO(json=...))."""
+
+    @staticmethod
+    def dumps(obj, **kwargs):
+        return orjson.dumps(obj, default=DefaultJSONProvider.default, option=_orjson_option()).decode()
+
+    loads = staticmethod(json.loads)
+
+
+if orjson is not None:
+    JSONProvider, packet_json, ENCODER = OrjsonProvider, OrjsonPacketJSON, 'orjson'
+else:
+    JSONProvider, packet_json, ENCODER = DefaultJSONProvider, json, 'stdlib'
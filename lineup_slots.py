@@ -0,0 +1,98 @@
+# lineup_slots.py
+"""
+Saved lineups are stored one spot per row in lineup_slots: batting order, position and the
+player, both by the name saved in the lineup and by roster id when that name is on the roster.
+Clients still send and receive the old lineup_positions shape,
+[{'name': 'Player Name', 'position': 'Pos'}], in batting order.
+
+Games played at each position come from one GROUP BY over the
+(team_id, player_id, position) index instead of re-reading every saved lineup.
+"""
+from sqlalchemy import event, select, func, update
+from models import Player, LineupSlot
+
+
+def is_lineup_data(lineup_positions):
+    """True if a request's lineup_data has the shape lineups are saved in."""
+    return isinstance(lineup_positions, list) and all(isinstance(item, dict) for item in lineup_positions)
+
+
+def slot_values(team_id, lineup_positions, player_ids):
+    """Column values of the slots for lineup_positions. player_ids maps roster names to ids."""
+    return [
+        {'team_id': team_id, 'batting_order': batting_order, 'player_name': item.get('name'),
+         'player_id': player_ids.get(item.get('name')), 'position': item.get('position')}
+        for batting_order, item in enumerate(lineup_positions, 1)
+    ]
+
+
+def roster_ids(db, team_id, names):
+    """Roster name -> player id for the given names (the first player if a name is repeated)."""
+    player_ids = {}
+    names = {name for name in names if isinstance(name, str)}
+    if names:
+        for player_id, name in db.query(Player.id, Player.name).filter(Player.team_id == team_id, Player.name.in_(names)).order_by(Player.id):
+            player_ids.setdefault(name, player_id)
+    return player_ids
+
+
+def build_slots(db, team_id, lineup_positions):
+    """LineupSlot objects for a lineup saved in the client's shape; assign them to Lineup.slots."""
+    player_ids = roster_ids(db, team_id, [item.get('name') for item in lineup_positions])
+    return [LineupSlot(**values) for values in slot_values(team_id, lineup_positions, player_ids)]
+
+
+def query_lineup_positions(db, team_id):
+    """Lineup id -> lineup_positions for every saved lineup of the team, in one query."""
+    positions = {}
+    rows = (db.query(LineupSlot.lineup_id, LineupSlot.player_name, LineupSlot.position)
+            .filter(LineupSlot.team_id == team_id).order_by(LineupSlot.lineup_id, LineupSlot.batting_order))
+    for lineup_id, name, position in rows:
+        positions.setdefault(lineup_id, []).append({'name': name, 'position': position})
+    return positions
+
+
+def position_counts_select(team_id):
+    """Games in a saved lineup per (player, position); the rules match calculate_cumulative_position_stats in stats.py."""
+    return (
+        select(LineupSlot.player_id, LineupSlot.position, func.count().label('games'))
+        .where(LineupSlot.team_id == team_id, LineupSlot.player_id.isnot(None), LineupSlot.position != '')
+        .group_by(LineupSlot.player_id, LineupSlot.position)
+    )
+
+
+def query_cumulative_position_stats(db, team_id, roster_players):
+    """
+    Returns {player name: {position: games}} for the roster (see
+    stats.calculate_cumulative_position_stats), counted in SQL.
+    """
+    names_by_id = {p.id: p.name for p in roster_players}
+    player_position_stats = {p.name: {} for p in roster_players}
+    for player_id, position, games in db.execute(position_counts_select(team_id)):
+        name = names_by_id.get(player_id)
+        if name is not None:
+            positions = player_position_stats[name]
+            positions[position] = positions.get(position, 0) + games
+    return player_position_stats
+
+
+def link_players(session, flush_context):
+    """
+    after_flush hook: slots follow roster changes. A new player is linked to the slots saved
+    under their name, and a deleted player's slots keep only the name (player ids can be reused).
+    """
+    connection = session.connection()
+    for obj in session.new:
+        if isinstance(obj, Player):
+            connection.execute(update(LineupSlot).where(
+                LineupSlot.team_id == obj.team_id, LineupSlot.player_id.is_(None), LineupSlot.player_name == obj.name
+            ).values(player_id=obj.id))
+    for obj in session.deleted:
+        if isinstance(obj, Player):
+            connection.execute(update(LineupSlot).where(
+                LineupSlot.team_id == obj.team_id, LineupSlot.player_id == obj.id
+            ).values(player_id=None))
+
+
+def install_slot_linking(session_factory):
+    event.listen(session_factory, 'after_flush', link_players)
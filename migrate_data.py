@@ -1,11 +1,16 @@
 import json
-from sqlalchemy import create_engine
+from db import engine
 from sqlalchemy.orm import sessionmaker
-from models import Base, Team, User, Player, Lineup, PitchingOuting, ScoutedPlayer, \
+from models import Base, Team, User, Player, Lineup, LineupSlot, PitchingOuting, ScoutedPlayer, \
                    Rotation, Game, CollaborationNote, PracticePlan, PracticeTask, \
-                   PlayerDevelopmentFocus, Sign # Import all new models
+                   PlayerDevelopmentFocus, Sign, UserPlayerOrder, parse_date, parse_datetime # Import all new models
 from datetime import datetime
 import os # Import os module
+from pitcher_workload import rebuild_workloads
+from lineup_slots import slot_values
+from rotation_assignments import rebuild_assignments
+from player_activity import rebuild_player_activity
+from player_order import order_rows
 
 # --- UPDATED: More robust path handling ---
 # Get the directory where the script is located
@@ -21,7 +26,6 @@ except FileNotFoundError:
     exit()
 
 # Set up DB session
-engine = create_engine('sqlite:///app.db')
 Session = sessionmaker(bind=engine)
 session = Session()
 
@@ -74,7 +78,8 @@ try:
     # Helper to get player ID
     player_name_to_id_map = {p.name: p.id for p in session.query(Player).filter_by(team_id=team.id).all()}
 
-    # 2. Add users
+    # 2. Add users (their player orders are saved once the roster has ids)
+    added_user_orders = []
     for u_data in data.get("users", []):
         if u_data['username'] not in existing_usernames:
             user = User(
@@ -82,12 +87,12 @@ try:
                 full_name=u_data.get('full_name'), # Add full_name, will be None if not in JSON
                 password_hash=u_data['password_hash'],
                 role=u_data.get('role', 'Coach'),
-                last_login=u_data.get('last_login', 'Never'),
-                tab_order=json.dumps(u_data.get('tab_order', [])),
-                player_order=json.dumps(u_data.get('player_order', [])),
+                last_login=parse_datetime(u_data.get('last_login')),
+                tab_order=u_data.get('tab_order', []),
                 team_id=team.id
             )
             session.add(user)
+            added_user_orders.append((user, u_data.get('player_order') or []))
             existing_usernames.add(u_data['username'])
             print(f"Added user: {u_data['username']}")
         else:
@@ -109,7 +114,7 @@ try:
                 has_lessons=p_data.get('has_lessons', 'No'),
                 lesson_focus=p_data.get('lesson_focus', ''),
                 notes_author=p_data.get('notes_author', 'N/A'),
-                notes_timestamp=p_data.get('notes_timestamp', ''),
+                notes_timestamp=parse_datetime(p_data.get('notes_timestamp')),
                 team_id=team.id
             )
             session.add(player)
@@ -120,12 +125,16 @@ try:
         else:
             print(f"Player {p_data['name']} already exists, skipping.")
 
+    session.flush()
+    for user, player_names in added_user_orders:
+        session.add_all(UserPlayerOrder(**values) for values in order_rows(user.id, player_names, player_name_to_id_map))
+
     # 4. Add lineups
     for l_data in data.get("lineups", []):
         if l_data['title'] not in existing_lineup_titles:
             lineup = Lineup(
                 title=l_data['title'],
-                lineup_positions=json.dumps(l_data.get('lineup_positions', [])),
+                slots=[LineupSlot(**values) for values in slot_values(team.id, l_data.get('lineup_positions', []), player_name_to_id_map)],
                 associated_game_id=l_data.get('associated_game_id'),
                 team_id=team.id
             )
@@ -137,10 +146,10 @@ try:
 
     # 5. Add pitching outings
     for po_data in data.get("pitching", []):
-        outing_key = (po_data['date'], po_data['pitcher'], po_data.get('opponent', ''), po_data.get('pitches', 0))
+        outing_key = (parse_date(po_data['date']), po_data['pitcher'], po_data.get('opponent', ''), po_data.get('pitches', 0))
         if outing_key not in existing_pitching_outings_keys:
             outing = PitchingOuting(
-                date=po_data['date'],
+                date=parse_date(po_data['date']),
                 pitcher=po_data['pitcher'], # Corrected from pitcher_name
                 opponent=po_data.get('opponent', ''),
                 pitches=po_data.get('pitches', 0),
@@ -180,7 +189,7 @@ try:
         if r_data['title'] not in existing_rotation_titles:
             rotation = Rotation(
                 title=r_data['title'],
-                innings=json.dumps(r_data.get('innings', {})), # Corrected from innings_data
+                innings=r_data.get('innings', {}), # Corrected from innings_data
                 associated_game_id=r_data.get('associated_game_id'),
                 team_id=team.id
             )
@@ -192,10 +201,10 @@ try:
 
     # 8. Add games
     for g_data in data.get("games", []):
-        key = (g_data['date'], g_data['opponent'])
+        key = (parse_date(g_data['date']), g_data['opponent'])
         if key not in existing_games_keys:
             game = Game(
-                date=g_data['date'],
+                date=parse_date(g_data['date']),
                 opponent=g_data['opponent'],
                 location=g_data.get('location', ''),
                 game_notes=g_data.get('game_notes', ''),
@@ -211,7 +220,7 @@ try:
     for cn_type, cn_notes in data.get("collaboration_notes", {}).items():
         for cn_data in cn_notes:
             note_key = (
-                cn_data['timestamp'],
+                parse_datetime(cn_data['timestamp']),
                 cn_data['author'],
                 cn_data['text'],
                 cn_type,
@@ -221,7 +230,7 @@ try:
                 note = CollaborationNote(
                     text=cn_data['text'],
                     author=cn_data['author'],
-                    timestamp=cn_data['timestamp'],
+                    timestamp=parse_datetime(cn_data['timestamp']),
                     note_type=cn_type,
                     player_name=cn_data.get('player_name'),
                     team_id=team.id
@@ -234,15 +243,16 @@ try:
 
     # 10. Add practice plans and their tasks
     for pp_data in data.get("practice_plans", []):
-        if pp_data['date'] not in existing_practice_plan_dates:
+        plan_date = parse_date(pp_data['date'])
+        if plan_date not in existing_practice_plan_dates:
             plan = PracticePlan(
-                date=pp_data['date'],
+                date=plan_date,
                 general_notes=pp_data.get('general_notes', ''),
                 team_id=team.id
             )
             session.add(plan)
             session.flush() # Flush to get plan ID for tasks
-            existing_practice_plan_dates.add(pp_data['date'])
+            existing_practice_plan_dates.add(plan_date)
             print(f"Added practice plan for {pp_data['date']}")
 
             # Add tasks for the newly created plan
@@ -251,7 +261,7 @@ try:
                     text=task_data['text'],
                     status=task_data.get('status', 'pending'),
                     author=task_data.get('author', 'N/A'),
-                    timestamp=task_data.get('timestamp', datetime.now().strftime('%Y-%m-%d %H:%M')),
+                    timestamp=parse_datetime(task_data.get('timestamp')) or datetime.now(),
                     practice_plan_id=plan.id
                 )
                 session.add(task)
@@ -280,10 +290,10 @@ try:
                             status=f_data.get('status', 'active'),
                             notes=f_data.get('notes', ''),
                             author=f_data.get('author', 'N/A'),
-                            created_date=f_data.get('created_date', datetime.now().strftime('%Y-%m-%d')),
-                            completed_date=f_data.get('completed_date'),
+                            created_date=parse_date(f_data.get('created_date')) or datetime.now().date(),
+                            completed_date=parse_date(f_data.get('completed_date')),
                             last_edited_by=f_data.get('last_edited_by'),
-                            last_edited_date=f_data.get('last_edited_date'),
+                            last_edited_date=parse_datetime(f_data.get('last_edited_date')),
                             team_id=team.id
                         )
                         session.add(focus)
@@ -300,10 +310,10 @@ try:
                             status='active',
                             notes='',
                             author='N/A',
-                            created_date=datetime.now().strftime('%Y-%m-%d'),
+                            created_date=datetime.now().date(),
                             completed_date=None,
                             last_edited_by='',
-                            last_edited_date='',
+                            last_edited_date=None,
                             team_id=team.id
                         )
                         session.add(focus)
@@ -327,6 +337,11 @@ try:
         else:
             print(f"Sign {s_data['name']} already exists, skipping.")
 
+    # This session has no ledger hooks, so recalculate pitcher workloads, rotation assignments and player timelines.
+    session.flush()
+    rebuild_workloads(session.connection())
+    rebuild_assignments(session.connection())
+    rebuild_player_activity(session.connection())
     session.commit()
     print("? Data migration complete.")
 
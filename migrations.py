@@ -0,0 +1,314 @@
+# migrations.py
+"""
+Versioned schema migrations for existing app.db files.
+
+The schema version is stored in SQLite's PRAGMA user_version. Pending migrations run in
+order, each in its own transaction that also bumps the version, and a copy of the database
+is saved before the first one runs. Databases created by init_db.py already have the current
+schema and are stamped with the latest version.
+
+    python migrations.py          # apply pending migrations
+    python migrations.py check    # show the query plan of every hot query
+"""
+import json
+import os
+import sqlite3
+import sys
+from datetime import date, datetime
+from sqlalchemy import MetaData, Column, Date, DateTime, TypeDecorator, select, func, text
+from sqlalchemy.inspection import inspect as sqlalchemy_inspect
+from sqlalchemy.schema import CreateTable
+from models import (
+    Base, User, Player, Lineup, LineupSlot, PitchingOuting, ScoutedPlayer, Rotation, RotationAssignment, CollaborationNote, PlayerActivity, UserPlayerOrder, PracticeTask,
+    PlayerDevelopmentFocus, Sign, TeamChangeLog, create_search_index, parse_date, parse_datetime
+)
+from pitcher_workload import rebuild_workloads, workload_select
+from pitching_queries import recent_pitches_select
+from lineup_slots import slot_values, position_counts_select
+from rotation_assignments import rebuild_assignments, rotations_select
+from player_activity import rebuild_player_activity, activity_select
+from team_search import rebuild_search_index
+from player_order import order_rows, order_select
+
+# Legacy placeholders that mean "no date" rather than a malformed one.
+EMPTY_DATE_VALUES = ('', 'Never', 'N/A', 'None')
+
+
+# --- Migration 1: native date/time columns ---
+def _date_columns(table):
+    return {c.name: c.type for c in table.columns if isinstance(c.type, (Date, DateTime))}
+
+def _needs_date_conversion(inspector, table):
+    if not inspector.has_table(table.name):
+        return False
+    declared = {c['name']: str(c['type']) for c in inspector.get_columns(table.name)}
+    return any(name in declared and declared[name] not in ('DATE', 'DATETIME') for name in _date_columns(table))
+
+def _convert_table(connection, table, scratch_metadata):
+    """Rebuilds one table with native date columns. Returns {column: [(id, unreadable value)]}."""
+    date_columns = _date_columns(table)
+    old_columns = {c['name']: c['type'] for c in sqlalchemy_inspect(connection).get_columns(table.name)}
+    new_table = table.to_metadata(scratch_metadata, name=f'{table.name}__converted')
+    # Other values are copied as stored: JSONText would encode the stored JSON text again.
+    for column in new_table.columns:
+        if isinstance(column.type, TypeDecorator):
+            column.type = column.type.impl_instance
+    # Columns the models no longer declare are kept for the later migration that moves them out.
+    for name, column_type in old_columns.items():
+        if name not in new_table.columns:
+            new_table.append_column(Column(name, column_type))
+    unreadable = {}
+    rows = []
+    for row in connection.execute(text(f'SELECT * FROM "{table.name}"')).mappings():
+        new_row = {name: value for name, value in row.items() if name in new_table.columns}
+        for name, column_type in date_columns.items():
+            if name not in old_columns:
+                continue
+            value = new_row.get(name)
+            parsed = parse_date(value) if isinstance(column_type, Date) else parse_datetime(value)
+            if parsed is None and value is not None and str(value).strip() not in EMPTY_DATE_VALUES:
+                unreadable.setdefault(name, []).append((row['id'], value))
+            new_row[name] = parsed
+        rows.append(new_row)
+
+    connection.execute(CreateTable(new_table))
+    if rows:
+        connection.execute(new_table.insert(), rows)
+    connection.execute(text(f'DROP TABLE "{table.name}"'))
+    connection.execute(text(f'ALTER TABLE "{new_table.name}" RENAME TO "{table.name}"'))
+    return unreadable
+
+def convert_dates(connection):
+    """
+    Rebuilds every table whose date/timestamp columns are still text with the Date/DateTime
+    columns from models.py. Values that can't be read as a date become NULL and are reported.
+    Tables the database doesn't have yet are created, so later migrations find every table.
+    """
+    inspector = sqlalchemy_inspect(connection)
+    tables = [t for t in Base.metadata.sorted_tables if _needs_date_conversion(inspector, t)]
+    # Copies of every model table, so foreign keys of the rebuilt tables resolve.
+    scratch_metadata = MetaData()
+    for table in Base.metadata.sorted_tables:
+        table.to_metadata(scratch_metadata)
+    for table in tables:
+        unreadable = _convert_table(connection, table, scratch_metadata)
+        print(f"  Converted dates in {table.name}")
+        for column, values in unreadable.items():
+            print(f"    {len(values)} unreadable {column} value(s) set to NULL: " +
+                  ", ".join(f"id {row_id}: {value!r}" for row_id, value in values[:10]) +
+                  (" ..." if len(values) > 10 else ""))
+    Base.metadata.create_all(connection)
+    # Outings whose dates changed (or became NULL) move between seasons; migration 8 rebuilds
+    # the pitcher_workload ledger once the table has all of its columns.
+
+
+# --- Migration 2: indexes for hot query paths ---
+def create_indexes(connection):
+    """Creates every index declared in models.py that the database doesn't have yet."""
+    # Read sqlite_master directly: reflection skips expression indexes such as lower(username).
+    existing = set(connection.exec_driver_sql("SELECT name FROM sqlite_master WHERE type = 'index'").scalars())
+    tables = set(connection.exec_driver_sql("SELECT name FROM sqlite_master WHERE type = 'table'").scalars())
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            if table.name in tables and index.name not in existing:
+                index.create(connection)
+
+
+# --- Migration 3: lineup_positions JSON -> lineup_slots rows ---
+def create_lineup_slots(connection):
+    """Moves every saved lineup's lineup_positions JSON into lineup_slots and drops the column."""
+    LineupSlot.__table__.create(connection, checkfirst=True)
+    if 'lineup_positions' not in {c['name'] for c in sqlalchemy_inspect(connection).get_columns('lineups')}:
+        return
+    player_ids = {}
+    for player_id, team_id, name in connection.exec_driver_sql('SELECT id, team_id, name FROM players ORDER BY id'):
+        player_ids.setdefault(team_id, {}).setdefault(name, player_id)
+    rows = []
+    unreadable = []
+    for lineup_id, team_id, text_value in connection.exec_driver_sql('SELECT id, team_id, lineup_positions FROM lineups ORDER BY id'):
+        try:
+            lineup_positions = json.loads(text_value) if text_value else []
+        except ValueError:
+            lineup_positions = None
+        if not isinstance(lineup_positions, list):
+            unreadable.append(lineup_id)
+            continue
+        lineup_positions = [item for item in lineup_positions if isinstance(item, dict)]
+        for values in slot_values(team_id, lineup_positions, player_ids.get(team_id, {})):
+            rows.append(dict(values, lineup_id=lineup_id))
+    if rows:
+        connection.execute(LineupSlot.__table__.insert(), rows)
+    if unreadable:
+        print(f"  {len(unreadable)} lineup(s) with unreadable positions left empty: ids {unreadable[:10]}")
+    connection.exec_driver_sql('ALTER TABLE lineups DROP COLUMN lineup_positions')
+
+
+# --- Migration 4: rotation_assignments ---
+def create_rotation_assignments(connection):
+    """Creates rotation_assignments and fills it from every saved rotation's innings."""
+    RotationAssignment.__table__.create(connection, checkfirst=True)
+    rebuild_assignments(connection)
+
+
+# --- Migration 5: player_activity ---
+def create_player_activity(connection):
+    """Creates player_activity and fills it from every player's focuses, notes and lesson info."""
+    PlayerActivity.__table__.create(connection, checkfirst=True)
+    rebuild_player_activity(connection)
+
+
+# --- Migration 6: full-text search ---
+def create_full_text_search(connection):
+    """Creates search_index and its triggers, and indexes every existing note, focus, task, game and player."""
+    create_search_index(Base.metadata, connection)
+    rebuild_search_index(connection)
+
+
+# --- Migration 7: users.player_order JSON -> user_player_order rows ---
+def create_user_player_order(connection):
+    """Moves every user's player_order JSON into user_player_order and drops the column."""
+    UserPlayerOrder.__table__.create(connection, checkfirst=True)
+    if 'player_order' not in {c['name'] for c in sqlalchemy_inspect(connection).get_columns('users')}:
+        return
+    player_ids = {}
+    for player_id, team_id, name in connection.exec_driver_sql('SELECT id, team_id, name FROM players ORDER BY id'):
+        player_ids.setdefault(team_id, {}).setdefault(name, player_id)
+    rows = []
+    unreadable = []
+    for user_id, team_id, text_value in connection.exec_driver_sql('SELECT id, team_id, player_order FROM users ORDER BY id'):
+        try:
+            names = json.loads(text_value) if text_value else []
+        except ValueError:
+            names = None
+        if not isinstance(names, list):
+            unreadable.append(user_id)
+            continue
+        rows.extend(order_rows(user_id, [name for name in names if isinstance(name, str)], player_ids.get(team_id, {})))
+    if rows:
+        connection.execute(UserPlayerOrder.__table__.insert(), rows)
+    if unreadable:
+        print(f"  {len(unreadable)} user(s) with an unreadable player order reset to roster order: ids {unreadable[:10]}")
+    connection.exec_driver_sql('ALTER TABLE users DROP COLUMN player_order')
+
+
+# --- Migration 8: pitcher_workload.dated_pitches ---
+def add_workload_dated_pitches(connection):
+    """Adds the column the yearly pitch count is read from and recalculates the ledger."""
+    if 'dated_pitches' not in {c['name'] for c in sqlalchemy_inspect(connection).get_columns('pitcher_workload')}:
+        connection.exec_driver_sql('ALTER TABLE pitcher_workload ADD COLUMN dated_pitches INTEGER NOT NULL DEFAULT 0')
+    rebuild_workloads(connection)
+
+
+# (version, description, migrate(connection)); append new migrations at the end.
+MIGRATIONS = [
+    (1, 'Native date/time columns', convert_dates),
+    (2, 'Indexes for hot query paths', create_indexes),
+    (3, 'Lineup slots table', create_lineup_slots),
+    (4, 'Rotation assignments table', create_rotation_assignments),
+    (5, 'Player activity timeline table', create_player_activity),
+    (6, 'Full-text search index', create_full_text_search),
+    (7, 'User player order table', create_user_player_order),
+    (8, 'Yearly pitch counts in the pitcher workload ledger', add_workload_dated_pitches),
+]
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def schema_version(connection):
+    return connection.exec_driver_sql('PRAGMA user_version').scalar()
+
+def stamp_latest(engine):
+    """Marks a database created from the current models as fully migrated."""
+    with engine.begin() as connection:
+        connection.exec_driver_sql(f'PRAGMA user_version = {LATEST_VERSION}')
+
+def backup_database(engine, backup_path):
+    """Copies the database with SQLite's backup API, which includes commits still in the WAL file."""
+    target = sqlite3.connect(backup_path)
+    try:
+        with engine.connect() as connection:
+            connection.connection.driver_connection.backup(target)
+    finally:
+        target.close()
+
+def upgrade(engine):
+    """Applies pending migrations. Returns the number applied."""
+    with engine.connect() as connection:
+        current = schema_version(connection)
+    pending = [m for m in MIGRATIONS if m[0] > current]
+    if not pending:
+        return 0
+
+    db_path = engine.url.database
+    if db_path and os.path.exists(db_path):
+        backup_path = f"{db_path}.v{current}.{datetime.now().strftime('%Y%m%d%H%M%S')}.bak"
+        backup_database(engine, backup_path)
+        print(f"Backed up {db_path} to {backup_path}")
+    with engine.connect() as connection:
+        # Table rebuilds drop tables that other rows still reference.
+        connection.exec_driver_sql('PRAGMA foreign_keys=OFF')
+        connection.commit()
+        for version, description, migrate in pending:
+            print(f"Applying migration {version}: {description}")
+            # pysqlite only opens a transaction before DML; begin explicitly so DDL is covered too.
+            connection.exec_driver_sql('BEGIN')
+            migrate(connection)
+            connection.exec_driver_sql(f'PRAGMA user_version = {version}')
+            connection.commit()
+    return len(pending)
+
+
+# --- Query plan check ---
+def hot_queries():
+    """The filters the app runs on every page load or edit; each should be answered by an index."""
+    return {
+        'login by username': select(User.id).where(func.lower(User.username) == func.lower('coach')),
+        'users of a team': select(User.id).where(User.team_id == 1),
+        'player by name': select(Player.id).where(Player.team_id == 1, Player.name == 'Player'),
+        'scouting list': select(ScoutedPlayer.id).where(ScoutedPlayer.team_id == 1, ScoutedPlayer.list_type == 'committed'),
+        'notes of a type': select(CollaborationNote.id).where(CollaborationNote.team_id == 1, CollaborationNote.note_type == 'team_notes'),
+        'player notes': select(CollaborationNote.id).where(
+            CollaborationNote.team_id == 1, CollaborationNote.note_type == 'player_notes', CollaborationNote.player_name.in_(['A', 'B'])),
+        'lineup for a game': select(Lineup.id).where(Lineup.team_id == 1, Lineup.associated_game_id == 1),
+        'lineup slots': select(LineupSlot.id).where(LineupSlot.lineup_id.in_([1, 2])).order_by(LineupSlot.lineup_id, LineupSlot.batting_order),
+        'games at each position': position_counts_select(1),
+        'assignments of rotations': select(RotationAssignment.player_id, RotationAssignment.position).where(
+            RotationAssignment.rotation_id.in_(rotations_select(1, start=date.today()).scalar_subquery())),
+        'player timelines': activity_select(1),
+        "a user's player order": order_select(1, 1),
+        'rotation for a game': select(Rotation.id).where(Rotation.team_id == 1, Rotation.associated_game_id == 1),
+        'practice plan tasks': select(PracticeTask.id).where(PracticeTask.practice_plan_id.in_([1, 2])),
+        'player focuses': select(PlayerDevelopmentFocus.id).where(PlayerDevelopmentFocus.player_id.in_([1, 2])),
+        'signs': select(Sign.id).where(Sign.team_id == 1),
+        "this week's pitches": recent_pitches_select(1, date.today()),
+        'pitcher season totals': workload_select(PitchingOuting.team_id == 1, PitchingOuting.pitcher == 'Pitcher'),
+        'changes since a version': select(TeamChangeLog.id).where(TeamChangeLog.team_id == 1, TeamChangeLog.id > 1),
+    }
+
+def explain(connection, statement):
+    """Returns the EXPLAIN QUERY PLAN detail lines for a statement."""
+    compiled = statement.compile(dialect=connection.dialect, compile_kwargs={'literal_binds': True})
+    return [row[-1] for row in connection.exec_driver_sql(f'EXPLAIN QUERY PLAN {compiled}')]
+
+def full_table_scans(plan):
+    """Plan lines that read a whole model table without an index."""
+    tables = set(Base.metadata.tables)
+    return [line for line in plan if line.startswith('SCAN ') and line.split()[1] in tables and ' USING ' not in line]
+
+def check_query_plans(engine):
+    """Prints the plan of every hot query. Returns False if any of them scans a whole table."""
+    all_indexed = True
+    with engine.connect() as connection:
+        for name, statement in hot_queries().items():
+            plan = explain(connection, statement)
+            scans = full_table_scans(plan)
+            all_indexed = all_indexed and not scans
+            print(f"{'SCAN' if scans else 'ok  '}  {name}: {'; '.join(plan)}")
+    return all_indexed
+
+
+if __name__ == '__main__':
+    from db import engine
+    if len(sys.argv) > 1 and sys.argv[1] == 'check':
+        sys.exit(0 if check_query_plans(engine) else 1)
+    applied = upgrade(engine)
+    print(f"Applied {applied} migration(s); schema is at version {LATEST_VERSION}." if applied else "Schema is up to date.")
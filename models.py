@@ -1,27 +1,79 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Text, Boolean, Float
+from sqlalchemy import Column, Integer, String, ForeignKey, Date, DateTime, Text, Boolean, Float, Index, UniqueConstraint, TypeDecorator, func, text, event
+from sqlalchemy.engine import Row
+from sqlalchemy.ext.mutable import MutableDict, MutableList
 from sqlalchemy.orm import relationship, declarative_base
-from sqlalchemy.inspection import inspect as sqlalchemy_inspect
-from datetime import datetime
+from datetime import datetime, date
 import json
 
 Base = declarative_base()
 
-# Helper function to convert model instances to dictionaries
+# Helper function to convert model instances to dictionaries (see model_serializer below)
 def to_dict(instance):
     if instance is None:
         return None
-    d = {}
-    for column in sqlalchemy_inspect(instance).mapper.column_attrs:
-        val = getattr(instance, column.key)
-        # Special handling for JSON strings so they are parsed in the final dict
-        if isinstance(val, str) and val.startswith(('[', '{')):
-            try:
-                d[column.key] = json.loads(val)
-            except json.JSONDecodeError:
-                d[column.key] = val # Keep as string if not valid JSON
-        else:
-            d[column.key] = val
-    return d
+    return MODEL_SERIALIZERS[type(instance)](instance)
+
+# --- Date helpers ---
+# Dates are shown and exchanged with the client as 'YYYY-MM-DD', timestamps as 'YYYY-MM-DD HH:MM'.
+DATE_FORMAT = '%Y-%m-%d'
+TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M'
+_TIMESTAMP_INPUT_FORMATS = ('%Y-%m-%d %H:%M', '%Y-%m-%d %H:%M:%S', '%Y-%m-%d %H:%M:%S.%f', '%Y-%m-%dT%H:%M', '%Y-%m-%dT%H:%M:%S', '%Y-%m-%d')
+
+def parse_date(value):
+    """Returns a date for a date/datetime or a 'YYYY-MM-DD' string, or None if it can't be read."""
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    if not isinstance(value, str) or not value.strip():
+        return None
+    try:
+        return datetime.strptime(value.strip(), DATE_FORMAT).date()
+    except ValueError:
+        parsed = parse_datetime(value)
+        return parsed.date() if parsed else None
+
+def parse_datetime(value):
+    """Returns a datetime for a datetime/date or a timestamp string, or None if it can't be read."""
+    if isinstance(value, datetime):
+        return value
+    if isinstance(value, date):
+        return datetime(value.year, value.month, value.day)
+    if not isinstance(value, str) or not value.strip():
+        return None
+    for fmt in _TIMESTAMP_INPUT_FORMATS:
+        try:
+            return datetime.strptime(value.strip(), fmt)
+        except ValueError:
+            continue
+    return None
+
+def format_date(value):
+    return value.strftime(DATE_FORMAT) if value else ''
+
+def format_timestamp(value):
+    return value.strftime(TIMESTAMP_FORMAT) if value else ''
+
+# --- JSON columns ---
+class JSONText(TypeDecorator):
+    """
+    A JSON list or dict stored as text, the same json.dumps output the columns always held,
+    so existing rows read back as-is. NULL and '' read as an empty `container`.
+    Wrapped in MutableList/MutableDict, values are parsed once when a row loads and dumped
+    only when the attribute is reassigned or changed in place (top-level changes only).
+    """
+    impl = Text
+    cache_ok = True
+
+    def __init__(self, container):
+        super().__init__()
+        self.container = container
+
+    def process_bind_param(self, value, dialect):
+        return None if value is None else json.dumps(value)
+
+    def process_result_value(self, value, dialect):
+        return json.loads(value) if value else self.container()
 
 
 class Team(Base):
@@ -51,22 +103,28 @@ class Team(Base):
 
 class User(Base):
     __tablename__ = 'users'
+    __table_args__ = (Index('ix_users_team_id', 'team_id'),)
     id = Column(Integer, primary_key=True)
     username = Column(String, unique=True, nullable=False)
     full_name = Column(String(100), nullable=True) # <<< This line is crucial
     password_hash = Column(String, nullable=False)
     role = Column(String, default='Coach')
-    last_login = Column(String) # Stored as string for now, consider DateTime
-    tab_order = Column(Text) # Storing JSON string
-    player_order = Column(Text) # Storing JSON string
+    last_login = Column(DateTime) # None until the first login
+    tab_order = Column(MutableList.as_mutable(JSONText(list))) # List of tab keys
 
     team_id = Column(Integer, ForeignKey('teams.id'), nullable=False)
     team = relationship("Team", back_populates="users")
+    # The user's order of the roster (see player_order.py); deleted with the user.
+    player_order_entries = relationship("UserPlayerOrder", cascade="all, delete-orphan")
     
     def to_dict(self): return to_dict(self)
 
+# Case-insensitive username lookups (login, registration, admin pages)
+Index('ix_users_username_lower', func.lower(User.username))
+
 class Player(Base):
     __tablename__ = 'players'
+    __table_args__ = (Index('ix_players_team_id_name', 'team_id', 'name'),)
     id = Column(Integer, primary_key=True)
     name = Column(String, nullable=False)
     number = Column(String)
@@ -80,7 +138,7 @@ class Player(Base):
     has_lessons = Column(String)
     lesson_focus = Column(Text)
     notes_author = Column(String)
-    notes_timestamp = Column(String) # Stored as string for now, consider DateTime
+    notes_timestamp = Column(DateTime)
 
     team_id = Column(Integer, ForeignKey('teams.id'), nullable=False)
     team = relationship("Team", back_populates="players")
@@ -88,25 +146,70 @@ class Player(Base):
     # A single relationship to handle all development focuses for a player.
     # The cascade option will automatically delete focuses when a player is deleted.
     development_focuses = relationship("PlayerDevelopmentFocus", back_populates="player", cascade="all, delete-orphan")
+    # Where each coach has placed the player (see player_order.py); deleted with the player.
+    order_entries = relationship("UserPlayerOrder", cascade="all, delete-orphan")
     
     def to_dict(self): return to_dict(self)
 
+class UserPlayerOrder(Base):
+    """
+    Where a user has placed a player in their order of the roster. Sort keys are gapped so a
+    move only rewrites the moved player; players without a row come after, in roster order.
+    """
+    __tablename__ = 'user_player_order'
+    __table_args__ = (UniqueConstraint('user_id', 'player_id', name='uq_user_player_order_user_player'),)
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey('users.id'), nullable=False)
+    player_id = Column(Integer, ForeignKey('players.id'), nullable=False)
+    sort_key = Column(Integer, nullable=False)
+
+    def to_dict(self): return to_dict(self)
+
 class Lineup(Base):
     __tablename__ = 'lineups'
+    __table_args__ = (Index('ix_lineups_team_id_associated_game_id', 'team_id', 'associated_game_id'),)
     id = Column(Integer, primary_key=True)
     title = Column(String, nullable=False)
-    lineup_positions = Column(Text) # Storing JSON string of [{'name': 'Player Name', 'position': 'Pos'}]
     associated_game_id = Column(Integer) # Can be ForeignKey to games.id later if desired, nullable=True
 
     team_id = Column(Integer, ForeignKey('teams.id'), nullable=False)
     team = relationship("Team", back_populates="lineups")
-    
+    slots = relationship("LineupSlot", back_populates="lineup", order_by="LineupSlot.batting_order", cascade="all, delete-orphan")
+
+    @property
+    def lineup_positions(self):
+        """The slots in the shape clients use: [{'name': 'Player Name', 'position': 'Pos'}] in batting order."""
+        return [{'name': slot.player_name, 'position': slot.position} for slot in self.slots]
+
+    def to_dict(self): return to_dict(self)
+
+class LineupSlot(Base):
+    """One spot in a saved lineup (see lineup_slots.py)."""
+    __tablename__ = 'lineup_slots'
+    __table_args__ = (
+        Index('ix_lineup_slots_lineup_id_batting_order', 'lineup_id', 'batting_order'),
+        Index('ix_lineup_slots_team_id_player_id_position', 'team_id', 'player_id', 'position'),
+    )
+    id = Column(Integer, primary_key=True)
+    lineup_id = Column(Integer, ForeignKey('lineups.id'), nullable=False)
+    batting_order = Column(Integer, nullable=False) # 1-based
+    player_id = Column(Integer, ForeignKey('players.id'), nullable=True) # None if the name isn't on the roster
+    player_name = Column(String) # The name as saved in the lineup
+    position = Column(String) # '' for batting-order-only lineups
+
+    team_id = Column(Integer, ForeignKey('teams.id'), nullable=False)
+    lineup = relationship("Lineup", back_populates="slots")
+
     def to_dict(self): return to_dict(self)
 
 class PitchingOuting(Base):
     __tablename__ = 'pitching_outings'
+    __table_args__ = (
+        Index('ix_pitching_outings_team_id_date', 'team_id', 'date'),
+        Index('ix_pitching_outings_team_id_pitcher_date', 'team_id', 'pitcher', 'date'),
+    )
     id = Column(Integer, primary_key=True)
-    date = Column(String, nullable=False) # Stored as string, consider Date or DateTime
+    date = Column(Date) # None only for outings converted from an unreadable legacy date
     pitcher = Column(String, nullable=False) # Consider ForeignKey to players.id later
     opponent = Column(String)
     pitches = Column(Integer)
@@ -121,6 +224,7 @@ class PitchingOuting(Base):
 
 class ScoutedPlayer(Base):
     __tablename__ = 'scouted_players'
+    __table_args__ = (Index('ix_scouted_players_team_id_list_type', 'team_id', 'list_type'),)
     id = Column(Integer, primary_key=True)
     name = Column(String, nullable=False)
     position1 = Column(String)
@@ -136,9 +240,10 @@ class ScoutedPlayer(Base):
 
 class Rotation(Base):
     __tablename__ = 'rotations'
+    __table_args__ = (Index('ix_rotations_team_id_associated_game_id', 'team_id', 'associated_game_id'),)
     id = Column(Integer, primary_key=True)
     title = Column(String, nullable=False)
-    innings = Column(Text) # Storing JSON string of {inning_num: {pos: player_name}}
+    innings = Column(MutableDict.as_mutable(JSONText(dict))) # {inning_num: {pos: player_name}}
     associated_game_id = Column(Integer, nullable=True) # ForeignKey to games.id later if desired
 
     team_id = Column(Integer, ForeignKey('teams.id'), nullable=False)
@@ -146,10 +251,32 @@ class Rotation(Base):
 
     def to_dict(self): return to_dict(self)
 
+class RotationAssignment(Base):
+    """
+    One player at one position in one inning of a rotation, kept in step with Rotation.innings
+    (see rotation_assignments.py). An inning nobody is assigned to has a single row with no
+    position or player.
+    """
+    __tablename__ = 'rotation_assignments'
+    __table_args__ = (
+        Index('ix_rotation_assignments_rotation_id_inning', 'rotation_id', 'inning', 'player_id', 'position'),
+        Index('ix_rotation_assignments_team_id_player_id', 'team_id', 'player_id'),
+    )
+    id = Column(Integer, primary_key=True)
+    rotation_id = Column(Integer, ForeignKey('rotations.id'), nullable=False)
+    inning = Column(Integer, nullable=False)
+    position = Column(String)
+    player_id = Column(Integer, ForeignKey('players.id'), nullable=True) # None if the name isn't on the roster
+    player_name = Column(String) # The name as saved in the rotation
+    team_id = Column(Integer, ForeignKey('teams.id'), nullable=False)
+
+    def to_dict(self): return to_dict(self)
+
 class Game(Base):
     __tablename__ = 'games'
+    __table_args__ = (Index('ix_games_team_id_date', 'team_id', 'date'),)
     id = Column(Integer, primary_key=True)
-    date = Column(String, nullable=False) # Stored as string, consider Date or DateTime
+    date = Column(Date) # None only for games converted from an unreadable legacy date
     opponent = Column(String, nullable=False)
     location = Column(String)
     game_notes = Column(Text)
@@ -163,11 +290,15 @@ class Game(Base):
 
 class CollaborationNote(Base):
     __tablename__ = 'collaboration_notes'
+    __table_args__ = (
+        Index('ix_collaboration_notes_team_id_timestamp', 'team_id', 'timestamp'),
+        Index('ix_collaboration_notes_team_id_note_type_player_name', 'team_id', 'note_type', 'player_name'),
+    )
     id = Column(Integer, primary_key=True)
     note_type = Column(String, nullable=False) # 'player_notes' or 'team_notes'
     text = Column(Text, nullable=False)
     author = Column(String) # Consider ForeignKey to users.id later
-    timestamp = Column(String) # Stored as string, consider DateTime
+    timestamp = Column(DateTime)
     player_name = Column(String, nullable=True) # Only for player_notes, consider ForeignKey to players.id
 
     team_id = Column(Integer, ForeignKey('teams.id'), nullable=False)
@@ -177,8 +308,9 @@ class CollaborationNote(Base):
 
 class PracticePlan(Base):
     __tablename__ = 'practice_plans'
+    __table_args__ = (Index('ix_practice_plans_team_id_date', 'team_id', 'date'),)
     id = Column(Integer, primary_key=True)
-    date = Column(String, nullable=False) # Stored as string, consider Date
+    date = Column(Date) # None only for plans converted from an unreadable legacy date
     general_notes = Column(Text)
     # tasks will be a relationship to PracticeTask
 
@@ -190,11 +322,12 @@ class PracticePlan(Base):
 
 class PracticeTask(Base):
     __tablename__ = 'practice_tasks'
+    __table_args__ = (Index('ix_practice_tasks_practice_plan_id', 'practice_plan_id'),)
     id = Column(Integer, primary_key=True)
     text = Column(Text, nullable=False)
     status = Column(String, default="pending") # 'pending' or 'complete'
     author = Column(String) # Consider ForeignKey to users.id later
-    timestamp = Column(String) # Stored as string, consider DateTime
+    timestamp = Column(DateTime)
 
     practice_plan_id = Column(Integer, ForeignKey('practice_plans.id'), nullable=False)
     practice_plan = relationship("PracticePlan", back_populates="tasks")
@@ -203,15 +336,16 @@ class PracticeTask(Base):
 
 class PlayerDevelopmentFocus(Base):
     __tablename__ = 'player_development_focuses'
+    __table_args__ = (Index('ix_player_development_focuses_player_id', 'player_id'),)
     id = Column(Integer, primary_key=True)
     focus = Column(Text, nullable=False)
     status = Column(String, default="active")
     notes = Column(Text)
-    created_date = Column(String) # Stored as string, consider Date
-    completed_date = Column(String, nullable=True) # Stored as string, consider Date
+    created_date = Column(Date)
+    completed_date = Column(Date, nullable=True)
     author = Column(String) # Consider ForeignKey to users.id later
     last_edited_by = Column(String) # Consider ForeignKey to users.id later
-    last_edited_date = Column(String) # Stored as string, consider DateTime
+    last_edited_date = Column(DateTime)
 
     # Link to player and skill type
     player_id = Column(Integer, ForeignKey('players.id'), nullable=False)
@@ -226,6 +360,7 @@ class PlayerDevelopmentFocus(Base):
 
 class Sign(Base):
     __tablename__ = 'signs'
+    __table_args__ = (Index('ix_signs_team_id', 'team_id'),)
     id = Column(Integer, primary_key=True)
     name = Column(String, nullable=False)
     indicator = Column(String, nullable=False)
@@ -233,4 +368,161 @@ class Sign(Base):
     team_id = Column(Integer, ForeignKey('teams.id'), nullable=False)
     team = relationship("Team", back_populates="signs")
     
-    def to_dict(self): return to_dict(self)
\ No newline at end of file
+    def to_dict(self): return to_dict(self)
+
+class TeamChangeLog(Base):
+    """
+    One row per entity created, updated or deleted, written in the same transaction as the
+    change itself. The newest id for a team doubles as that team's data version.
+    """
+    __tablename__ = 'team_change_log'
+    __table_args__ = (
+        Index('ix_team_change_log_team_id_id', 'team_id', 'id'),
+        {'sqlite_autoincrement': True},
+    )
+    id = Column(Integer, primary_key=True)
+    team_id = Column(Integer, ForeignKey('teams.id'), nullable=False)
+    entity_type = Column(String, nullable=False) # Section of the app data, e.g. 'roster' or 'pitching'
+    entity_id = Column(Integer, nullable=False)
+    operation = Column(String, nullable=False) # 'insert', 'update' or 'delete'
+    created_at = Column(DateTime, default=datetime.now)
+
+    def to_dict(self): return to_dict(self)
+
+
+class PlayerActivity(Base):
+    """
+    One entry of a player's development timeline: a focus created or completed, a coach note
+    or the player's lesson info, pointing at its source row (ref_id). Kept in step with
+    those rows by player_activity.py; rows are inserted in the order entries that share a
+    timestamp are shown.
+    """
+    __tablename__ = 'player_activity'
+    __table_args__ = (Index('ix_player_activity_team_id_player_id_timestamp', 'team_id', 'player_id', text('timestamp DESC')),)
+    id = Column(Integer, primary_key=True)
+    team_id = Column(Integer, ForeignKey('teams.id'), nullable=False)
+    player_id = Column(Integer, ForeignKey('players.id'), nullable=False)
+    type = Column(String, nullable=False) # 'focus_created', 'focus_completed', 'note' or 'lesson'
+    ref_id = Column(Integer, nullable=False) # Focus, note or player id
+    timestamp = Column(DateTime) # None sorts last
+
+    def to_dict(self): return to_dict(self)
+
+
+class PitcherWorkload(Base):
+    """
+    Running totals per team, pitcher and season, kept in step with pitching_outings by
+    pitcher_workload.py in the same transaction as each outing change.
+    Season 0 holds outings without a valid date (they only count towards career totals).
+    """
+    __tablename__ = 'pitcher_workload'
+    __table_args__ = (UniqueConstraint('team_id', 'pitcher', 'season', name='uq_pitcher_workload_team_pitcher_season'),)
+    id = Column(Integer, primary_key=True)
+    team_id = Column(Integer, ForeignKey('teams.id'), nullable=False)
+    pitcher = Column(String, nullable=False)
+    season = Column(Integer, nullable=False)
+    total_pitches = Column(Integer, nullable=False, default=0)
+    total_innings = Column(Float, nullable=False, default=0.0)
+    appearances = Column(Integer, nullable=False, default=0)
+    dated_pitches = Column(Integer, nullable=False, default=0) # Pitches of outings with a date and a readable pitch count
+    last_outing_date = Column(Date) # Most recent outing with a date and pitch count
+    last_outing_pitches = Column(Integer)
+    next_available_date = Column(Date) # Day after the required rest following the last outing
+
+    def to_dict(self): return to_dict(self)
+
+
+# --- Full-text search ---
+# search_index is an FTS5 table over the team's free text: one row per note, focus, practice
+# task, game and player that has any, kept in step by triggers on those tables so every write
+# (bulk deletes and migrations included) reaches it. A row's rowid is its source id * 8 + the
+# kind's code, so triggers find it without a scan. Searched by team_search.py.
+# kind: (table, code, text expression, team id expression, columns whose changes re-index a row)
+SEARCH_SOURCES = {
+    'note': ('collaboration_notes', 1, "{row}.text", "{row}.team_id", ('text', 'team_id')),
+    'focus': ('player_development_focuses', 2, "{row}.focus || char(10) || COALESCE({row}.notes, '')", "{row}.team_id", ('focus', 'notes', 'team_id')),
+    'task': ('practice_tasks', 3, "{row}.text", "(SELECT team_id FROM practice_plans WHERE practice_plans.id = {row}.practice_plan_id)", ('text', 'practice_plan_id')),
+    'game': ('games', 4, "{row}.game_notes", "{row}.team_id", ('game_notes', 'team_id')),
+    'player': ('players', 5, "{row}.notes", "{row}.team_id", ('notes', 'team_id')),
+}
+SEARCH_INDEX_TABLE = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS search_index USING fts5("
+    "team, body, kind UNINDEXED, ref_id UNINDEXED, tokenize = 'porter unicode61 remove_diacritics 2', prefix = '2 3')"
+)
+
+def search_index_insert(kind, row):
+    """
+    INSERT adding the search rows of a source kind: for the triggering row when `row` is NEW,
+    for every row of the source table when it is the table name.
+    """
+    table, code, body, team, _ = SEARCH_SOURCES[kind]
+    body, team = body.format(row=row), team.format(row=row)
+    source = '' if row == 'NEW' else f' FROM {table}'
+    return (f"INSERT INTO search_index (rowid, team, body, kind, ref_id) "
+            f"SELECT {row}.id * 8 + {code}, 't' || {team}, {body}, '{kind}', {row}.id{source} "
+            f"WHERE trim(COALESCE({body}, '')) != ''")
+
+def search_index_ddl():
+    """The search_index table and the triggers that keep it in step with its sources."""
+    statements = [SEARCH_INDEX_TABLE]
+    for kind, (table, code, _, _, columns) in SEARCH_SOURCES.items():
+        delete_old = f"DELETE FROM search_index WHERE rowid = OLD.id * 8 + {code};"
+        insert_new = search_index_insert(kind, 'NEW') + ';'
+        statements += [
+            f"CREATE TRIGGER IF NOT EXISTS search_{table}_insert AFTER INSERT ON {table} BEGIN {insert_new} END",
+            f"CREATE TRIGGER IF NOT EXISTS search_{table}_update AFTER UPDATE OF {', '.join(columns)} ON {table} BEGIN {delete_old} {insert_new} END",
+            f"CREATE TRIGGER IF NOT EXISTS search_{table}_delete AFTER DELETE ON {table} BEGIN {delete_old} END",
+        ]
+    return statements
+
+def create_search_index(target, connection, **kw):
+    for statement in search_index_ddl():
+        connection.exec_driver_sql(statement)
+
+# Created with the model tables by every create_all (the statements are no-ops once they exist).
+event.listen(Base.metadata, 'after_create', create_search_index)
+
+
+# --- Serializers ---
+def _client_value(column, name):
+    """Python expression converting the value in variable `name` to the form sent to the client."""
+    if isinstance(column.type, JSONText):
+        # Only unflushed instances can still hold None.
+        return f"({name} or {column.type.container()!r})"
+    if isinstance(column.type, DateTime):
+        return f"format_timestamp({name})"
+    if isinstance(column.type, Date):
+        return f"format_date({name})"
+    return name
+
+def model_serializer(model, fields=None):
+    """
+    Generates a function turning an instance of `model`, or a row of all its table columns in
+    table order (db.query(*Model.__table__.columns)), into a dict of `fields` (default: every
+    column). Dates are formatted the way the client expects and unset JSON columns become empty.
+
+    The function is written out for the model's columns: rows are unpacked by position and
+    loaded instances read from their __dict__, both much cheaper than attribute access.
+    Instances with expired or unloaded attributes fall back to getattr.
+    """
+    columns = list(model.__table__.columns)
+    positions = {column.key: i for i, column in enumerate(columns)}
+    keys = list(fields or positions)
+    names = [f"c{positions[key]}" for key in keys]
+    source = "\n".join([
+        f"def serialize_{model.__name__}(obj):",
+        "    if isinstance(obj, Row):",
+        "        " + "".join(f"c{i}, " for i in range(len(columns))) + "= obj",
+        "    else:",
+        "        state = obj.__dict__",
+        "        try:",
+        *(f"            {name} = state[{key!r}]" for name, key in zip(names, keys)),
+        "        except KeyError:",
+        *(f"            {name} = obj.{key}" for name, key in zip(names, keys)),
+        "    return {" + ", ".join(f"{key!r}: {_client_value(columns[positions[key]], name)}" for key, name in zip(keys, names)) + "}",
+    ])
+    namespace = {'Row': Row, 'format_date': format_date, 'format_timestamp': format_timestamp}
+    exec(source, namespace)
+    return namespace[f"serialize_{model.__name__}"]
+
+MODEL_SERIALIZERS = {mapper.class_: model_serializer(mapper.class_) for mapper in Base.registry.mappers}
@@ -0,0 +1,104 @@
+# notifications.py
+import threading
+from models import Team
+import delta_sync
+
+
+def team_room(team_id):
+    return f'team:{team_id}'
+
+
+class TeamNotifier:
+    """
+    Sends 'data_updated' events to a team's Socket.IO room.
+
+    Each event carries the entity-level changes since the previous event for that team
+    (the same shape as /get_app_data?since=<version>), so clients that are up to date can
+    apply it in place without fetching anything.
+
+    Notifications are batched per team over `window` seconds: a burst of edits (drag and
+    drop in the lineup editor, ticking off several tasks) goes out as one merged event,
+    flushed from a background task (a green thread under eventlet).
+    """
+
+    def __init__(self, socketio, session_factory, window=0.15, executor=None):
+        self.socketio = socketio
+        self.session_factory = session_factory
+        self.window = window
+        self.executor = executor  # DatabaseExecutor for building payloads off the hub
+        self._announced_versions = {}  # team_id -> version carried by the last event
+        self._pending = {}  # team_id -> messages waiting for the next flush
+        self._lock = threading.Lock()
+        self.requested = 0
+        self.emitted = 0
+        self.coalesced = 0
+
+    def build_payload(self, team_id, message):
+        db = self.session_factory()
+        try:
+            payload = {'message': message}
+            team = db.query(Team).filter_by(id=team_id).first()
+            if team is None:
+                return payload
+            with self._lock:
+                since = self._announced_versions.get(team_id)
+            delta = delta_sync.build_delta(db, team, since) if since is not None else None
+            if delta is not None:
+                payload.update(delta)
+            else:
+                # No usable baseline (first event since startup, or a change that needs a full
+                # resync): announce the version only and let clients fetch what they are missing.
+                payload['version'] = delta_sync.current_version(db, team_id)
+            with self._lock:
+                self._announced_versions[team_id] = max(payload['version'], self._announced_versions.get(team_id, 0))
+            return payload
+        finally:
+            db.close()
+
+    def notify(self, team_id, message):
+        with self._lock:
+            self.requested += 1
+            pending = self._pending.get(team_id)
+            if pending is not None:
+                # A flush is already scheduled for this team; ride along with it.
+                pending.append(message)
+                self.coalesced += 1
+                return
+            self._pending[team_id] = [message]
+        if self.window > 0:
+            self.socketio.start_background_task(self._flush_later, team_id)
+        else:
+            self.flush(team_id)
+
+    def _flush_later(self, team_id):
+        self.socketio.sleep(self.window)
+        self.flush(team_id)
+
+    def flush(self, team_id):
+        with self._lock:
+            messages = self._pending.pop(team_id, None)
+        if not messages:
+            return
+        message = messages[0] if len(messages) == 1 else f'{len(messages)} updates. Latest: {messages[-1]}'
+        if self.executor is not None:
+            payload = self.executor.run(self.build_payload, team_id, message)
+        else:
+            payload = self.build_payload(team_id, message)
+        self.socketio.emit('data_updated', payload, to=team_room(team_id))
+        with self._lock:
+            self.emitted += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                'window_seconds': self.window,
+                'requested': self.requested,
+                'emitted': self.emitted,
+                'coalesced': self.coalesced,
+                'pending_teams': len(self._pending),
+            }
+
+    def forget(self, team_id):
+        with self._lock:
+            self._announced_versions.pop(team_id, None)
+            self._pending.pop(team_id, None)
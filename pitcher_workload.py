@@ -0,0 +1,162 @@
+# pitcher_workload.py
+"""
+Maintains the pitcher_workload ledger: per team, pitcher and season running totals of an
+outing history, so pitch count summaries never have to scan old seasons.
+
+Whenever a flush adds, edits or deletes pitching outings, the (team, pitcher, season) rows
+they touch are recalculated from that pitcher's outings in that season, inside the same
+transaction. Run this module to rebuild the whole ledger from pitching_outings:
+
+    python pitcher_workload.py
+"""
+from datetime import timedelta
+from sqlalchemy import event, select, delete, func, case, cast, and_, or_, Integer, inspect as sqlalchemy_inspect
+from models import Team, PitchingOuting, PitcherWorkload
+from stats import get_required_rest_days
+
+
+def _season():
+    """The outing's year, or 0 when it has no date."""
+    return case((PitchingOuting.date.isnot(None), cast(func.strftime('%Y', PitchingOuting.date), Integer)), else_=0)
+
+
+def readable_number(column):
+    """
+    Whether a stored pitch count or innings value can be read as a number. SQLite keeps values
+    its column couldn't convert (e.g. text imported from data.json) as text.
+    """
+    return func.typeof(column).in_(('integer', 'real'))
+
+
+def workload_select(*conditions):
+    """
+    Aggregates pitching_outings into ledger rows, one per (team, pitcher, season), with the
+    rules of stats.py: career totals skip outings whose pitches or innings can't be read
+    (missing ones count as 0), while pitch counts and rest only use dated outings with a
+    readable pitch count.
+    """
+    po = PitchingOuting
+    pitches = case((readable_number(po.pitches), cast(po.pitches, Integer)))
+    counted = and_(or_(po.pitches.is_(None), readable_number(po.pitches)), or_(po.innings.is_(None), readable_number(po.innings)))
+    dated = and_(po.date.isnot(None), readable_number(po.pitches))
+    # Latest dated outing first; ties on the date go to the first outing logged.
+    recency = func.row_number().over(
+        partition_by=(po.team_id, po.pitcher, _season()),
+        order_by=(case((dated, 0), else_=1), po.date.desc(), po.id)
+    )
+    outings = select(
+        po.team_id, po.pitcher, _season().label('season'), po.date, pitches.label('pitches'), po.innings,
+        case((counted, 1), else_=0).label('counted'), case((dated, 1), else_=0).label('dated'), recency.label('recency')
+    ).where(*conditions).subquery()
+    is_counted = outings.c.counted == 1
+    is_dated = outings.c.dated == 1
+    is_last = and_(outings.c.recency == 1, is_dated)
+    return select(
+        outings.c.team_id, outings.c.pitcher, outings.c.season,
+        func.coalesce(func.sum(case((is_counted, outings.c.pitches))), 0).label('total_pitches'),
+        func.total(case((is_counted, outings.c.innings))).label('total_innings'),
+        func.sum(outings.c.counted).label('appearances'),
+        func.coalesce(func.sum(case((is_dated, outings.c.pitches))), 0).label('dated_pitches'),
+        func.max(case((is_last, outings.c.date))).label('last_outing_date'),
+        func.max(case((is_last, outings.c.pitches))).label('last_outing_pitches'),
+    ).group_by(outings.c.team_id, outings.c.pitcher, outings.c.season)
+
+
+def _ledger_rows(connection, query):
+    rows = []
+    for row in connection.execute(query):
+        next_available_date = None
+        if row.last_outing_date:
+            next_available_date = row.last_outing_date + timedelta(days=get_required_rest_days(row.last_outing_pitches) + 1)
+        rows.append({
+            'team_id': row.team_id, 'pitcher': row.pitcher, 'season': row.season,
+            'total_pitches': row.total_pitches, 'total_innings': row.total_innings, 'appearances': row.appearances,
+            'dated_pitches': row.dated_pitches,
+            'last_outing_date': row.last_outing_date, 'last_outing_pitches': row.last_outing_pitches,
+            'next_available_date': next_available_date,
+        })
+    return rows
+
+
+def refresh_workloads(connection, keys):
+    """Recalculates the ledger rows for the given (team_id, pitcher, season) keys."""
+    for team_id, pitcher, season in keys:
+        connection.execute(delete(PitcherWorkload).where(
+            PitcherWorkload.team_id == team_id, PitcherWorkload.pitcher == pitcher, PitcherWorkload.season == season
+        ))
+        rows = _ledger_rows(connection, workload_select(
+            PitchingOuting.team_id == team_id, PitchingOuting.pitcher == pitcher, _season() == season
+        ))
+        if rows:
+            connection.execute(PitcherWorkload.__table__.insert(), rows)
+
+
+def rebuild_workloads(connection, team_id=None):
+    """Recalculates the whole ledger (or one team's) from pitching_outings."""
+    if team_id is None:
+        connection.execute(delete(PitcherWorkload))
+        rows = _ledger_rows(connection, workload_select())
+    else:
+        connection.execute(delete(PitcherWorkload).where(PitcherWorkload.team_id == team_id))
+        rows = _ledger_rows(connection, workload_select(PitchingOuting.team_id == team_id))
+    if rows:
+        connection.execute(PitcherWorkload.__table__.insert(), rows)
+    return len(rows)
+
+
+def rebuild_if_empty(engine):
+    """Fills the ledger for databases that have outings from before it existed."""
+    with engine.begin() as connection:
+        has_workloads = connection.execute(select(PitcherWorkload.id).limit(1)).first()
+        has_outings = connection.execute(select(PitchingOuting.id).limit(1)).first()
+        if has_outings and not has_workloads:
+            rebuild_workloads(connection)
+
+
+def _season_of(outing_date):
+    return outing_date.year if outing_date else 0
+
+def _outing_keys(obj, use_previous=False):
+    """The ledger key of an outing, or of its values before this flush."""
+    values = {}
+    for key in ('team_id', 'pitcher', 'date'):
+        history = sqlalchemy_inspect(obj).attrs[key].history
+        values[key] = history.deleted[0] if use_previous and history.deleted else getattr(obj, key)
+    return (values['team_id'], values['pitcher'], _season_of(values['date']))
+
+
+def record_workloads(session, flush_context):
+    """after_flush hook: refreshes the ledger rows of every outing in the flush."""
+    keys = set()
+    for obj in session.new:
+        if isinstance(obj, PitchingOuting):
+            keys.add(_outing_keys(obj))
+    for obj in session.dirty:
+        if isinstance(obj, PitchingOuting) and session.is_modified(obj, include_collections=False):
+            keys.add(_outing_keys(obj, use_previous=True))
+            keys.add(_outing_keys(obj))
+    team_ids_deleted = []
+    for obj in session.deleted:
+        if isinstance(obj, PitchingOuting):
+            keys.add(_outing_keys(obj, use_previous=True))
+        elif isinstance(obj, Team):
+            team_ids_deleted.append(obj.id)
+
+    connection = session.connection()
+    if keys:
+        refresh_workloads(connection, sorted(k for k in keys if k[0] is not None and k[1] is not None))
+    if team_ids_deleted:
+        connection.execute(delete(PitcherWorkload).where(PitcherWorkload.team_id.in_(team_ids_deleted)))
+
+
+def install_workload_ledger(session_factory):
+    event.listen(session_factory, 'after_flush', record_workloads)
+
+
+if __name__ == '__main__':
+    from db import engine
+    from models import Base
+    Base.metadata.create_all(engine)
+    with engine.begin() as connection:
+        count = rebuild_workloads(connection)
+    print(f"Rebuilt pitcher_workload: {count} row(s).")
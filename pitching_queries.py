@@ -0,0 +1,59 @@
+# pitching_queries.py
+from datetime import date, timedelta
+from sqlalchemy import select, func, case, cast, Integer
+from models import PitchingOuting, PitcherWorkload
+from stats import pitcher_summary
+from pitcher_workload import readable_number
+
+
+def recent_pitches_select(team_id, today):
+    """
+    Pitches thrown today and since the start of this week, per pitcher. Only this week's
+    outings are read (through the (team_id, date) index); the rules match
+    calculate_pitch_counts in stats.py.
+    """
+    po = PitchingOuting
+    start_of_week = today - timedelta(days=today.weekday())
+    pitches = cast(po.pitches, Integer)
+    return (
+        select(
+            po.pitcher,
+            func.sum(case((po.date == today, pitches), else_=0)).label('daily'),
+            func.sum(pitches).label('weekly'),
+        )
+        .where(po.team_id == team_id, po.date >= start_of_week, readable_number(po.pitches))
+        .group_by(po.pitcher)
+    )
+
+
+def query_recent_pitches(db, team_id, today):
+    return {row.pitcher: (row.daily, row.weekly) for row in db.execute(recent_pitches_select(team_id, today))}
+
+
+def query_pitch_count_summary(db, team_id, today=None):
+    """
+    Returns the pitch count summary (see stats.pitcher_summary) for every pitcher
+    on the team from the pitcher_workload ledger, so the cost grows with the number of
+    pitchers and seasons rather than with the outing history. Rest status comes from the
+    ledger's next_available_date, so a change to the rest rules in stats.py needs a ledger
+    rebuild (python pitcher_workload.py).
+    """
+    today = today or date.today()
+    totals = {}
+    for row in db.query(PitcherWorkload).filter(PitcherWorkload.team_id == team_id).order_by(PitcherWorkload.season):
+        # [daily, weekly, cumulative_year, next_available_date, innings, pitches, appearances]
+        pitcher_totals = totals.setdefault(row.pitcher, [0, 0, 0, None, 0.0, 0, 0])
+        if row.season == today.year:
+            pitcher_totals[2] = row.dated_pitches
+        # Rest follows the most recent outing, i.e. the latest season with a dated one.
+        if row.last_outing_date:
+            pitcher_totals[3] = row.next_available_date
+        pitcher_totals[4] += row.total_innings
+        pitcher_totals[5] += row.total_pitches
+        pitcher_totals[6] += row.appearances
+
+    for pitcher, (daily, weekly) in query_recent_pitches(db, team_id, today).items():
+        if pitcher in totals:
+            totals[pitcher][0], totals[pitcher][1] = daily, weekly
+
+    return {pitcher: pitcher_summary(pitcher_totals, today) for pitcher, pitcher_totals in totals.items()}
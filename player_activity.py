@@ -0,0 +1,238 @@
+# player_activity.py
+"""
+Maintains player_activity: one row per entry of each player's Player Development timeline
+(focuses created and completed, coach notes, lesson info), so a timeline is read newest first
+straight off the (team_id, player_id, timestamp DESC) index instead of being gathered from
+focuses, notes and players and sorted on every snapshot.
+
+Rows only point at their source (ref_id); entries are rendered from the focus, note or player
+they point at. Whenever a flush adds a focus or note or changes what decides a player's
+timeline (dates, status, a note's player, lesson info, the player's name), that player's rows
+are rebuilt in the same transaction; text edits leave the rows alone. Run this module to
+rebuild the table:
+
+    python player_activity.py
+"""
+from datetime import datetime
+from sqlalchemy import event, select, delete, inspect as sqlalchemy_inspect
+from models import Player, PlayerDevelopmentFocus, CollaborationNote, PlayerActivity, parse_datetime, format_date, format_timestamp
+
+FOCUS_CREATED = 'focus_created'
+FOCUS_COMPLETED = 'focus_completed'
+NOTE = 'note'
+LESSON = 'lesson'
+
+TIMELINE_PAGE_SIZE = 20
+TIMELINE_MAX_PAGE_SIZE = 100
+
+# Attributes whose changes move, add or remove a timeline entry.
+_PLAYER_ATTRIBUTES = ('name', 'has_lessons', 'lesson_focus', 'notes_timestamp')
+_FOCUS_ATTRIBUTES = ('status', 'created_date', 'completed_date', 'player_id')
+_NOTE_ATTRIBUTES = ('note_type', 'player_name', 'timestamp')
+
+
+def _activity_rows(connection, player_ids):
+    """
+    Rows for the given players, each player's in the order build_player_activity_log listed
+    entries before sorting them (focuses, their completions, notes, lessons), so entries with
+    equal timestamps keep that order when read back by id.
+    """
+    players = connection.execute(
+        select(Player.id, Player.team_id, Player.name, Player.has_lessons, Player.lesson_focus, Player.notes_timestamp)
+        .where(Player.id.in_(player_ids)).order_by(Player.id)
+    ).all()
+    if not players:
+        return []
+    focuses_by_player = {}
+    for focus in connection.execute(
+        select(PlayerDevelopmentFocus.id, PlayerDevelopmentFocus.player_id, PlayerDevelopmentFocus.status,
+               PlayerDevelopmentFocus.created_date, PlayerDevelopmentFocus.completed_date)
+        .where(PlayerDevelopmentFocus.player_id.in_(player_ids)).order_by(PlayerDevelopmentFocus.id)
+    ):
+        focuses_by_player.setdefault(focus.player_id, []).append(focus)
+    notes_by_name = {}
+    for note in connection.execute(
+        select(CollaborationNote.id, CollaborationNote.team_id, CollaborationNote.player_name, CollaborationNote.timestamp)
+        .where(CollaborationNote.team_id.in_({p.team_id for p in players}), CollaborationNote.note_type == 'player_notes',
+               CollaborationNote.player_name.in_({p.name for p in players}))
+        .order_by(CollaborationNote.id)
+    ):
+        notes_by_name.setdefault((note.team_id, note.player_name), []).append(note)
+
+    rows = []
+    for player in players:
+        def add(activity_type, ref_id, timestamp):
+            rows.append({'team_id': player.team_id, 'player_id': player.id, 'type': activity_type, 'ref_id': ref_id,
+                         'timestamp': parse_datetime(timestamp)})
+        for focus in focuses_by_player.get(player.id, []):
+            add(FOCUS_CREATED, focus.id, focus.created_date)
+            if focus.status == 'completed' and focus.completed_date:
+                add(FOCUS_COMPLETED, focus.id, focus.completed_date)
+        for note in notes_by_name.get((player.team_id, player.name), []):
+            add(NOTE, note.id, note.timestamp)
+        if player.has_lessons == 'Yes' and player.lesson_focus:
+            add(LESSON, player.id, player.notes_timestamp)
+    return rows
+
+
+def refresh_player_activity(connection, player_ids):
+    """Rebuilds the rows of the given players (deleted players lose theirs)."""
+    connection.execute(delete(PlayerActivity).where(PlayerActivity.player_id.in_(player_ids)))
+    rows = _activity_rows(connection, player_ids)
+    if rows:
+        connection.execute(PlayerActivity.__table__.insert(), rows)
+
+
+def rebuild_player_activity(connection):
+    """Rebuilds the whole table from focuses, notes and players."""
+    connection.execute(delete(PlayerActivity))
+    rows = _activity_rows(connection, connection.execute(select(Player.id).order_by(Player.id)).scalars().all())
+    if rows:
+        connection.execute(PlayerActivity.__table__.insert(), rows)
+    return len(rows)
+
+
+def _changed(obj, attributes):
+    state = sqlalchemy_inspect(obj)
+    return any(state.attrs[name].history.has_changes() for name in attributes)
+
+def record_activity(session, flush_context):
+    """after_flush hook: rebuilds the timeline of every player a flushed focus, note or player touches."""
+    player_ids = set()
+    note_names = set()  # (team id, player name) of player notes added, moved or deleted
+    for obj in session.new:
+        if isinstance(obj, Player):
+            player_ids.add(obj.id)
+        elif isinstance(obj, PlayerDevelopmentFocus):
+            player_ids.add(obj.player_id)
+        elif isinstance(obj, CollaborationNote):
+            note_names.add((obj.team_id, obj.player_name))
+    for obj in session.dirty:
+        if isinstance(obj, Player) and _changed(obj, _PLAYER_ATTRIBUTES):
+            player_ids.add(obj.id)
+        elif isinstance(obj, PlayerDevelopmentFocus) and _changed(obj, _FOCUS_ATTRIBUTES):
+            player_ids.add(obj.player_id)
+            player_ids.update(sqlalchemy_inspect(obj).attrs.player_id.history.deleted)
+        elif isinstance(obj, CollaborationNote) and _changed(obj, _NOTE_ATTRIBUTES):
+            note_names.add((obj.team_id, obj.player_name))
+            note_names.update((obj.team_id, name) for name in sqlalchemy_inspect(obj).attrs.player_name.history.deleted)
+    for obj in session.deleted:
+        if isinstance(obj, Player):
+            player_ids.add(obj.id)
+        elif isinstance(obj, PlayerDevelopmentFocus):
+            player_ids.add(obj.player_id)
+        elif isinstance(obj, CollaborationNote):
+            note_names.add((obj.team_id, obj.player_name))
+
+    connection = session.connection()
+    for team_id, name in note_names:
+        if name:
+            player_ids.update(connection.execute(select(Player.id).where(Player.team_id == team_id, Player.name == name)).scalars())
+    player_ids.discard(None)
+    if player_ids:
+        refresh_player_activity(connection, sorted(player_ids))
+
+
+def install_activity_ledger(session_factory):
+    event.listen(session_factory, 'after_flush', record_activity)
+
+
+# --- Reading timelines ---
+def activity_select(team_id, player_ids=None):
+    """The team's timeline rows (player_id, type, ref_id), each player's newest first, in index order."""
+    pa = PlayerActivity
+    query = select(pa.player_id, pa.type, pa.ref_id).where(pa.team_id == team_id)
+    if player_ids is not None:
+        query = query.where(pa.player_id.in_(player_ids))
+    return query.order_by(pa.player_id, pa.timestamp.desc(), pa.id)
+
+
+def activity_entry(activity_type, source, get_display_name):
+    """The timeline entry the client shows for a row; source is the focus, note or player it points at."""
+    if activity_type in (FOCUS_CREATED, FOCUS_COMPLETED):
+        if activity_type == FOCUS_CREATED:
+            day, text, author = format_date(source.created_date), f"New Focus: {source.focus}", source.author
+        else:
+            day, text, author = format_date(source.completed_date), f"Completed: {source.focus}", source.last_edited_by or source.author
+        return {'type': 'Development', 'subtype': source.skill_type, 'date': day, 'timestamp': day, 'text': text, 'notes': source.notes, 'author': get_display_name(author), 'status': source.status, 'id': source.id}
+    if activity_type == NOTE:
+        return {'type': 'Coach Note', 'subtype': 'Player Log', 'date': format_date(source.timestamp) or 'N/A', 'timestamp': format_timestamp(source.timestamp) or '1970-01-01 00:00', 'text': source.text, 'notes': None, 'author': get_display_name(source.author), 'status': 'active', 'id': source.id}
+    return {'type': 'Lessons', 'subtype': 'Private Instruction', 'date': format_date(source.notes_timestamp) or 'N/A', 'timestamp': format_timestamp(source.notes_timestamp) or '1970-01-01 00:00', 'text': f"Lesson Focus: {source.lesson_focus}", 'notes': None, 'author': 'N/A', 'status': 'active', 'id': source.id}
+
+
+def _source_key(activity_type, ref_id):
+    return ('focus' if activity_type in (FOCUS_CREATED, FOCUS_COMPLETED) else activity_type, ref_id)
+
+
+def query_player_timeline(db, team_id, player, get_display_name, limit=TIMELINE_PAGE_SIZE, cursor=None):
+    """
+    One page of a player's timeline, newest first. cursor is the next_cursor of the previous
+    page: (timestamp, id) of its last row, compared with the index order so pages don't
+    overlap even when entries are added in between.
+    Returns:
+        dict: {'player_id', 'name', 'entries': [...], 'next_cursor': str or None}
+    """
+    pa = PlayerActivity
+    query = (select(pa.id, pa.type, pa.ref_id, pa.timestamp)
+             .where(pa.team_id == team_id, pa.player_id == player.id)
+             .order_by(pa.timestamp.desc(), pa.id))
+    if cursor is not None:
+        timestamp, last_id = cursor
+        if timestamp is None:
+            query = query.where(pa.timestamp.is_(None), pa.id > last_id)
+        else:
+            query = query.where((pa.timestamp < timestamp) | pa.timestamp.is_(None) | ((pa.timestamp == timestamp) & (pa.id > last_id)))
+    rows = db.execute(query.limit(limit + 1)).all()
+    page = rows[:limit]
+
+    focus_ids = [r.ref_id for r in page if r.type in (FOCUS_CREATED, FOCUS_COMPLETED)]
+    note_ids = [r.ref_id for r in page if r.type == NOTE]
+    sources = {('lesson', player.id): player}
+    if focus_ids:
+        sources.update((('focus', f.id), f) for f in db.query(PlayerDevelopmentFocus).filter(PlayerDevelopmentFocus.id.in_(focus_ids)))
+    if note_ids:
+        sources.update((('note', n.id), n) for n in db.query(CollaborationNote).filter(CollaborationNote.id.in_(note_ids)))
+    entries = [activity_entry(r.type, sources[_source_key(r.type, r.ref_id)], get_display_name)
+               for r in page if _source_key(r.type, r.ref_id) in sources]
+
+    next_cursor = None
+    if len(rows) > limit:
+        last = page[-1]
+        next_cursor = f"{last.timestamp.isoformat() if last.timestamp else ''}|{last.id}"
+    return {'player_id': player.id, 'name': player.name, 'entries': entries, 'next_cursor': next_cursor}
+
+
+def parse_cursor(value):
+    """(timestamp, id) for a next_cursor string, or None if it can't be read."""
+    timestamp, _, last_id = (value or '').partition('|')
+    try:
+        return (datetime.fromisoformat(timestamp) if timestamp else None, int(last_id))
+    except ValueError:
+        return None
+
+
+def build_player_activity_log(db, team_id, roster_players, collaboration_player_notes, get_display_name):
+    """
+    The Player Development timeline of each roster player ({name: [entry, ...]}, newest first),
+    read in index order from player_activity. roster_players must have development_focuses
+    loaded; collaboration_player_notes are the team's player notes for those players.
+    """
+    sources = {('note', n.id): n for n in collaboration_player_notes}
+    for player in roster_players:
+        sources[('lesson', player.id)] = player
+        sources.update((('focus', f.id), f) for f in player.development_focuses)
+    entries_by_player = {player.id: [] for player in roster_players}
+    for player_id, activity_type, ref_id in db.execute(activity_select(team_id, list(entries_by_player))):
+        source = sources.get(_source_key(activity_type, ref_id))
+        if source is not None:
+            entries_by_player[player_id].append(activity_entry(activity_type, source, get_display_name))
+    return {player.name: entries_by_player[player.id] for player in roster_players}
+
+
+if __name__ == '__main__':
+    from db import engine
+    from models import Base
+    Base.metadata.create_all(engine)
+    with engine.begin() as connection:
+        count = rebuild_player_activity(connection)
+    print(f"Rebuilt player_activity: {count} row(s).")
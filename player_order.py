@@ -0,0 +1,136 @@
+# player_order.py
+"""
+Each coach's order of the roster (the Roster and Player Development accordions and the player
+pickers), stored in user_player_order as one row per user and placed player with gapped
+integer sort keys. Players without a row, such as everyone added since the coach last
+reordered, come after the placed ones in roster order. So adding a player writes nothing,
+renaming one touches no ordering rows, and deleting one removes only its own rows.
+
+Clients still send and receive the order as a list of player names. Saving one keeps every
+row whose key is already in order (the longest such run) and only gives the moved players
+new keys between their neighbours'.
+"""
+from bisect import bisect_left
+from sqlalchemy import select, and_
+from models import Player, UserPlayerOrder
+
+SORT_KEY_GAP = 1024
+
+
+def order_rows(user_id, names, player_ids):
+    """Rows placing the named players in order, for an order saved as names. player_ids maps roster names to ids."""
+    rows = []
+    placed = set()
+    for name in names:
+        player_id = player_ids.get(name)
+        if player_id is not None and player_id not in placed:
+            placed.add(player_id)
+            rows.append({'user_id': user_id, 'player_id': player_id, 'sort_key': (len(rows) + 1) * SORT_KEY_GAP})
+    return rows
+
+
+def order_select(user_id, team_id):
+    """(player id, name, sort key or None) for the team's players in the user's order."""
+    upo = UserPlayerOrder
+    return (select(Player.id, Player.name, upo.sort_key)
+            .outerjoin(upo, and_(upo.player_id == Player.id, upo.user_id == user_id))
+            .where(Player.team_id == team_id)
+            .order_by(upo.sort_key.is_(None), upo.sort_key, Player.id))
+
+
+def query_player_order(db, user_id, team_id):
+    """The user's order of the roster as player names."""
+    return [name for _, name, _ in db.execute(order_select(user_id, team_id))]
+
+
+def _kept_positions(keys):
+    """Positions of a longest run of keys (None = no row) that are already increasing."""
+    tails, tail_positions, previous = [], [], {}
+    for position, key in enumerate(keys):
+        if key is None:
+            continue
+        i = bisect_left(tails, key)
+        previous[position] = tail_positions[i - 1] if i else None
+        if i == len(tails):
+            tails.append(key)
+            tail_positions.append(position)
+        else:
+            tails[i] = key
+            tail_positions[i] = position
+    kept = set()
+    position = tail_positions[-1] if tail_positions else None
+    while position is not None:
+        kept.add(position)
+        position = previous[position]
+    return kept
+
+
+def _new_keys(keys, kept):
+    """Keys for the positions not kept, spread between the kept keys around them; None if a gap is too small."""
+    new_keys = {}
+    run = []
+    low = None
+    for position, key in enumerate(keys + [None]):
+        if position < len(keys) and position not in kept:
+            run.append(position)
+            continue
+        high = key if position < len(keys) else None
+        if run:
+            if low is None and high is None:
+                spread = [(i + 1) * SORT_KEY_GAP for i in range(len(run))]
+            elif high is None:
+                spread = [low + (i + 1) * SORT_KEY_GAP for i in range(len(run))]
+            elif low is None:
+                spread = [high - (len(run) - i) * SORT_KEY_GAP for i in range(len(run))]
+            else:
+                step = (high - low) // (len(run) + 1)
+                if step < 1:
+                    return None
+                spread = [low + (i + 1) * step for i in range(len(run))]
+            new_keys.update(zip(run, spread))
+            run = []
+        low = key
+    return new_keys
+
+
+def save_player_order(db, user_id, team_id, names):
+    """
+    Saves the user's order from a list of names. Roster players the list leaves out keep their
+    current relative order after the named ones; names not on the roster are ignored.
+    Returns the number of rows written.
+    """
+    current = db.execute(order_select(user_id, team_id)).all()
+    player_ids = {}
+    for player_id, name, _ in sorted(current):
+        player_ids.setdefault(name, player_id)
+    keys_by_player = {player_id: key for player_id, _, key in current}
+
+    ordered = [row['player_id'] for row in order_rows(user_id, names, player_ids)]
+    named = set(ordered)
+    ordered += [player_id for player_id, _, _ in current if player_id not in named]
+
+    # Players at the end without a row, still in roster order, can stay without one.
+    placed_count = len(ordered)
+    while (placed_count and keys_by_player[ordered[placed_count - 1]] is None
+           and (placed_count == len(ordered) or ordered[placed_count - 1] < ordered[placed_count])):
+        placed_count -= 1
+    # Everyone else (every player with a row included) ends up with increasing keys.
+    placed = ordered[:placed_count]
+    keys = [keys_by_player[player_id] for player_id in placed]
+    kept = _kept_positions(keys)
+    new_keys = _new_keys(keys, kept)
+    if new_keys is None:
+        # No room between two kept keys: renumber this user's placed players.
+        new_keys = {position: (position + 1) * SORT_KEY_GAP for position in range(len(placed))}
+
+    writes = 0
+    for position, key in new_keys.items():
+        player_id = placed[position]
+        if keys_by_player[player_id] is None:
+            db.add(UserPlayerOrder(user_id=user_id, player_id=player_id, sort_key=key))
+        elif keys_by_player[player_id] != key:
+            db.query(UserPlayerOrder).filter_by(user_id=user_id, player_id=player_id).update({'sort_key': key}, synchronize_session=False)
+        else:
+            continue
+        writes += 1
+    return writes
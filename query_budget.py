@@ -0,0 +1,43 @@
+# query_budget.py
+"""
+Counts the SQL statements each view runs. In debug and testing mode a view that goes over
+its budget raises QueryBudgetExceeded, so N+1 patterns (a lazy relationship loaded once per
+row) fail tests instead of slowly making pages heavier.
+"""
+from functools import wraps
+from flask import g, current_app, has_app_context, request
+from sqlalchemy import event
+
+DEFAULT_QUERY_BUDGET = 20
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+def count_statement(conn, cursor, statement, parameters, context, executemany):
+    if has_app_context() and 'query_count' in g:
+        g.query_count += 1
+
+def install_query_counter(engine):
+    event.listen(engine, 'before_cursor_execute', count_statement)
+
+
+def query_budget(limit):
+    """Gives a view a budget other than DEFAULT_QUERY_BUDGET. Apply below @app.route."""
+    def decorator(view):
+        view.query_budget = limit
+        return view
+    return decorator
+
+def enforce_query_budget(view):
+    """Wraps a view so the statements it runs are counted and checked against its budget."""
+    budget = getattr(view, 'query_budget', DEFAULT_QUERY_BUDGET)
+    @wraps(view)
+    def counted(*args, **kwargs):
+        g.query_count = 0
+        response = view(*args, **kwargs)
+        if g.query_count > budget and (current_app.debug or current_app.testing):
+            raise QueryBudgetExceeded(f"{request.endpoint} ran {g.query_count} SQL statements (budget {budget})")
+        return response
+    return counted
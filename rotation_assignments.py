@@ -0,0 +1,157 @@
+# rotation_assignments.py
+"""
+Maintains rotation_assignments: one row per player, position and inning of every saved
+rotation, so playing time can be summed in SQL over a game or a whole season instead of
+walking each rotation's innings JSON.
+
+Rotation.innings stays what the editor loads and saves. Whenever a flush adds, edits or
+deletes rotations, their rows are rebuilt from it inside the same transaction; players added
+to or removed from the roster are linked or unlinked by name. Run this module to rebuild the
+table from rotations:
+
+    python rotation_assignments.py
+"""
+from sqlalchemy import event, select, delete, update, func, and_, inspect as sqlalchemy_inspect
+from models import Player, Rotation, RotationAssignment, Game
+
+
+def _inning_number(key):
+    try:
+        return int(key)
+    except (TypeError, ValueError):
+        return None
+
+def assignment_values(team_id, rotation_id, innings, player_ids):
+    """
+    Rows for a rotation's innings ({inning: {position: player name}}). Innings whose key isn't
+    a number are left out; empty innings get one row without position or player.
+    """
+    rows = []
+    for key, positions in (innings or {}).items():
+        inning = _inning_number(key)
+        if inning is None:
+            continue
+        assigned = [(position, name) for position, name in (positions if isinstance(positions, dict) else {}).items() if name]
+        for position, name in assigned or [(None, None)]:
+            rows.append({'rotation_id': rotation_id, 'team_id': team_id, 'inning': inning, 'position': position,
+                         'player_name': name, 'player_id': player_ids.get(name)})
+    return rows
+
+
+def _rotation_rows(connection, rotations):
+    """Assignment rows for (rotation id, team id, innings) tuples."""
+    rows = []
+    player_ids_by_team = {}
+    for rotation_id, team_id, innings in rotations:
+        if team_id not in player_ids_by_team:
+            player_ids_by_team[team_id] = {}
+            for player_id, name in connection.execute(select(Player.id, Player.name).where(Player.team_id == team_id).order_by(Player.id)):
+                player_ids_by_team[team_id].setdefault(name, player_id)
+        rows.extend(assignment_values(team_id, rotation_id, innings, player_ids_by_team[team_id]))
+    return rows
+
+
+def refresh_assignments(connection, rotation_ids):
+    """Rebuilds the rows of the given rotations from their innings (deleted rotations lose theirs)."""
+    connection.execute(delete(RotationAssignment).where(RotationAssignment.rotation_id.in_(rotation_ids)))
+    rows = _rotation_rows(connection, connection.execute(
+        select(Rotation.id, Rotation.team_id, Rotation.innings).where(Rotation.id.in_(rotation_ids)).order_by(Rotation.id)
+    ).all())
+    if rows:
+        connection.execute(RotationAssignment.__table__.insert(), rows)
+
+
+def rebuild_assignments(connection):
+    """Rebuilds the whole table from rotations."""
+    connection.execute(delete(RotationAssignment))
+    rows = _rotation_rows(connection, connection.execute(select(Rotation.id, Rotation.team_id, Rotation.innings).order_by(Rotation.id)).all())
+    if rows:
+        connection.execute(RotationAssignment.__table__.insert(), rows)
+    return len(rows)
+
+
+def record_assignments(session, flush_context):
+    """after_flush hook: refreshes the rows of every rotation in the flush and follows roster changes."""
+    rotation_ids = set()
+    for obj in session.new:
+        if isinstance(obj, Rotation):
+            rotation_ids.add(obj.id)
+    for obj in session.dirty:
+        if isinstance(obj, Rotation) and sqlalchemy_inspect(obj).attrs.innings.history.has_changes():
+            rotation_ids.add(obj.id)
+    for obj in session.deleted:
+        if isinstance(obj, Rotation):
+            rotation_ids.add(obj.id)
+
+    connection = session.connection()
+    if rotation_ids:
+        refresh_assignments(connection, sorted(rotation_ids))
+    ra = RotationAssignment
+    for obj in session.new:
+        if isinstance(obj, Player):
+            connection.execute(update(ra).where(ra.team_id == obj.team_id, ra.player_id.is_(None), ra.player_name == obj.name).values(player_id=obj.id))
+    for obj in session.deleted:
+        if isinstance(obj, Player):
+            connection.execute(update(ra).where(ra.team_id == obj.team_id, ra.player_id == obj.id).values(player_id=None))
+
+
+def install_assignment_ledger(session_factory):
+    event.listen(session_factory, 'after_flush', record_assignments)
+
+
+def rotations_select(team_id, game_id=None, start=None, end=None):
+    """Ids of the team's rotations for a game, or for the games between two dates (inclusive)."""
+    query = select(Rotation.id).where(Rotation.team_id == team_id)
+    if game_id is not None:
+        query = query.where(Rotation.associated_game_id == game_id)
+    if start is not None or end is not None:
+        query = query.join(Game, and_(Game.id == Rotation.associated_game_id, Game.team_id == team_id))
+        if start is not None:
+            query = query.where(Game.date >= start)
+        if end is not None:
+            query = query.where(Game.date <= end)
+    return query
+
+
+def query_playing_time(db, roster_players, rotation_ids):
+    """
+    Playing time over the rotations selected by `rotation_ids` (see rotations_select), counted
+    the way the game page's summary counts one rotation: an inning on the field for each inning
+    a player has any position, on the bench for every other inning.
+    Returns:
+        dict: {'rotations', 'innings', 'players': [{'player_id', 'name', 'innings_on_field',
+               'innings_on_bench', 'positions': {position: innings}}]} in roster order.
+    """
+    ra = RotationAssignment
+    in_scope = ra.rotation_id.in_(rotation_ids.scalar_subquery())
+    innings = select(ra.rotation_id, ra.inning).where(in_scope).distinct().subquery()
+    rotation_count, inning_count = db.execute(select(func.count(func.distinct(innings.c.rotation_id)), func.count()).select_from(innings)).one()
+
+    on_field = select(ra.rotation_id, ra.inning, ra.player_id).where(in_scope, ra.player_id.isnot(None)).distinct().subquery()
+    field_innings = dict(db.execute(select(on_field.c.player_id, func.count()).group_by(on_field.c.player_id)).all())
+    positions = {}
+    for player_id, position, count in db.execute(
+        select(ra.player_id, ra.position, func.count()).where(in_scope, ra.player_id.isnot(None)).group_by(ra.player_id, ra.position)
+    ):
+        positions.setdefault(player_id, {})[position] = count
+
+    players = []
+    for player in roster_players:
+        on_field_count = field_innings.get(player.id, 0)
+        players.append({
+            'player_id': player.id,
+            'name': player.name,
+            'innings_on_field': on_field_count,
+            'innings_on_bench': inning_count - on_field_count,
+            'positions': positions.get(player.id, {}),
+        })
+    return {'rotations': rotation_count, 'innings': inning_count, 'players': players}
+
+
+if __name__ == '__main__':
+    from db import engine
+    from models import Base
+    Base.metadata.create_all(engine)
+    with engine.begin() as connection:
+        count = rebuild_assignments(connection)
+    print(f"Rebuilt rotation_assignments: {count} row(s).")
@@ -0,0 +1,185 @@
+# rotation_generator.py
+"""
+Fills a defensive rotation automatically. Innings are filled in order; each one is an
+assignment problem (players x field positions plus bench spots) solved exactly with the
+Hungarian algorithm, with costs that encode:
+
+    - eligibility: a player's position1 is cheapest, then position2 and position3; any
+      other position is possible but expensive, so every spot can always be filled
+    - fairness: the bench goes to the players who have sat least, and a player who has sat
+      max_consecutive_bench innings in a row is kept on the field
+    - infield time: players short of min_infield_innings are pulled toward 1B/2B/3B/SS,
+      and put there outright once the innings left only just cover what they still need;
+      when the team's total shortfall is more than the infield spots of the later innings
+      (less the last, which the bench rule may already need) can absorb, this inning's
+      infield goes to players who still need it
+    - variety: playing the same position again costs a little more
+
+Inning 1 can be seeded from the game's lineup, the same way saving a lineup fills inning 1
+of its game's rotation (inning_from_lineup).
+"""
+FIELD_POSITIONS = ('P', 'C', '1B', '2B', '3B', 'SS', 'LF', 'CF', 'RF')
+INFIELD_POSITIONS = ('1B', '2B', '3B', 'SS')
+
+ELIGIBLE_COSTS = (0, 2, 4)  # position1, position2, position3
+INELIGIBLE_COST = 30
+NO_PREFERENCE_COST = 6  # players with no positions listed
+REPEAT_COST = 1
+BENCH_COST = 10  # per inning already spent on the bench
+INFIELD_NEED_BONUS = 5
+INFIELD_SHORT_BONUS = 500  # below FORBIDDEN: keeping bench streaks short comes first
+FORBIDDEN = 1000
+
+
+def min_cost_assignment(cost):
+    """
+    Hungarian algorithm (shortest augmenting paths with potentials), O(n^2 * m).
+    cost is an n x m matrix with n <= m; returns the column assigned to each row.
+    """
+    n = len(cost)
+    m = len(cost[0]) if n else 0
+    inf = float('inf')
+    u = [0.0] * (n + 1)
+    v = [0.0] * (m + 1)
+    match = [0] * (m + 1)  # column -> row (1-based, 0 = free)
+    way = [0] * (m + 1)
+    for i in range(1, n + 1):
+        match[0] = i
+        j0 = 0
+        minv = [inf] * (m + 1)
+        used = [False] * (m + 1)
+        while True:
+            used[j0] = True
+            i0 = match[j0]
+            row = cost[i0 - 1]
+            delta = inf
+            j1 = 0
+            for j in range(1, m + 1):
+                if not used[j]:
+                    reduced = row[j - 1] - u[i0] - v[j]
+                    if reduced < minv[j]:
+                        minv[j] = reduced
+                        way[j] = j0
+                    if minv[j] < delta:
+                        delta = minv[j]
+                        j1 = j
+            for j in range(m + 1):
+                if used[j]:
+                    u[match[j]] += delta
+                    v[j] -= delta
+                else:
+                    minv[j] -= delta
+            j0 = j1
+            if match[j0] == 0:
+                break
+        while j0:
+            j1 = way[j0]
+            match[j0] = match[j1]
+            j0 = j1
+    assignment = [0] * n
+    for j in range(1, m + 1):
+        if match[j]:
+            assignment[match[j] - 1] = j - 1
+    return assignment
+
+
+def inning_from_lineup(lineup_positions):
+    """{position: player name} for the lineup spots that have both a position and a player."""
+    return {item['position']: item['name'] for item in lineup_positions if item.get('position') and item.get('name')}
+
+
+def _eligibility(player):
+    preferred = [p for p in (player.position1, player.position2, player.position3) if p]
+    costs = {}
+    for rank, position in enumerate(preferred):
+        costs.setdefault(position, ELIGIBLE_COSTS[rank])
+    default = INELIGIBLE_COST if preferred else NO_PREFERENCE_COST
+    return [costs.get(position, default) for position in FIELD_POSITIONS]
+
+
+def generate_rotation(players, innings, max_consecutive_bench=1, min_infield_innings=1, first_inning=None):
+    """
+    Builds a Rotation.innings assignment for `players` (objects with name and position1-3).
+    Args:
+        innings (int): Number of innings to fill.
+        max_consecutive_bench (int): Innings in a row a player may sit.
+        min_infield_innings (int): Innings each player should play at 1B, 2B, 3B or SS.
+        first_inning (dict, optional): {position: player name} kept as inning 1; open positions
+            are filled around it.
+    Returns:
+        dict: {'innings': {'1': {position: player name}, ...}, 'warnings': [str]} where the
+              warnings list the fairness constraints that could not be met.
+    """
+    names = [p.name for p in players]
+    index = {name: i for i, name in enumerate(names)}
+    eligibility = [_eligibility(p) for p in players]
+    bench_count = [0] * len(players)
+    bench_streak = [0] * len(players)
+    infield_count = [0] * len(players)
+    position_count = [[0] * len(FIELD_POSITIONS) for _ in players]
+    warnings = []
+    result = {}
+
+    for inning in range(1, innings + 1):
+        fixed = dict(first_inning or {}) if inning == 1 else {}
+        fixed = {position: name for position, name in fixed.items() if name in index}
+        fixed_players = {index[name] for name in fixed.values()}
+        open_positions = [j for j, position in enumerate(FIELD_POSITIONS) if position not in fixed]
+        free_players = [i for i in range(len(players)) if i not in fixed_players]
+        remaining = innings - inning + 1
+        total_infield_need = sum(max(0, min_infield_innings - infield_count[i]) for i in free_players)
+        infield_short = total_infield_need > len(INFIELD_POSITIONS) * (remaining - 2)
+
+        # Columns: open positions, then enough bench spots for everyone left over.
+        bench_spots = max(0, len(free_players) - len(open_positions))
+        cost = []
+        for i in free_players:
+            infield_need = max(0, min_infield_innings - infield_count[i])
+            must_play_infield = infield_need >= remaining
+            row = []
+            for j in open_positions:
+                position = FIELD_POSITIONS[j]
+                c = eligibility[i][j] + REPEAT_COST * position_count[i][j]
+                if position in INFIELD_POSITIONS:
+                    c -= INFIELD_NEED_BONUS * infield_need
+                    if infield_need and infield_short:
+                        c -= INFIELD_SHORT_BONUS
+                elif must_play_infield:
+                    c += FORBIDDEN
+                row.append(c)
+            bench = BENCH_COST * bench_count[i]
+            if bench_streak[i] >= max_consecutive_bench or must_play_infield:
+                bench += FORBIDDEN
+            row.extend([bench] * bench_spots)
+            cost.append(row)
+
+        # More open positions than players: the assignment leaves some positions empty.
+        assignment = min_cost_assignment(cost) if free_players else []
+        inning_positions = dict(fixed)
+        on_field = set(fixed_players)
+        for row, i in enumerate(free_players):
+            column = assignment[row]
+            if column < len(open_positions):
+                inning_positions[FIELD_POSITIONS[open_positions[column]]] = names[i]
+                on_field.add(i)
+
+        for position, name in inning_positions.items():
+            i = index[name]
+            if position in FIELD_POSITIONS:
+                position_count[i][FIELD_POSITIONS.index(position)] += 1
+            if position in INFIELD_POSITIONS:
+                infield_count[i] += 1
+        for i in range(len(players)):
+            if i in on_field:
+                bench_streak[i] = 0
+            else:
+                bench_count[i] += 1
+                bench_streak[i] += 1
+                if bench_streak[i] == max_consecutive_bench + 1:
+                    warnings.append(f"{names[i]} sits more than {max_consecutive_bench} inning(s) in a row (inning {inning}).")
+        result[str(inning)] = inning_positions
+
+    for i, name in enumerate(names):
+        if infield_count[i] < min_infield_innings:
+            warnings.append(f"{name} plays {infield_count[i]} infield inning(s), fewer than {min_infield_innings}.")
+    return {'innings': result, 'warnings': warnings}
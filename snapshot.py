@@ -0,0 +1,167 @@
+# snapshot.py
+import math
+from datetime import date
+from sqlalchemy.orm import selectinload
+from models import (
+    Player, Lineup, PitchingOuting, ScoutedPlayer,
+    Rotation, Game, CollaborationNote, PracticePlan, PracticeTask, Sign,
+    model_serializer
+)
+from stats import pitcher_summary
+from pitching_queries import query_pitch_count_summary
+from lineup_slots import query_lineup_positions, query_cumulative_position_stats
+from player_activity import build_player_activity_log
+from team_metadata import team_metadata_cache
+
+SCOUTING_LIST_TYPES = ('committed', 'targets', 'not_interested')
+NOTE_TYPES = ('player_notes', 'team_notes')
+
+
+def make_display_name_resolver(db, team):
+    """Returns a function mapping a username to the name shown for authors on this team."""
+    metadata = team_metadata_cache.get(db, team.id)
+    user_name_map = metadata['user_names'] if metadata else {}
+    display_full_names = team.display_coach_names
+    def get_display_name(username):
+        if not username or username == 'N/A': return 'N/A'
+        return user_name_map.get(username, username) if display_full_names else username
+    return get_display_name
+
+
+# --- Per-entity serializers (shared by full snapshots and delta sync) ---
+_serialize_player_fields = model_serializer(Player, ("name", "number", "position1", "position2", "position3", "throws", "bats", "notes", "pitcher_role", "has_lessons", "lesson_focus", "notes_author", "notes_timestamp", "id"))
+_serialize_pitching_fields = model_serializer(PitchingOuting, ("id", "date", "pitcher", "opponent", "pitches", "innings", "pitcher_type", "outing_type"))
+_serialize_note_fields = model_serializer(CollaborationNote, ("id", "text", "author", "timestamp", "note_type", "player_name"))
+_serialize_plan_fields = model_serializer(PracticePlan, ("id", "date", "general_notes"))
+_serialize_task_fields = model_serializer(PracticeTask, ("id", "text", "status", "author", "timestamp"))
+
+def serialize_player(p, get_display_name):
+    player = _serialize_player_fields(p)
+    player["notes_author"] = get_display_name(player["notes_author"])
+    return player
+
+_serialize_lineup_fields = model_serializer(Lineup, ("id", "title", "associated_game_id"))
+
+def serialize_lineup(l, lineup_positions):
+    lineup = _serialize_lineup_fields(l)
+    lineup["lineup_positions"] = lineup_positions
+    return lineup
+
+def serialize_pitching_outing(po):
+    outing = _serialize_pitching_fields(po)
+    # Sanitize pitching data to prevent JSON errors with non-finite numbers
+    innings = float(outing["innings"]) if outing["innings"] is not None else 0.0
+    outing["innings"] = innings if math.isfinite(innings) else 0.0
+    return outing
+
+serialize_scouted_player = model_serializer(ScoutedPlayer, ("id", "name", "position1", "position2", "throws", "bats"))
+
+serialize_rotation = model_serializer(Rotation, ("id", "title", "innings", "associated_game_id"))
+
+serialize_game = model_serializer(Game, ("id", "date", "opponent", "location", "game_notes", "associated_lineup_title", "associated_rotation_date"))
+
+def serialize_collaboration_note(cn, get_display_name):
+    note = _serialize_note_fields(cn)
+    note["author"] = get_display_name(note["author"])
+    if note.pop("note_type") != 'player_notes':
+        del note["player_name"]
+    return note
+
+def serialize_practice_task(pt, get_display_name):
+    task = _serialize_task_fields(pt)
+    task["author"] = get_display_name(task["author"])
+    return task
+
+def serialize_practice_plan(pp, get_display_name):
+    plan = _serialize_plan_fields(pp)
+    plan["tasks"] = [serialize_practice_task(pt, get_display_name) for pt in pp.tasks]
+    return plan
+
+serialize_sign = model_serializer(Sign, ("id", "name", "indicator"))
+
+def serialize_settings(team):
+    return {'registration_code': team.registration_code, 'team_name': team.team_name}
+
+
+def build_team_pitch_count_summary(db, team_id):
+    summaries = query_pitch_count_summary(db, team_id)
+    return {name: summaries[name] for name in sorted(name for name in summaries if name)}
+
+
+def empty_pitch_count_summary():
+    """Summary for a pitcher with no logged outings."""
+    return pitcher_summary([0, 0, 0, None, 0.0, 0, 0], date.today())
+
+
+def build_team_snapshot(db, team):
+    """
+    Builds everything the main page, /get_app_data, /stats and game management read for a
+    team. Each table is loaded once and every derived statistic is computed from those rows.
+    Returns:
+        dict: {'full_data', 'pitch_count_summary', 'cumulative_pitching_data',
+               'cumulative_position_data', 'position_counts'}
+    """
+    team_id = team.id
+    get_display_name = make_display_name_resolver(db, team)
+
+    # Players and plans are loaded as objects so their focuses/tasks come in one extra query each.
+    roster_players = db.query(Player).filter_by(team_id=team_id).options(selectinload(Player.development_focuses)).order_by(Player.id).all()
+    practice_plans = db.query(PracticePlan).filter_by(team_id=team_id).options(selectinload(PracticePlan.tasks)).order_by(PracticePlan.date.desc()).all()
+    lineups = db.query(*Lineup.__table__.columns).filter(Lineup.team_id == team_id).order_by(Lineup.id).all()
+    pitching_outings = db.query(*PitchingOuting.__table__.columns).filter(PitchingOuting.team_id == team_id).order_by(PitchingOuting.id).all()
+    scouted_players = db.query(*ScoutedPlayer.__table__.columns).filter(ScoutedPlayer.team_id == team_id).order_by(ScoutedPlayer.id).all()
+    rotations = db.query(*Rotation.__table__.columns).filter(Rotation.team_id == team_id).order_by(Rotation.id).all()
+    games = db.query(*Game.__table__.columns).filter(Game.team_id == team_id).order_by(Game.id).all()
+    collaboration_notes = db.query(*CollaborationNote.__table__.columns).filter(CollaborationNote.team_id == team_id).order_by(CollaborationNote.id).all()
+    signs = db.query(*Sign.__table__.columns).filter(Sign.team_id == team_id).order_by(Sign.id).all()
+
+    scouting_list = {list_type: [] for list_type in SCOUTING_LIST_TYPES}
+    scouted_for_position_counts = []
+    for sp in scouted_players:
+        if sp.list_type in scouting_list:
+            scouting_list[sp.list_type].append(serialize_scouted_player(sp))
+        if sp.list_type in ('committed', 'targets'):
+            scouted_for_position_counts.append(sp)
+
+    notes_by_type = {note_type: [] for note_type in NOTE_TYPES}
+    for cn in collaboration_notes:
+        if cn.note_type in notes_by_type:
+            notes_by_type[cn.note_type].append(cn)
+
+    lineup_positions = query_lineup_positions(db, team_id)
+    serialized_lineups = [serialize_lineup(l, lineup_positions.get(l.id, [])) for l in lineups]
+    roster = [serialize_player(p, get_display_name) for p in roster_players]
+
+    app_data = {
+        'roster': roster,
+        'lineups': serialized_lineups,
+        'pitching': [serialize_pitching_outing(po) for po in pitching_outings],
+        'scouting_list': scouting_list,
+        'rotations': [serialize_rotation(r) for r in rotations],
+        'games': [serialize_game(g) for g in games],
+        'settings': serialize_settings(team),
+        'collaboration_notes': {
+            note_type: [serialize_collaboration_note(cn, get_display_name) for cn in notes]
+            for note_type, notes in notes_by_type.items()
+        },
+        'practice_plans': [serialize_practice_plan(pp, get_display_name) for pp in practice_plans],
+        'player_development': build_player_activity_log(db, team_id, roster_players, notes_by_type['player_notes'], get_display_name),
+        'signs': [serialize_sign(s) for s in signs]
+    }
+
+    pitch_count_summary = build_team_pitch_count_summary(db, team_id)
+    cumulative_keys = ('total_innings_pitched', 'total_pitches_thrown', 'appearances')
+    cumulative_pitching_data = {name: {key: summary[key] for key in cumulative_keys} for name, summary in pitch_count_summary.items()}
+
+    position_counts = {}
+    for player in list(roster_players) + scouted_for_position_counts:
+        pos = player.position1
+        if pos: position_counts[pos] = position_counts.get(pos, 0) + 1
+
+    return {
+        'full_data': app_data,
+        'pitch_count_summary': pitch_count_summary,
+        'cumulative_pitching_data': cumulative_pitching_data,
+        'cumulative_position_data': query_cumulative_position_stats(db, team_id, roster_players),
+        'position_counts': position_counts,
+    }
@@ -0,0 +1,83 @@
+# snapshot_cache.py
+import threading
+from collections import OrderedDict
+from datetime import date
+
+
+class TeamSnapshotCache:
+    """
+    In-process LRU cache of the team-level data served by /get_app_data.
+
+    Snapshots are keyed by team id and the team's data version (see delta_sync.current_version),
+    so any committed edit makes the cached snapshot stale. When several coaches refresh after
+    the same edit, only the first one pays for the rebuild.
+    """
+
+    def __init__(self, max_entries=64):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # team_id -> (version, built_on, snapshot)
+        self._build_locks = {}  # team_id -> lock held while a snapshot is rebuilt
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def invalidate(self, team_id):
+        """Drops everything held for a team (e.g. when the team is deleted)."""
+        with self._lock:
+            self._entries.pop(team_id, None)
+            self._build_locks.pop(team_id, None)
+
+    def _lookup(self, team_id, version, today):
+        entry = self._entries.get(team_id)
+        # Pitch counts and rest status depend on today's date, so a snapshot
+        # built yesterday is stale even if nothing has been edited since.
+        if entry and entry[0] == version and entry[1] == today:
+            self._entries.move_to_end(team_id)
+            return entry[2]
+        return None
+
+    def get_or_build(self, team_id, version, builder):
+        """
+        Returns the cached snapshot for the given team data version, calling
+        builder() to produce it on a miss.
+        """
+        today = date.today()
+        with self._lock:
+            snapshot = self._lookup(team_id, version, today)
+            if snapshot is not None:
+                self.hits += 1
+                return snapshot
+            build_lock = self._build_locks.setdefault(team_id, threading.Lock())
+
+        with build_lock:
+            # Another request may have finished the same rebuild while we waited.
+            with self._lock:
+                snapshot = self._lookup(team_id, version, today)
+                if snapshot is not None:
+                    self.hits += 1
+                    return snapshot
+                self.misses += 1
+
+            snapshot = builder()
+
+            with self._lock:
+                # Never replace a snapshot of a newer version with an older one.
+                entry = self._entries.get(team_id)
+                if entry is None or entry[0] <= version or entry[1] != today:
+                    self._entries[team_id] = (version, today, snapshot)
+                    self._entries.move_to_end(team_id)
+                    while len(self._entries) > self.max_entries:
+                        self._entries.popitem(last=False)
+                        self.evictions += 1
+            return snapshot
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+            }
@@ -486,6 +486,26 @@ function initializeGameManagement(gameData) {
             }
             renderRotationEditor();
         });
+        document.getElementById('generateRotationBtn')?.addEventListener('click', async () => {
+            if(!window.AppState.rotation) return;
+            if(!confirm("Replace every inning with a generated rotation? It is not saved until you click Save.")) return;
+            const innings = Object.keys(window.AppState.rotation.innings).length || 6;
+            try {
+                const response = await fetch('/generate_rotation', {
+                    method: 'POST',
+                    headers: { 'Content-Type': 'application/json' },
+                    body: JSON.stringify({ game_id: window.AppState.game.id, innings: innings })
+                });
+                const result = await response.json();
+                if (result.status !== 'success') throw new Error(result.message);
+                window.AppState.rotation.innings = result.innings;
+                window.AppState.currentInning = '1';
+                renderRotationEditor();
+                if (result.warnings.length) alert(result.warnings.join('\n'));
+            } catch (error) {
+                alert('Error generating rotation: ' + error.message);
+            }
+        });
         document.getElementById('copyInningBtn')?.addEventListener('click', () => {
             if (!window.AppState.rotation || !window.AppState.currentInning) return;
             window.AppState.copiedInningData = { ...window.AppState.rotation.innings[window.AppState.currentInning] };
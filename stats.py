@@ -0,0 +1,125 @@
+# stats.py
+from datetime import timedelta, date
+from models import parse_date
+
+
+def get_required_rest_days(pitches):
+    if pitches >= 66: return 4
+    elif pitches >= 51: return 3
+    elif pitches >= 36: return 2
+    elif pitches >= 21: return 1
+    else: return 0
+
+def calculate_pitcher_availability(pitcher_name, all_outings):
+    today = date.today()
+    most_recent_outing = None
+    for outing in all_outings:
+        if outing.pitcher == pitcher_name:
+            try:
+                outing_date = parse_date(outing.date)
+                if outing_date is None: continue
+                if most_recent_outing is None or outing_date > most_recent_outing['date']:
+                    most_recent_outing = {'date': outing_date, 'pitches': int(outing.pitches)}
+            except (ValueError, TypeError): continue
+    if not most_recent_outing:
+        return {'status': 'Available', 'next_available': 'Today'}
+    rest_days_needed = get_required_rest_days(most_recent_outing['pitches'])
+    next_available_date = most_recent_outing['date'] + timedelta(days=rest_days_needed + 1)
+    if today >= next_available_date:
+        return {'status': 'Available', 'next_available': 'Today'}
+    else:
+        return {'status': 'Resting', 'next_available': next_available_date.strftime('%Y-%m-%d')}
+
+def calculate_pitch_counts(pitcher_name, all_outings):
+    today = date.today()
+    current_year = today.year
+    start_of_week = today - timedelta(days=today.weekday())
+    counts = {'daily': 0, 'weekly': 0, 'cumulative_year': 0}
+    for outing in all_outings:
+        if outing.pitcher == pitcher_name:
+            try:
+                outing_date = parse_date(outing.date)
+                if outing_date is None: continue
+                pitches = int(outing.pitches)
+                if outing_date.year == current_year:
+                    counts['cumulative_year'] += pitches
+                if outing_date >= start_of_week:
+                    counts['weekly'] += pitches
+                if outing_date == today:
+                    counts['daily'] += pitches
+            except (ValueError, TypeError): continue
+    return counts
+
+def calculate_cumulative_pitching_stats(pitcher_name, all_outings):
+    """
+    Calculates cumulative pitching statistics for a given pitcher.
+    Args:
+        pitcher_name (str): The name of the pitcher.
+        all_outings (list): A list of all PitchingOuting objects.
+    Returns:
+        dict: A dictionary containing total innings pitched, total pitches thrown, and appearances.
+    """
+    total_innings = 0.0
+    total_pitches = 0
+    appearances = 0
+
+    for outing in all_outings:
+        if outing.pitcher == pitcher_name:
+            try:
+                # Ensure innings are treated as float and pitches as int
+                innings = float(outing.innings) if outing.innings is not None else 0.0
+                pitches = int(outing.pitches) if outing.pitches is not None else 0
+
+                total_innings += innings
+                total_pitches += pitches
+                appearances += 1
+            except (ValueError, TypeError):
+                # Handle cases where data might be malformed, skip the outing
+                continue
+    return {
+        'total_innings_pitched': round(total_innings, 1), # Round to 1 decimal place for display
+        'total_pitches_thrown': total_pitches,
+        'appearances': appearances
+    }
+
+def calculate_cumulative_position_stats(player_names, lineup_positions_lists):
+    """
+    Calculates cumulative games played at each position for all players.
+    Args:
+        player_names (iterable): Names of the players on the roster.
+        lineup_positions_lists (iterable): The parsed lineup_positions of each saved lineup,
+            i.e. lists of {'name': ..., 'position': ...} dictionaries.
+    Returns:
+        dict: A dictionary where keys are player names and values are
+              dictionaries of positions and counts (games played at that position).
+    """
+    player_position_stats = {name: {} for name in player_names}
+
+    for lineup_positions in lineup_positions_lists:
+        for item in lineup_positions:
+            player_name = item.get('name')
+            position = item.get('position')
+            if player_name and position:
+                if player_name in player_position_stats:
+                    player_position_stats[player_name][position] = player_position_stats[player_name].get(position, 0) + 1
+    return player_position_stats
+
+def pitcher_summary(pitcher_totals, today):
+    """
+    Turns one pitcher's totals into the summary dictionary shown in the app.
+    Args:
+        pitcher_totals (sequence): daily, weekly and yearly pitches, the day the pitcher is
+            available again after their most recent outing (None if none), total innings,
+            total pitches and appearances.
+        today (date): The day rest status is computed for.
+    """
+    daily, weekly, cumulative_year, next_available_date, innings, pitches, appearances = pitcher_totals
+    summary = {'daily': daily, 'weekly': weekly, 'cumulative_year': cumulative_year,
+               'status': 'Available', 'next_available': 'Today'}
+    if next_available_date is not None and today < next_available_date:
+        summary['status'] = 'Resting'
+        summary['next_available'] = next_available_date.strftime('%Y-%m-%d')
+    summary['total_innings_pitched'] = round(innings, 1)
+    summary['total_pitches_thrown'] = pitches
+    summary['appearances'] = appearances
+    return summary
@@ -0,0 +1,74 @@
+# team_metadata.py
+import threading
+import time
+from models import Team, User
+
+
+class TeamMetadataCache:
+    """
+    In-process cache of the small per-team data read on nearly every request: the branding
+    shown in page headers and the username -> display name map used to label authors.
+
+    Entries expire after `ttl` seconds and are dropped explicitly by the routes that change
+    team settings or users (invalidate()), so edits show up on the next request.
+    """
+
+    def __init__(self, ttl=300):
+        self.ttl = ttl
+        self._entries = {}  # team_id -> (loaded_at, metadata)
+        self._generations = {}  # team_id -> bumped by every invalidate()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def invalidate(self, team_id):
+        with self._lock:
+            self._entries.pop(team_id, None)
+            self._generations[team_id] = self._generations.get(team_id, 0) + 1
+            self.invalidations += 1
+
+    def get(self, db, team_id):
+        """
+        Returns {'id', 'team_name', 'logo_path', 'display_coach_names', 'user_names'} for the
+        team, or None if it doesn't exist. user_names maps usernames to full names (falling
+        back to the username).
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(team_id)
+            if entry and now - entry[0] < self.ttl:
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            generation = self._generations.get(team_id, 0)
+
+        team = db.query(Team.id, Team.team_name, Team.logo_path, Team.display_coach_names).filter(Team.id == team_id).first()
+        if team is None:
+            return None
+        users = db.query(User.username, User.full_name).filter(User.team_id == team_id).all()
+        metadata = {
+            'id': team.id,
+            'team_name': team.team_name,
+            'logo_path': team.logo_path,
+            'display_coach_names': team.display_coach_names,
+            'user_names': {u.username: (u.full_name or u.username) for u in users},
+        }
+        with self._lock:
+            # Don't store data read before an invalidation that happened while we were loading.
+            if self._generations.get(team_id, 0) == generation:
+                self._entries[team_id] = (now, metadata)
+        return metadata
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'ttl_seconds': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'invalidations': self.invalidations,
+            }
+
+
+team_metadata_cache = TeamMetadataCache()
@@ -0,0 +1,127 @@
+# team_search.py
+"""
+Full-text search over a team's notes, development focuses, practice tasks, game notes and
+player notes, answered from the search_index FTS5 table (see SEARCH_SOURCES in models.py).
+
+Each row's `team` column holds a 't<team id>' token, so the team filter is part of the
+MATCH and ranking and pagination only see that team's rows. Words are matched after Porter
+stemming ("throws" finds "throwing"), and the last word of a query is also matched as a
+prefix, so results can follow the user's typing. Run this module to rebuild the index:
+
+    python team_search.py
+"""
+import html
+import re
+from sqlalchemy import text
+from models import (
+    Player, Game, CollaborationNote, PracticePlan, PracticeTask, PlayerDevelopmentFocus,
+    SEARCH_SOURCES, search_index_insert, format_date, format_timestamp
+)
+
+SEARCH_PAGE_SIZE = 20
+SEARCH_MAX_PAGE_SIZE = 50
+MAX_QUERY_TERMS = 8
+SNIPPET_TOKENS = 16
+
+# Highlight markers FTS5 puts around matches; replaced with <mark> once the snippet is escaped.
+_MARK_START, _MARK_END = '\x02', '\x03'
+
+_HITS = text(
+    "SELECT kind, ref_id, snippet(search_index, 1, char(2), char(3), '…', :tokens) AS snippet, "
+    "bm25(search_index, 0.0, 1.0) AS score "
+    "FROM search_index WHERE search_index MATCH :match ORDER BY score, rowid LIMIT :limit OFFSET :offset"
+)
+_COUNT = text("SELECT count(*) FROM search_index WHERE search_index MATCH :match")
+
+
+def rebuild_search_index(connection):
+    """Refills search_index from every source table."""
+    connection.exec_driver_sql("DELETE FROM search_index")
+    for kind in SEARCH_SOURCES:
+        connection.exec_driver_sql(search_index_insert(kind, SEARCH_SOURCES[kind][0]))
+    return connection.exec_driver_sql("SELECT count(*) FROM search_index").scalar()
+
+
+def match_expression(team_id, query):
+    """The FTS5 query for a user's search text, or None if it has no words to search for."""
+    terms = re.findall(r'\w+', query or '')[:MAX_QUERY_TERMS]
+    if not terms:
+        return None
+    phrases = [f'"{term}"' for term in terms]
+    phrases[-1] += '*'
+    return f'team : "t{team_id}" AND body : ({" ".join(phrases)})'
+
+
+def _highlight(snippet):
+    return html.escape(snippet).replace(_MARK_START, '<mark>').replace(_MARK_END, '</mark>')
+
+
+def _hit_contexts(db, team_id, ids_by_kind):
+    """
+    (kind, id) -> {'title', 'date'} for the hits of one page. Sources are looked up by primary
+    key and checked against the team here; with team_id in the WHERE clause SQLite would walk
+    the team's index instead.
+    """
+    contexts = {}
+    if ids_by_kind.get('note'):
+        rows = (db.query(CollaborationNote.id, CollaborationNote.team_id, CollaborationNote.note_type, CollaborationNote.player_name, CollaborationNote.timestamp)
+                .filter(CollaborationNote.id.in_(ids_by_kind['note'])))
+        for note_id, row_team_id, note_type, player_name, timestamp in rows:
+            if row_team_id == team_id:
+                title = f"Note on {player_name}" if note_type == 'player_notes' else 'Team note'
+                contexts[('note', note_id)] = {'title': title, 'date': format_timestamp(timestamp)}
+    if ids_by_kind.get('focus'):
+        rows = (db.query(PlayerDevelopmentFocus.id, PlayerDevelopmentFocus.team_id, PlayerDevelopmentFocus.skill_type, PlayerDevelopmentFocus.created_date, Player.name)
+                .join(Player, Player.id == PlayerDevelopmentFocus.player_id).filter(PlayerDevelopmentFocus.id.in_(ids_by_kind['focus'])))
+        for focus_id, row_team_id, skill_type, created_date, name in rows:
+            if row_team_id == team_id:
+                contexts[('focus', focus_id)] = {'title': f"{(skill_type or '').title()} focus for {name}", 'date': format_date(created_date)}
+    if ids_by_kind.get('task'):
+        rows = (db.query(PracticeTask.id, PracticePlan.team_id, PracticePlan.date).join(PracticePlan, PracticePlan.id == PracticeTask.practice_plan_id)
+                .filter(PracticeTask.id.in_(ids_by_kind['task'])))
+        for task_id, row_team_id, plan_date in rows:
+            if row_team_id == team_id:
+                contexts[('task', task_id)] = {'title': f"Practice plan {format_date(plan_date)}".strip(), 'date': format_date(plan_date)}
+    if ids_by_kind.get('game'):
+        for game_id, row_team_id, opponent, game_date in db.query(Game.id, Game.team_id, Game.opponent, Game.date).filter(Game.id.in_(ids_by_kind['game'])):
+            if row_team_id == team_id:
+                contexts[('game', game_id)] = {'title': f"Game vs {opponent}", 'date': format_date(game_date)}
+    if ids_by_kind.get('player'):
+        for player_id, row_team_id, name, notes_timestamp in db.query(Player.id, Player.team_id, Player.name, Player.notes_timestamp).filter(Player.id.in_(ids_by_kind['player'])):
+            if row_team_id == team_id:
+                contexts[('player', player_id)] = {'title': f"Player notes: {name}", 'date': format_timestamp(notes_timestamp)}
+    return contexts
+
+
+def search_team(db, team_id, query, page=1, per_page=SEARCH_PAGE_SIZE):
+    """
+    One page of the team's search hits, best match first.
+    Returns:
+        dict: {'query', 'page', 'per_page', 'total', 'hits': [{'kind', 'id', 'title', 'date',
+               'snippet'}]} where kind is 'note', 'focus', 'task', 'game' or 'player' and the
+               snippet is HTML-escaped with the matched words in <mark>.
+    """
+    result = {'query': query, 'page': page, 'per_page': per_page, 'total': 0, 'hits': []}
+    match = match_expression(team_id, query)
+    if match is None:
+        return result
+    result['total'] = db.execute(_COUNT, {'match': match}).scalar()
+    rows = db.execute(_HITS, {'match': match, 'tokens': SNIPPET_TOKENS, 'limit': per_page, 'offset': (page - 1) * per_page}).all()
+    ids_by_kind = {}
+    for row in rows:
+        ids_by_kind.setdefault(row.kind, []).append(row.ref_id)
+    contexts = _hit_contexts(db, team_id, ids_by_kind)
+    for row in rows:
+        context = contexts.get((row.kind, row.ref_id))
+        if context is not None:
+            result['hits'].append({'kind': row.kind, 'id': row.ref_id, **context, 'snippet': _highlight(row.snippet)})
+    return result
+
+
+if __name__ == '__main__':
+    from db import engine
+    from models import Base
+    Base.metadata.create_all(engine)
+    with engine.begin() as connection:
+        count = rebuild_search_index(connection)
+    print(f"Rebuilt search_index: {count} row(s).")
@@ -0,0 +1,39 @@
+# tests/conftest.py
+import os
+import sys
+import tempfile
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# The app's engine is created when db.py is imported: point it at a throwaway database.
+os.environ['DATABASE_PATH'] = os.path.join(tempfile.mkdtemp(prefix='app-tests-'), 'app.db')
+os.environ['DATA_UPDATED_COALESCE_WINDOW'] = '0'
+
+from db import make_engine
+from models import Base, Team
+
+
+@pytest.fixture
+def engine(tmp_path):
+    """An engine on a fresh database file with every table created."""
+    engine = make_engine(f"sqlite:///{tmp_path / 'test.db'}")
+    Base.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def session_factory(engine):
+    return sessionmaker(bind=engine)
+
+
+@pytest.fixture
+def make_team(session_factory):
+    def make_team(name='Test Team'):
+        with session_factory() as db:
+            team = Team(team_name=name, registration_code=f'{name.upper()}-CODE')
+            db.add(team)
+            db.commit()
+            return team.id
+    return make_team
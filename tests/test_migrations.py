@@ -0,0 +1,104 @@
+# tests/test_migrations.py
+"""Upgrading a database created by the original schema (text dates, JSON in text columns)."""
+import json
+import sqlite3
+import pytest
+from sqlalchemy.orm import sessionmaker
+from werkzeug.security import generate_password_hash
+from db import make_engine
+from models import User, Rotation, PitchingOuting
+from player_order import query_player_order
+import migrations
+
+# The tables as the first release created them, before any migration.
+LEGACY_SCHEMA = """
+CREATE TABLE teams (id INTEGER NOT NULL, team_name VARCHAR NOT NULL, registration_code VARCHAR NOT NULL,
+    logo_path VARCHAR, display_coach_names BOOLEAN NOT NULL, primary_color VARCHAR, secondary_color VARCHAR,
+    PRIMARY KEY (id));
+CREATE TABLE users (id INTEGER NOT NULL, username VARCHAR NOT NULL, full_name VARCHAR(100),
+    password_hash VARCHAR NOT NULL, role VARCHAR, last_login VARCHAR, tab_order TEXT, player_order TEXT,
+    team_id INTEGER NOT NULL, PRIMARY KEY (id), UNIQUE (username), FOREIGN KEY(team_id) REFERENCES teams (id));
+CREATE TABLE players (id INTEGER NOT NULL, name VARCHAR NOT NULL, number VARCHAR, position1 VARCHAR,
+    position2 VARCHAR, position3 VARCHAR, throws VARCHAR, bats VARCHAR, notes TEXT, pitcher_role VARCHAR,
+    has_lessons VARCHAR, lesson_focus TEXT, notes_author VARCHAR, notes_timestamp VARCHAR,
+    team_id INTEGER NOT NULL, PRIMARY KEY (id), FOREIGN KEY(team_id) REFERENCES teams (id));
+CREATE TABLE lineups (id INTEGER NOT NULL, title VARCHAR NOT NULL, lineup_positions TEXT,
+    associated_game_id INTEGER, team_id INTEGER NOT NULL, PRIMARY KEY (id), FOREIGN KEY(team_id) REFERENCES teams (id));
+CREATE TABLE pitching_outings (id INTEGER NOT NULL, date VARCHAR NOT NULL, pitcher VARCHAR NOT NULL,
+    opponent VARCHAR, pitches INTEGER, innings FLOAT, pitcher_type VARCHAR, outing_type VARCHAR,
+    team_id INTEGER NOT NULL, PRIMARY KEY (id), FOREIGN KEY(team_id) REFERENCES teams (id));
+CREATE TABLE scouted_players (id INTEGER NOT NULL, name VARCHAR NOT NULL, position1 VARCHAR, position2 VARCHAR,
+    throws VARCHAR, bats VARCHAR, list_type VARCHAR NOT NULL, team_id INTEGER NOT NULL, PRIMARY KEY (id),
+    FOREIGN KEY(team_id) REFERENCES teams (id));
+CREATE TABLE rotations (id INTEGER NOT NULL, title VARCHAR NOT NULL, innings TEXT, associated_game_id INTEGER,
+    team_id INTEGER NOT NULL, PRIMARY KEY (id), FOREIGN KEY(team_id) REFERENCES teams (id));
+CREATE TABLE games (id INTEGER NOT NULL, date VARCHAR NOT NULL, opponent VARCHAR NOT NULL, location VARCHAR,
+    game_notes TEXT, associated_lineup_title VARCHAR, associated_rotation_date VARCHAR, team_id INTEGER NOT NULL,
+    PRIMARY KEY (id), FOREIGN KEY(team_id) REFERENCES teams (id));
+CREATE TABLE collaboration_notes (id INTEGER NOT NULL, note_type VARCHAR NOT NULL, text TEXT NOT NULL,
+    author VARCHAR, timestamp VARCHAR, player_name VARCHAR, team_id INTEGER NOT NULL, PRIMARY KEY (id),
+    FOREIGN KEY(team_id) REFERENCES teams (id));
+CREATE TABLE practice_plans (id INTEGER NOT NULL, date VARCHAR NOT NULL, general_notes TEXT,
+    team_id INTEGER NOT NULL, PRIMARY KEY (id), FOREIGN KEY(team_id) REFERENCES teams (id));
+CREATE TABLE signs (id INTEGER NOT NULL, name VARCHAR NOT NULL, indicator VARCHAR NOT NULL,
+    team_id INTEGER NOT NULL, PRIMARY KEY (id), FOREIGN KEY(team_id) REFERENCES teams (id));
+CREATE TABLE practice_tasks (id INTEGER NOT NULL, text TEXT NOT NULL, status VARCHAR, author VARCHAR,
+    timestamp VARCHAR, practice_plan_id INTEGER NOT NULL, PRIMARY KEY (id),
+    FOREIGN KEY(practice_plan_id) REFERENCES practice_plans (id));
+CREATE TABLE player_development_focuses (id INTEGER NOT NULL, focus TEXT NOT NULL, status VARCHAR, notes TEXT,
+    created_date VARCHAR, completed_date VARCHAR, author VARCHAR, last_edited_by VARCHAR,
+    last_edited_date VARCHAR, player_id INTEGER NOT NULL, skill_type VARCHAR NOT NULL, team_id INTEGER NOT NULL,
+    PRIMARY KEY (id), FOREIGN KEY(player_id) REFERENCES players (id), FOREIGN KEY(team_id) REFERENCES teams (id));
+"""
+TAB_ORDER = ['roster', 'player_development', 'lineups', 'pitching']
+PASSWORD = 'legacy-password'
+
+
+@pytest.fixture
+def legacy_engine(tmp_path):
+    """A database with the original schema and one team's rows, upgraded by migrations.upgrade."""
+    path = tmp_path / 'app.db'
+    connection = sqlite3.connect(path)
+    connection.executescript(LEGACY_SCHEMA)
+    connection.execute("INSERT INTO teams VALUES (1, 'Legacy Team', 'LEGACY-CODE', NULL, 0, NULL, NULL)")
+    connection.execute(
+        "INSERT INTO users VALUES (1, 'legacy', 'Legacy Coach', ?, 'Admin', '2024-05-01 18:30:00', ?, ?, 1)",
+        (generate_password_hash(PASSWORD), json.dumps(TAB_ORDER), json.dumps(['Casey', 'Alex', 'Blake'])))
+    connection.executemany("INSERT INTO players (id, name, position1, team_id) VALUES (?, ?, ?, 1)",
+                           [(1, 'Alex', 'P'), (2, 'Blake', 'C'), (3, 'Casey', 'SS')])
+    connection.execute("INSERT INTO rotations VALUES (1, 'Opener', ?, NULL, 1)", (json.dumps({'1': {'P': 'Alex', 'C': 'Blake'}}),))
+    connection.execute("INSERT INTO pitching_outings VALUES (1, '2024-05-01', 'Alex', 'Opp', 45, 3.0, 'Starter', 'Game', 1)")
+    connection.commit()
+    connection.close()
+    engine = make_engine(f'sqlite:///{path}')
+    assert migrations.upgrade(engine) == migrations.LATEST_VERSION
+    yield engine
+    engine.dispose()
+
+
+def test_legacy_json_columns_survive_the_upgrade(legacy_engine):
+    with legacy_engine.connect() as connection:
+        stored_tab_order = connection.exec_driver_sql('SELECT tab_order FROM users').scalar_one()
+    assert json.loads(stored_tab_order) == TAB_ORDER
+
+    with sessionmaker(bind=legacy_engine)() as db:
+        user = db.get(User, 1)
+        assert user.tab_order == TAB_ORDER
+        assert user.last_login is not None
+        assert query_player_order(db, user.id, user.team_id) == ['Casey', 'Alex', 'Blake']
+        assert db.get(Rotation, 1).innings == {'1': {'P': 'Alex', 'C': 'Blake'}}
+        assert db.get(PitchingOuting, 1).date.isoformat() == '2024-05-01'
+
+
+def test_legacy_user_can_log_in_after_the_upgrade(legacy_engine):
+    from app import app, SessionLocal, engine
+    SessionLocal.configure(bind=legacy_engine)
+    try:
+        client = app.test_client()
+        response = client.post('/login', data={'username': 'legacy', 'password': PASSWORD})
+        assert response.status_code == 302
+        assert '/login' not in response.headers['Location']
+        with client.session_transaction() as session:
+            assert session['username'] == 'legacy'
+    finally:
+        SessionLocal.configure(bind=engine)
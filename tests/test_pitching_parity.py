@@ -0,0 +1,117 @@
+# tests/test_pitching_parity.py
+"""
+The pitch count summary read from SQL (pitching_queries.py over the pitcher_workload ledger)
+against the reference rules in stats.py, over randomized outing histories.
+"""
+import random
+from datetime import date, timedelta
+import pytest
+from sqlalchemy import text
+from models import PitchingOuting, parse_date
+from pitcher_workload import install_workload_ledger, rebuild_workloads
+from pitching_queries import query_pitch_count_summary
+from stats import calculate_pitch_counts, calculate_pitcher_availability, calculate_cumulative_pitching_stats
+
+PITCHERS = ['Reed Evans', 'Jack Fordice', 'Sam Ortiz', 'Lee Park', 'Max Hill']
+# Form input as coaches have typed it; unreadable dates are stored as NULL like add_pitching and migration 1 do.
+MALFORMED_DATES = ['', 'n/a', '2024-13-45', 'yesterday', None]
+INNINGS = [0.0, 0.1, 0.2, 1.0, 1.1, 2.2, 3.0, 4.1, 5.2, 7.0]
+# Values from before pitches and innings were validated (e.g. imported from data.json), stored
+# as SQLite's column affinity leaves them. Text spellings of infinity, which float() reads but
+# SQLite doesn't, are left out: imports and forms only ever stored infinite innings as floats.
+MALFORMED_PITCHES = [None, 'abc', '', '12x', ' 45 ', '40.5', 40.5, '1e2']
+MALFORMED_INNINGS = [None, 'abc', '', '2.1', ' 3 ', float('inf')]
+
+
+def _random_date(rng, today):
+    kind = rng.random()
+    if kind < 0.1:
+        return parse_date(rng.choice(MALFORMED_DATES))
+    if kind < 0.25:
+        return today
+    if kind < 0.5:
+        return today - timedelta(days=rng.randrange(0, 8))
+    if kind < 0.55:
+        return today + timedelta(days=rng.randrange(1, 4))
+    return today - timedelta(days=rng.randrange(0, 800))
+
+
+def _seed(session_factory, rng, team_ids, count):
+    today = date.today()
+    with session_factory() as db:
+        for _ in range(count):
+            db.add(PitchingOuting(
+                team_id=rng.choice(team_ids), pitcher=rng.choice(PITCHERS), date=_random_date(rng, today),
+                pitches=rng.randrange(0, 110) if rng.random() < 0.9 else None,
+                innings=rng.choice(INNINGS) if rng.random() < 0.9 else None, opponent='Opp',
+            ))
+            if rng.random() < 0.2:
+                db.commit()
+        db.commit()
+        # Edits and deletes move outings between pitchers and seasons.
+        outings = db.query(PitchingOuting).all()
+        for outing in rng.sample(outings, len(outings) // 10):
+            outing.date = _random_date(rng, today)
+            outing.pitcher = rng.choice(PITCHERS)
+            outing.pitches = rng.randrange(0, 110)
+        for outing in rng.sample(outings, len(outings) // 20):
+            db.delete(outing)
+        db.commit()
+
+
+def _corrupt(session_factory, rng, count):
+    """Writes legacy pitches and innings values straight to the table, as the ORM never would."""
+    with session_factory() as db:
+        ids = [row[0] for row in db.execute(text("SELECT id FROM pitching_outings"))]
+        for outing_id in rng.sample(ids, min(count, len(ids))):
+            column, value = rng.choice([('pitches', rng.choice(MALFORMED_PITCHES)), ('innings', rng.choice(MALFORMED_INNINGS))])
+            db.execute(text(f"UPDATE pitching_outings SET {column} = :value WHERE id = :id"), {'value': value, 'id': outing_id})
+        rebuild_workloads(db.connection())
+        db.commit()
+
+
+def _reference_summary(outings):
+    summaries = {}
+    for name in {outing.pitcher for outing in outings}:
+        summaries[name] = {
+            **calculate_pitch_counts(name, outings),
+            **calculate_pitcher_availability(name, outings),
+            **calculate_cumulative_pitching_stats(name, outings),
+        }
+    return summaries
+
+
+def _assert_parity(session_factory, team_ids):
+    with session_factory() as db:
+        for team_id in team_ids:
+            outings = db.query(PitchingOuting).filter(PitchingOuting.team_id == team_id).all()
+            expected = _reference_summary(outings)
+            actual = query_pitch_count_summary(db, team_id)
+            assert actual.keys() == expected.keys()
+            for name in expected:
+                assert actual[name] == pytest.approx(expected[name]), name
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_summary_matches_python_rules(session_factory, make_team, seed):
+    install_workload_ledger(session_factory)
+    team_ids = [make_team('Home'), make_team('Away')]
+    _seed(session_factory, random.Random(seed), team_ids, count=300)
+    _assert_parity(session_factory, team_ids)
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_summary_matches_python_rules_with_malformed_values(session_factory, make_team, seed):
+    install_workload_ledger(session_factory)
+    team_ids = [make_team('Home'), make_team('Away')]
+    rng = random.Random(seed)
+    _seed(session_factory, rng, team_ids, count=300)
+    _corrupt(session_factory, rng, count=60)
+    _assert_parity(session_factory, team_ids)
+
+
+def test_team_without_outings_has_no_summaries(session_factory, make_team):
+    install_workload_ledger(session_factory)
+    team_id = make_team()
+    with session_factory() as db:
+        assert query_pitch_count_summary(db, team_id) == {}
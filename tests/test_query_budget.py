@@ -0,0 +1,95 @@
+# tests/test_query_budget.py
+"""
+The main pages stay within their query budgets (see query_budget.py) on a team with enough
+rows that a lazy relationship loaded per row would go over.
+"""
+from datetime import date, timedelta
+import pytest
+from sqlalchemy import text
+import init_db
+from query_budget import QueryBudgetExceeded, query_budget, enforce_query_budget
+
+PLAYERS = [(f'Player {i}', ['P', 'C', '1B', '2B', '3B', 'SS', 'LF', 'CF', 'RF'][i % 9]) for i in range(15)]
+
+
+def _ok(response):
+    assert response.status_code in (200, 302), response.data[:500]
+    return response
+
+
+def _seed_team(client):
+    today = date.today()
+    for name, position in PLAYERS:
+        _ok(client.post('/add_player', data={'name': name, 'number': '1', 'position1': position, 'position2': 'LF', 'pitcher_role': 'Starter'}))
+        _ok(client.post(f'/add_focus/{name}', data={'skill': 'hitting', 'focus_text': f'Footwork for {name}', 'notes': 'n'}))
+        _ok(client.post('/add_note/player_notes', data={'note_text': f'Note on {name}', 'player_name': name}))
+    for focus_id in range(1, 6):
+        _ok(client.get(f'/complete_focus/{focus_id}'))
+    for i in range(20):
+        name = PLAYERS[i % 5][0]
+        _ok(client.post('/add_pitching', data={'pitch_date': (today - timedelta(days=i)).isoformat(), 'pitcher': name, 'opponent': 'Opp', 'pitches': '35', 'innings': '2'}))
+    for i in range(3):
+        _ok(client.post('/add_game', data={'game_date': (today + timedelta(days=i)).isoformat(), 'game_opponent': f'Opp {i}', 'game_location': 'Park'}))
+        game_id = i + 1
+        lineup = [{'name': name, 'position': position} for name, position in PLAYERS[:9]]
+        _ok(client.post('/add_lineup', json={'title': f'Lineup {i}', 'lineup_data': lineup, 'associated_game_id': game_id}))
+        innings = {str(inning): {position: name for name, position in PLAYERS[inning:inning + 9]} for inning in range(1, 7)}
+        _ok(client.post('/save_rotation', json={'title': f'Rotation {i}', 'innings': innings, 'associated_game_id': game_id}))
+    for plan_id in range(1, 4):
+        _ok(client.post('/add_practice_plan', data={'plan_date': today.isoformat(), 'general_notes': 'g'}))
+        for task in ('bunting', 'cutoffs', 'base running'):
+            _ok(client.post(f'/add_task_to_plan/{plan_id}', json={'task_text': task}))
+    for i in range(3):
+        _ok(client.post('/add_note/team_notes', data={'note_text': f'Team note {i}'}))
+        _ok(client.post('/add_sign', data={'sign_name': f'sign {i}', 'sign_indicator': 'hat'}))
+        _ok(client.post('/add_scouted_player', json={'scouted_player_name': f'Scout {i}', 'scouted_player_type': 'targets'}))
+
+
+@pytest.fixture(scope='module')
+def app():
+    init_db.initialize_database()
+    from app import app
+    app.config['TESTING'] = True
+    return app
+
+
+@pytest.fixture(scope='module')
+def client(app):
+    client = app.test_client()
+    _ok(client.post('/login', data={'username': init_db.SUPER_ADMIN_USERNAME, 'password': init_db.SUPER_ADMIN_PASSWORD}))
+    _seed_team(client)
+    return client
+
+
+@pytest.mark.parametrize('cached', [False, True], ids=['cold', 'warm'])
+@pytest.mark.parametrize('path', ['/', '/get_app_data', '/stats', '/game/1', '/game/3'])
+def test_page_stays_within_its_query_budget(client, path, cached):
+    from app import snapshot_cache, team_metadata_cache
+    if not cached:
+        # Make the view build the team snapshot and look up the team's branding itself.
+        snapshot_cache.invalidate(1)
+        team_metadata_cache.invalidate(1)
+    # Over budget, the view raises QueryBudgetExceeded out of the test client.
+    assert client.get(path).status_code == 200
+
+
+def test_delta_stays_within_its_query_budget(client):
+    version = client.get('/get_app_data').get_json()['version']
+    _ok(client.post('/add_note/team_notes', data={'note_text': 'One more'}))
+    assert client.get(f'/get_app_data?since={version}').status_code == 200
+
+
+def test_view_over_its_budget_raises(app, monkeypatch):
+    from app import get_db
+    monkeypatch.setitem(app.config, 'TESTING', True)
+
+    def chatty_view():
+        db = get_db()
+        for _ in range(3):
+            db.execute(text('SELECT 1'))
+        return 'ok'
+
+    with app.test_request_context('/'):
+        assert enforce_query_budget(query_budget(3)(chatty_view))() == 'ok'
+        with pytest.raises(QueryBudgetExceeded):
+            enforce_query_budget(query_budget(2)(chatty_view))()
@@ -0,0 +1,34 @@
+# tests/test_query_plans.py
+"""Every hot query (migrations.hot_queries) must be answered through an index."""
+from db import make_engine
+from models import Base
+import migrations
+
+
+def _explain_all(engine):
+    with engine.connect() as connection:
+        return {name: migrations.explain(connection, statement) for name, statement in migrations.hot_queries().items()}
+
+
+def test_hot_queries_use_indexes_on_a_migrated_database(tmp_path):
+    engine = make_engine(f"sqlite:///{tmp_path / 'app.db'}")
+    assert migrations.upgrade(engine) == migrations.LATEST_VERSION
+    scans = {name: plan for name, plan in _explain_all(engine).items() if migrations.full_table_scans(plan)}
+    assert scans == {}
+    assert migrations.check_query_plans(engine)
+
+
+def test_migrations_create_the_indexes_of_an_older_database(tmp_path):
+    """A database whose tables predate the indexes gets them from the migration runner."""
+    engine = make_engine(f"sqlite:///{tmp_path / 'app.db'}")
+    Base.metadata.create_all(engine)
+    with engine.begin() as connection:
+        for name in connection.exec_driver_sql(
+            "SELECT name FROM sqlite_master WHERE type = 'index' AND name NOT LIKE 'sqlite_autoindex%'"
+        ).scalars().all():
+            connection.exec_driver_sql(f'DROP INDEX "{name}"')
+        connection.exec_driver_sql('PRAGMA user_version = 1')
+    assert not migrations.check_query_plans(engine)
+
+    migrations.upgrade(engine)
+    assert migrations.check_query_plans(engine)
@@ -0,0 +1,90 @@
+# tests/test_rotation_generator.py
+"""
+min_cost_assignment against brute force, the fairness rules of generate_rotation, and its
+time on a full roster (the /generate_rotation view calls it inside the request).
+"""
+import itertools
+import random
+import time
+from types import SimpleNamespace
+import pytest
+from rotation_generator import FIELD_POSITIONS, INFIELD_POSITIONS, min_cost_assignment, generate_rotation
+
+
+def _roster(size, rng):
+    return [SimpleNamespace(name=f'Player {i}', position1=rng.choice(FIELD_POSITIONS),
+                            position2=rng.choice(FIELD_POSITIONS + ('',)), position3=rng.choice(FIELD_POSITIONS + ('',)))
+            for i in range(size)]
+
+
+def _brute_force_cost(cost):
+    rows, columns = len(cost), len(cost[0])
+    return min(sum(cost[i][j] for i, j in enumerate(choice)) for choice in itertools.permutations(range(columns), rows))
+
+
+@pytest.mark.parametrize('seed', range(200))
+def test_assignment_is_optimal(seed):
+    rng = random.Random(seed)
+    rows = rng.randint(1, 6)
+    columns = rng.randint(rows, 7)
+    values = [lambda: rng.randint(0, 20), lambda: rng.uniform(-10, 10), lambda: rng.choice([0, 10, 1000])][seed % 3]
+    cost = [[values() for _ in range(columns)] for _ in range(rows)]
+
+    assignment = min_cost_assignment(cost)
+
+    assert len(assignment) == rows
+    assert len(set(assignment)) == rows and all(0 <= j < columns for j in assignment)
+    assert sum(cost[i][j] for i, j in enumerate(assignment)) == pytest.approx(_brute_force_cost(cost))
+
+
+def test_empty_assignment():
+    assert min_cost_assignment([]) == []
+
+
+@pytest.mark.parametrize('seed', range(10))
+def test_full_roster_rotation_is_fair(seed):
+    players = _roster(15, random.Random(seed))
+    rotation = generate_rotation(players, 7, max_consecutive_bench=1, min_infield_innings=1)
+
+    assert rotation['warnings'] == []
+    assert sorted(rotation['innings']) == [str(inning) for inning in range(1, 8)]
+    benched_before = set()
+    for inning in range(1, 8):
+        positions = rotation['innings'][str(inning)]
+        assert set(positions) == set(FIELD_POSITIONS)
+        assert len(set(positions.values())) == len(FIELD_POSITIONS)
+        benched = {p.name for p in players} - set(positions.values())
+        assert not benched & benched_before, f'sat two innings in a row: {benched & benched_before}'
+        benched_before = benched
+    for player in players:
+        assert any(rotation['innings'][str(inning)].get(position) == player.name
+                   for inning in range(1, 8) for position in INFIELD_POSITIONS)
+
+
+def test_first_inning_is_kept_and_filled_around():
+    players = _roster(12, random.Random(0))
+    first_inning = {'P': 'Player 3', 'C': 'Player 7', 'SS': 'Not On Roster'}
+
+    rotation = generate_rotation(players, 3, first_inning=first_inning)
+
+    inning_1 = rotation['innings']['1']
+    assert inning_1['P'] == 'Player 3' and inning_1['C'] == 'Player 7'
+    assert set(inning_1) == set(FIELD_POSITIONS)
+    assert len(set(inning_1.values())) == len(FIELD_POSITIONS)
+
+
+def test_short_roster_leaves_positions_open():
+    rotation = generate_rotation(_roster(7, random.Random(0)), 2)
+
+    for positions in rotation['innings'].values():
+        assert len(positions) == 7 and len(set(positions.values())) == 7
+
+
+def test_full_roster_rotation_is_fast():
+    players = _roster(15, random.Random(0))
+    timings = []
+    for _ in range(5):
+        started = time.perf_counter()
+        generate_rotation(players, 7)
+        timings.append(time.perf_counter() - started)
+    assert min(timings) < 0.1, f'15 players x 7 innings took {min(timings) * 1000:.1f} ms'